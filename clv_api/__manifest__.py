@@ -9,7 +9,10 @@
     'version': '17.0.1.218',
     'depends': ['stock'],
     'data': [
+        'security/ir.model.access.csv',
+        'data/clv_api_cron.xml',
         'views/clv_stock_picking_view.xml',
+        'views/clv_api_call_metric_views.xml',
         'views/clv_api_settings.xml'
     ],
     'images': ['static/images/banner.png'],
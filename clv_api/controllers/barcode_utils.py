@@ -0,0 +1,57 @@
+class BarcodeUtils:
+    """
+    Provides util methods to normalize scanned barcodes.
+    """
+
+    # lengths of EAN-8, UPC-A, EAN-13 and GTIN-14 barcodes
+    _gtin_lengths = (8, 12, 13, 14)
+
+    @staticmethod
+    def normalize_barcode(barcode) -> str:
+        """
+        Normalizes barcode to be used as a lookup key.
+        EAN-8, UPC-A, EAN-13 and GTIN-14 barcodes are converted to GTIN-14 form (padded by leading zeros),
+        so different forms of the same code are equal after normalization.
+        Other barcodes are returned without leading and trailing spaces.
+        """
+        if barcode is None or barcode is False:
+            return ''
+
+        barcode = str(barcode).strip()
+        if barcode.isdigit() and len(barcode) in BarcodeUtils._gtin_lengths:
+            return barcode.zfill(14)
+
+        return barcode
+
+    @staticmethod
+    def convert_upce_to_upca(barcode) -> str:
+        """
+        Expands 8-digit UPC-E barcode to UPC-A form.
+        Returns empty string if passed value is not a valid UPC-E barcode.
+        """
+        if not barcode:
+            return ''
+
+        barcode = str(barcode).strip()
+        if len(barcode) != 8 or not barcode.isdigit() or barcode[0] not in ('0', '1'):
+            return ''
+
+        number_system = barcode[0]
+        digits = barcode[1:7]
+        check_digit = barcode[7]
+        last_digit = digits[5]
+
+        if last_digit in ('0', '1', '2'):
+            manufacturer = digits[0:2] + last_digit + '00'
+            product = '00' + digits[2:5]
+        elif last_digit == '3':
+            manufacturer = digits[0:3] + '00'
+            product = '000' + digits[3:5]
+        elif last_digit == '4':
+            manufacturer = digits[0:4] + '0'
+            product = '0000' + digits[4]
+        else:
+            manufacturer = digits[0:5]
+            product = '0000' + last_digit
+
+        return number_system + manufacturer + product + check_digit
@@ -0,0 +1,118 @@
+import functools
+import logging
+import threading
+import time
+
+from odoo.http import request
+
+from .clv_settings_provider import ClvSettingsProvider
+
+
+class CallMetrics:
+    """
+    Opt-in instrumentation of the Inventory API endpoints ('clv_api.clv_collect_call_metrics' setting).
+    Measures wall time, number and time of SQL queries, returned rows and response size of each call
+    and stores them to 'clv_api.call_metric' (percentiles are shown by 'clv_api.call_metric_summary').
+    The measurement is started by the 'instrument' decorator of the endpoint
+    and finished when the plain json response is built (see prepare_response_to_plain_json).
+    """
+    _logger = logging.getLogger(__name__)
+
+    @classmethod
+    def instrument(cls, endpoint):
+        """
+        Decorator of the controller's endpoint measuring its calls
+        """
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            metric = cls._start(request)
+            result = endpoint(*args, **kwargs)
+            if metric is not None:
+                metric['rows_count'] = cls._count_rows(result)
+            return result
+
+        return wrapper
+
+    @staticmethod
+    def set_type_name(req, params: dict):
+        """
+        Sets table or document type name of the measuring call
+        @param req: request
+        @param params: parameters of the request
+        """
+        metric = getattr(req, 'clv_call_metric', None)
+        if metric is None or not isinstance(params, dict):
+            return
+        type_name = params.get('tableName') or params.get('documentTypeName')
+        if not type_name and isinstance(params.get('document'), dict):
+            type_name = params['document'].get('documentTypeName')
+        metric['type_name'] = str(type_name) if type_name else False
+
+    @classmethod
+    def finish(cls, req, response_bytes: int, failed: bool):
+        """
+        Finishes measurement of the call and stores it (failed calls are logged only,
+        because their transaction is rolled back)
+        @param req: request
+        @param response_bytes: size of the response body
+        @param failed: True if the call returns error
+        """
+        metric = getattr(req, 'clv_call_metric', None)
+        if metric is None:
+            return
+        req.clv_call_metric = None
+
+        (query_count, query_time) = cls._get_thread_query_stats()
+        values = {
+            'endpoint': metric['endpoint'],
+            'type_name': metric.get('type_name', False),
+            'user_id': metric['user_id'],
+            'duration_ms': (time.perf_counter() - metric['start_time']) * 1000,
+            'sql_count': query_count - metric['start_query_count'],
+            'sql_time_ms': (query_time - metric['start_query_time']) * 1000,
+            'rows_count': metric.get('rows_count', 0),
+            'response_bytes': response_bytes
+        }
+        if failed:
+            cls._logger.info('Failed call %s', values)
+            return
+
+        try:
+            req.env['clv_api.call_metric'].register(values)
+        except Exception:
+            cls._logger.exception('Unable to store metrics of the call %s', values['endpoint'])
+
+    @classmethod
+    def _start(cls, req):
+        req.clv_call_metric = None
+        if not req.db or not ClvSettingsProvider(req.env).collect_call_metrics:
+            return None
+
+        (query_count, query_time) = cls._get_thread_query_stats()
+        req.clv_call_metric = {
+            'endpoint': req.httprequest.path,
+            'user_id': req.env.uid,
+            'start_time': time.perf_counter(),
+            'start_query_count': query_count,
+            'start_query_time': query_time
+        }
+        return req.clv_call_metric
+
+    @staticmethod
+    def _get_thread_query_stats():
+        # odoo counts queries (and their time in seconds) of the request's thread
+        current_thread = threading.current_thread()
+        return getattr(current_thread, 'query_count', 0), getattr(current_thread, 'query_time', 0.0)
+
+    @staticmethod
+    def _count_rows(result) -> int:
+        if not isinstance(result, dict):
+            return 0
+        if isinstance(result.get('result'), list):
+            return len(result['result'])
+        if isinstance(result.get('results'), list):
+            return sum(CallMetrics._count_rows(item) for item in result['results'])
+        if isinstance(result.get('document'), dict):
+            document = result['document']
+            return len(document.get('expectedLines') or []) + len(document.get('actualLines') or [])
+        return 0
@@ -4,6 +4,7 @@ from odoo.api import Environment
 class ClvSettingsProvider:
     """
     Util class providing easy access to the values of module settings.
+    Values are read from the cached settings snapshot, so reading them does not query the database.
     """
 
     def __init__(self, env: Environment):
@@ -55,9 +56,16 @@ class ClvSettingsProvider:
         """
         return self._get_bool_param('clv_api.clv_ship_expected_actual_lines')
 
+    @property
+    def collect_call_metrics(self) -> bool:
+        """
+        Returns value of 'clv_api.clv_collect_call_metrics' setting.
+        """
+        return self._get_bool_param('clv_api.clv_collect_call_metrics')
+
     def _get_bool_param(self, param_name: str) -> bool:
         # It's strange but Odoo returns param value as a bool if it is false and as a string if it is true.
-        value = self._config_params.get_param(param_name)
+        value = self._config_params.clv_get_settings_snapshot().get(param_name, False)
         if isinstance(value, bool):
             return value
 
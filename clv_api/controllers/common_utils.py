@@ -21,6 +21,9 @@ class CommonUtils:
         DocumentTypeInfo("OUT", "Ship", BusinessLocationType.SRC, True, False, False, False)
     ]
 
+    # document types by sequence code of the odoo's picking type
+    _document_types_by_sequence_code = {doc_type.odoo_sequence_code: doc_type for doc_type in document_types}
+
     def get_stock_lot_env_name(self):
         """
         Returns environment stock lot entity name
@@ -38,10 +41,7 @@ class CommonUtils:
         """
         if not pick_doc:
             return None
-        for doc_type in CommonUtils.document_types:
-            if doc_type.odoo_sequence_code == pick_doc.picking_type_id.sequence_code:
-                return doc_type
-        return None
+        return CommonUtils._document_types_by_sequence_code.get(pick_doc.picking_type_id.sequence_code)
 
     def get_location_parent_path_from_document(self, pick_doc):
         """
@@ -95,9 +95,14 @@ class CommonUtils:
         if not doc_type:
             raise RuntimeError('Not supported document type')
 
-        if doc_type.main_location_type == BusinessLocationType.DEST:
-            return document_warehouse.reception_steps
-        return document_warehouse.delivery_steps
+        route_steps_cache = self.get_request_cache(env, 'warehouse_route_steps')
+        route_steps_key = (document_warehouse.id, doc_type.main_location_type)
+        if route_steps_key not in route_steps_cache:
+            if doc_type.main_location_type == BusinessLocationType.DEST:
+                route_steps_cache[route_steps_key] = document_warehouse.reception_steps
+            else:
+                route_steps_cache[route_steps_key] = document_warehouse.delivery_steps
+        return route_steps_cache[route_steps_key]
 
     def get_doc_main_location(self, odoo_doc):
         """
@@ -124,21 +129,50 @@ class CommonUtils:
         if not doc_type:
             raise RuntimeError('Not supported document type')
 
-        doc_location = self.get_doc_main_location(odoo_doc).parent_path
+        doc_location = self.get_doc_main_location(odoo_doc)
 
-        # lookup for the second level
-        parent_ids = doc_location.split('/')
-        if len(parent_ids) < 2:
-            raise RuntimeError('Invalid warehouse location in document')
-        location_id = int(parent_ids[1])
+        location_warehouse_cache = self.get_request_cache(env, 'location_warehouse')
+        if doc_location.id not in location_warehouse_cache:
+            # lookup for the second level
+            parent_ids = doc_location.parent_path.split('/')
+            if len(parent_ids) < 2:
+                raise RuntimeError('Invalid warehouse location in document')
+            location_warehouse_cache[doc_location.id] = self._get_warehouse_id_by_view_location(env, int(parent_ids[1]))
+
+        warehouse_id = location_warehouse_cache[doc_location.id]
+        if not warehouse_id:
+            return None
+        return env['stock.warehouse'].browse(warehouse_id)
+
+    # noinspection PyMethodMayBeStatic
+    def _get_warehouse_id_by_view_location(self, env: Environment, location_id: int):
+        """
+        Returns id of the warehouse whose code equals to the name of the passed (top level) location
+        @param env: Environment
+        @param location_id: id of the warehouse's view location
+        @return: id of the warehouse or False if not found
+        """
         wh_location = env['stock.location'].search([('id', '=', location_id)])
         if not wh_location:
             raise RuntimeError('Invalid warehouse location in document')
-        wh_code_name = wh_location.name
-        finded_wh = env['stock.warehouse'].search([('code', '=', wh_code_name)])
-        if not finded_wh:
-            return None
-        return finded_wh[0]
+        found_warehouses = env['stock.warehouse'].search([('code', '=', wh_location.name)])
+        if not found_warehouses:
+            return False
+        return found_warehouses[0].id
+
+    @staticmethod
+    def get_request_cache(env: Environment, cache_name: str) -> dict:
+        """
+        Returns the cache dictionary living as long as the database cursor of the request.
+        Used to resolve the same odoo objects once while the document is converted or processed.
+        The cache is separate for each user and set of allowed companies sharing the cursor
+        (e.g. jobs processed by cron).
+        @param env: Environment
+        @param cache_name: name of the cache
+        @return: cache dictionary
+        """
+        cache_key = (cache_name, env.uid, tuple(env.companies.ids))
+        return env.cr.cache.setdefault('clv_api', {}).setdefault(cache_key, {})
 
     def get_odoo_doc_from_device_info(self, env: Environment, device_info):
         """
@@ -241,3 +275,19 @@ class CommonUtils:
                     cleared_values.append(str(value).lower())
 
         return ' '.join(cleared_values)
+
+    @staticmethod
+    def create_trigram_index(cr, table_name: str, column_name: str):
+        """
+        Creates trigram GIN index of the column (used by 'ilike' search) if 'pg_trgm' extension is installed.
+        Odoo 16+ creates such index by the field's index='trigram' attribute.
+        @param cr: database cursor
+        @param table_name: name of the table
+        @param column_name: name of the column
+        """
+        cr.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if not cr.fetchone():
+            return
+        cr.execute(f'''
+            CREATE INDEX IF NOT EXISTS "{table_name}_{column_name}_trgm_index"
+            ON "{table_name}" USING gin ("{column_name}" gin_trgm_ops)''')
@@ -4,6 +4,9 @@ from urllib import parse
 from odoo.http import Response
 from odoo.tools import date_utils
 
+from .call_metrics import CallMetrics
+from .response_encoder import ResponseEncoder
+
 
 def extract_pretty_error_test(error):
     """
@@ -38,9 +41,16 @@ def prepare_response_to_plain_json(self, result=None, error=None):
         response = result
     mime = 'application/json'
     body = json.dumps(response, default=date_utils.json_default)
+    headers = [('Content-Type', mime)]
+    compression = getattr(self, 'clv_response_compression', None)
+    if compression and error is None:
+        body = ResponseEncoder.compress(body.encode(), compression)
+        headers.append(('Content-Encoding', compression))
+    headers.append(('Content-Length', len(body)))
+    CallMetrics.finish(self, len(body), error is not None)
     return Response(
         body, status=error and error.pop('http_status', default_http_code) or default_http_code,
-        headers=[('Content-Type', mime), ('Content-Length', len(body))]
+        headers=headers
     )
 
 
@@ -58,7 +68,17 @@ class ControllerHelperBase:
         self._ensure_plain_response(request)
         json_dict = self._get_json_request(request)
         query_dict = dict(parse.parse_qsl(parse.urlsplit(request.httprequest.url).query))
-        return {**json_dict, **query_dict}
+        params = {**json_dict, **query_dict}
+        CallMetrics.set_type_name(request, params)
+        return params
+
+    def set_response_compression(self, request, compression: Union[str, None]):
+        """
+        Requests compression of the plain response body ('gzip', 'deflate' or None)
+        @param request:
+        @param compression:
+        """
+        request.clv_response_compression = compression
 
     def convert_int_query_parameter(self, value: Union[str, None], param_name: str) -> Union[int, None]:
         """
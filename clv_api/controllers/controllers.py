@@ -5,6 +5,7 @@ from odoo.http import request, Response
 from odoo.tools import date_utils
 from urllib import parse
 
+from .call_metrics import CallMetrics
 from .clv_settings_provider import ClvSettingsProvider
 from .controller_helper_v13 import ControllerHelperV13
 from .controller_helper_v14 import ControllerHelperV14
@@ -13,6 +14,9 @@ from .controller_helper_v16 import ControllerHelperV16
 from .controller_helper_v17 import ControllerHelperV17
 from .inventory import InventoryImpl
 from .documents import DocumentImpl
+from .export import ExportImpl
+from .response_encoder import ResponseEncoder
+from .stock_quantity import StockQuantity
 from .tables import TablesImpl
 from odoo.release import version_info
 
@@ -29,6 +33,8 @@ class ClvApi(http.Controller):
     _documents_impl = DocumentImpl()
     # implementation of the /tables endpoints
     _tables_impl = TablesImpl()
+    # implementation of the /export endpoints
+    _export_impl = ExportImpl()
 
     # controller's helpers to validate input and output objects/dictionaries
     _controller_helpers = {
@@ -85,9 +91,11 @@ class ClvApi(http.Controller):
         return {}
 
     @http.route('/Inventory/getItems', type='json', auth="user", methods=['POST'])
+    @CallMetrics.instrument
     def inventory_get_items(self, **kw):
         """
         /Inventory/getItems endpoint implementation. Used to get page of inventory items.
+        If 'continuationToken' is passed, the page follows the last item of the previous page instead of 'offset'.
         @param kw:
         @return: Dictionary as described in Inventory API swagger model
         """
@@ -97,13 +105,15 @@ class ClvApi(http.Controller):
         limit = self._controller_helper.convert_int_query_parameter(params.get('limit'), 'limit')
         request_count = self._controller_helper.convert_bool_query_parameter(params.get('requestCount'), 'requestCount')
 
-        return self._inventory_impl.get_items(http.request.env,
+        return self._inventory_impl.get_items(self._get_inventory_env(params),
                                               params.get('parentId'),
                                               offset,
                                               limit,
-                                              request_count)
+                                              request_count,
+                                              params.get('continuationToken'))
 
     @http.route('/Inventory/getItemsByString', type='json', auth="user", methods=['POST'])
+    @CallMetrics.instrument
     def inventory_get_items_by_string(self, **kw):
         """
         '/Inventory/getItemsByString' endpoint implementation. Used to search inventory items by string match.
@@ -116,13 +126,15 @@ class ClvApi(http.Controller):
         limit = self._controller_helper.convert_int_query_parameter(params.get('limit'), 'limit')
         request_count = self._controller_helper.convert_bool_query_parameter(params.get('requestCount'), 'requestCount')
 
-        return self._inventory_impl.get_items_by_string(http.request.env,
+        return self._inventory_impl.get_items_by_string(self._get_inventory_env(params),
                                                         params.get('matchString'),
                                                         offset,
                                                         limit,
-                                                        request_count)
+                                                        request_count,
+                                                        params.get('continuationToken'))
 
     @http.route('/Inventory/getItemsByIds', type='json', auth="user", methods=['POST'])
+    @CallMetrics.instrument
     def inventory_get_items_by_ids(self, **kw):
         """
         '/Inventory/getItemsByIds' endpoint implementation. Used to get inventory items with specified UOM ids.
@@ -130,9 +142,10 @@ class ClvApi(http.Controller):
         @return: Dictionary as described in Inventory API swagger model
         """
         params = self._controller_helper.preprocess_request(request)
-        return self._inventory_impl.get_items_by_ids(http.request.env, params.get('idList'))
+        return self._inventory_impl.get_items_by_ids(self._get_inventory_env(params), params.get('idList'))
 
     @http.route('/Inventory/getItemsBySearchCode', type='json', auth="user", methods=['POST'])
+    @CallMetrics.instrument
     def inventory_get_items_by_search_code(self, **kw):
         """
         '/Inventory/getItemsBySearchCode' implementation. Used to search inventory Item by id, marking or barcode.
@@ -140,11 +153,12 @@ class ClvApi(http.Controller):
         @return: Dictionary as described in Inventory API swagger model
         """
         params = self._controller_helper.preprocess_request(request)
-        return self._inventory_impl.get_items_by_search_code(http.request.env,
+        return self._inventory_impl.get_items_by_search_code(self._get_inventory_env(params),
                                                              params.get('searchMode'),
                                                              params.get('searchData'))
 
     @http.route('/Documents/getDocumentDescriptions', auth='user', type='json', methods=['POST'])
+    @CallMetrics.instrument
     def get_documents_desc(self, **kw):
         """
         '/Documents/getDocumentDescriptions' endpoint implementation. Used to get list of document's headers
@@ -157,50 +171,204 @@ class ClvApi(http.Controller):
         limit = self._controller_helper.convert_int_query_parameter(params.get('limit'), 'limit')
         request_count = self._controller_helper.convert_bool_query_parameter(params.get('requestCount'), 'requestCount')
 
-        return self._documents_impl.get_descriptions(http.request.env,
+        return self._documents_impl.get_descriptions(self._get_counting_env(params),
                                                      params.get('documentTypeName'),
                                                      offset,
                                                      limit,
-                                                     request_count)
+                                                     request_count,
+                                                     params.get('continuationToken'))
 
     @http.route('/Documents/getDocument', auth='user', type='json', methods=['POST'])
+    @CallMetrics.instrument
     def get_document(self, **kw):
         """
         '/Documents/getDocument' endpoint implementation. Used to get full document (with expected and actual lines).
+        If 'pagedExpectedLines' is true, stock taking document is returned without expected lines
+        (see '/Documents/getExpectedLines').
         @param kw:
         @return: Dictionary as described in Inventory API swagger model
         """
         params = self._controller_helper.preprocess_request(request)
+        paged_expected_lines = self._controller_helper.convert_bool_query_parameter(params.get('pagedExpectedLines'),
+                                                                                    'pagedExpectedLines')
         return self._documents_impl.get_document(http.request.env,
                                                  params.get('searchMode'),
                                                  params.get('searchCode'),
-                                                 params.get('documentTypeName'))
+                                                 params.get('documentTypeName'),
+                                                 bool(paged_expected_lines))
+
+    @http.route('/Documents/getExpectedLines', auth='user', type='json', methods=['POST'])
+    @CallMetrics.instrument
+    def get_expected_lines(self, **kw):
+        """
+        '/Documents/getExpectedLines' endpoint implementation. Used to get page of the stock taking document's
+        expected lines (optionally of the location 'locationId' and its children only).
+        If 'continuationToken' is passed, the page follows the last line of the previous page instead of 'offset'.
+        @param kw:
+        @return: Dictionary with 'result' list of expected lines, 'totalCount' and 'continuationToken'
+        """
+        params = self._controller_helper.preprocess_request(request)
+
+        offset = self._controller_helper.convert_int_query_parameter(params.get('offset'), 'offset')
+        limit = self._controller_helper.convert_int_query_parameter(params.get('limit'), 'limit')
+        request_count = self._controller_helper.convert_bool_query_parameter(params.get('requestCount'), 'requestCount')
+
+        return self._documents_impl.get_expected_lines(self._get_counting_env(params),
+                                                       params.get('documentTypeName'),
+                                                       params.get('searchCode'),
+                                                       params.get('locationId'),
+                                                       offset,
+                                                       limit,
+                                                       request_count,
+                                                       params.get('continuationToken'))
 
     @http.route('/Documents/setDocument', auth='user', type='json', methods=['POST'])
+    @CallMetrics.instrument
     def set_document(self, **kw):
         """
         '/Documents/setDocument' endpoint implementation. Used to process finished document in odoo.
+        If 'async' parameter is true, the document is queued to be processed in background
+        and the job's status is returned (see '/Documents/getSetDocumentStatus').
         @param kw:
         """
         params = self._controller_helper.preprocess_request(request)
+        is_async = self._controller_helper.convert_bool_query_parameter(params.get('async'), 'async')
+        if is_async:
+            return self._documents_impl.set_document_async(http.request.env,
+                                                           params.get('document'),
+                                                           params.get('deviceInfo'))
         return self._documents_impl.set_document(http.request.env, params.get('document'), params.get('deviceInfo'))
 
+    @http.route('/Documents/getSetDocumentStatus', auth='user', type='json', methods=['POST'])
+    @CallMetrics.instrument
+    def get_set_document_status(self, **kw):
+        """
+        '/Documents/getSetDocumentStatus' endpoint implementation.
+        Used to poll status of the document queued by '/Documents/setDocument' in async mode.
+        @param kw:
+        @return: Dictionary with 'jobId', 'status' (queued, running, done, failed or notFound) and 'errorMessage'
+        """
+        params = self._controller_helper.preprocess_request(request)
+        return self._documents_impl.get_set_document_status(http.request.env, params.get('jobId'))
+
     @http.route('/Tables/getTable', auth='user', type='json', methods=['POST'])
+    @CallMetrics.instrument
     def tables_get_items(self, **kw):
         """
         '/Tables/getTable' endpoint implementation. Used to get table's rows page by query.
+        If 'syncCursor' is passed, only rows changed since the previous synchronization are returned
+        (with deleted rows and the cursor for the next synchronization).
+        If 'continuationToken' is passed, the page follows the last row of the previous page instead of 'offset'.
+        Compact format and compression of the rows may be requested by 'deviceInfo' (see ResponseEncoder).
+        If 'ifUnchanged' is passed, the response contains 'versionStamp' of the rows (supported by reference tables).
+        If it equals to the passed one, only {'notModified': true} is returned.
+        If 'warehouseStockQuantity' is true, stock quantities of the inventory table are of the device's warehouse.
         @param kw:
         @return: Dictionary as described in Inventory API swagger model
         """
         params = self._controller_helper.preprocess_request(request)
+        self._controller_helper.set_response_compression(
+            request, ResponseEncoder.get_response_compression(params.get('deviceInfo')))
 
         offset = self._controller_helper.convert_int_query_parameter(params.get('offset'), 'offset')
         limit = self._controller_helper.convert_int_query_parameter(params.get('limit'), 'limit')
         request_count = self._controller_helper.convert_bool_query_parameter(params.get('requestCount'), 'requestCount')
 
-        return self._tables_impl.get_rows(http.request.env,
+        return self._tables_impl.get_rows(self._get_inventory_env(params),
                                           params.get('query'),
                                           params.get('deviceInfo'),
                                           offset,
                                           limit,
-                                          request_count)
+                                          request_count,
+                                          params.get('syncCursor'),
+                                          params.get('continuationToken'),
+                                          params.get('ifUnchanged'))
+
+    @http.route('/Tables/getTables', auth='user', type='json', methods=['POST'])
+    @CallMetrics.instrument
+    def tables_get_items_batch(self, **kw):
+        """
+        '/Tables/getTables' endpoint implementation. Used to get rows of several tables by single request
+        (e.g. to bootstrap the mobile device). All queries are executed in the same transaction,
+        so the returned rows are consistent with each other.
+        'tableRequests' is the list of dictionaries with the same parameters as '/Tables/getTable' has:
+        'query', 'offset', 'limit', 'requestCount', 'syncCursor', 'continuationToken' and 'ifUnchanged'
+        ('warehouseStockQuantity' is passed once for all the tables).
+        @param kw:
+        @return: Dictionary with 'results' list containing result of each table request in the same order
+        """
+        params = self._controller_helper.preprocess_request(request)
+        self._controller_helper.set_response_compression(
+            request, ResponseEncoder.get_response_compression(params.get('deviceInfo')))
+
+        table_requests = []
+        for table_params in params.get('tableRequests') or []:
+            table_requests.append({
+                'query': table_params.get('query'),
+                'offset': self._controller_helper.convert_int_query_parameter(
+                    self._to_query_parameter(table_params.get('offset')), 'offset'),
+                'limit': self._controller_helper.convert_int_query_parameter(
+                    self._to_query_parameter(table_params.get('limit')), 'limit'),
+                'request_count': self._controller_helper.convert_bool_query_parameter(
+                    self._to_query_parameter(table_params.get('requestCount')), 'requestCount'),
+                'sync_token': table_params.get('syncCursor'),
+                'page_token': table_params.get('continuationToken'),
+                'if_unchanged_token': table_params.get('ifUnchanged')
+            })
+
+        return self._tables_impl.get_rows_batch(self._get_inventory_env(params),
+                                                table_requests,
+                                                params.get('deviceInfo'))
+
+    # noinspection PyMethodMayBeStatic
+    def _to_query_parameter(self, value):
+        """
+        Converts value of JSON body parameter (int, bool or str) to the query parameter string
+        """
+        if value is None:
+            return None
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        return str(value)
+
+    @http.route('/Export/getWarehouseData', auth='user', type='http', methods=['GET', 'POST'], csrf=False)
+    def export_warehouse_data(self, **kw):
+        """
+        '/Export/getWarehouseData' endpoint implementation. Used to provision the new mobile device:
+        streams inventory items (with units of measure), series and stock of the warehouse 'warehouseId'
+        by single response of newline-delimited JSON (see ExportImpl).
+        @param kw:
+        @return: streamed response
+        """
+        # the warehouse is checked before streaming to return error status
+        self._export_impl.get_warehouse(request.env, kw.get('warehouseId'))
+
+        stream = self._export_impl.stream_warehouse_data(request.env.cr.dbname,
+                                                         request.env.uid,
+                                                         dict(request.env.context),
+                                                         kw.get('warehouseId'))
+        return Response(stream, mimetype='application/x-ndjson', direct_passthrough=True)
+
+    def _get_counting_env(self, params):
+        """
+        Returns environment of the request.
+        If 'estimateCount' parameter is true, total number of records of huge tables is estimated
+        by the query planner instead of the exact counting.
+        """
+        estimate_count = self._controller_helper.convert_bool_query_parameter(params.get('estimateCount'), 'estimateCount')
+        if estimate_count:
+            return http.request.env(context=dict(http.request.env.context, clv_estimate_count=True))
+        return http.request.env
+
+    def _get_inventory_env(self, params):
+        """
+        Returns environment of the requests returning stock quantities of the items.
+        If 'warehouseStockQuantity' parameter is true, stock quantities are computed for the warehouse of the device
+        ('warehouseId' of 'deviceInfo') instead of all warehouses.
+        """
+        env = self._get_counting_env(params)
+        warehouse_stock_quantity = self._controller_helper.convert_bool_query_parameter(
+            self._to_query_parameter(params.get('warehouseStockQuantity')), 'warehouseStockQuantity')
+        if warehouse_stock_quantity:
+            return StockQuantity.with_device_warehouse(env, params.get('deviceInfo'))
+        return env
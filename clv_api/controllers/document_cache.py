@@ -0,0 +1,150 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Union
+
+from odoo.api import Environment
+from odoo.release import version_info
+from odoo.tools import date_utils
+
+from .common_utils import CommonUtils
+
+
+class DocumentCache:
+    """
+    Worker's cache of the serialized Inventory API documents converted from stock.picking.
+    Each entry is stored with the version of the picking: digest of the write dates of the picking
+    (with its partner, picking type, warehouse and locations), of its moves (with their products, units and locations)
+    and of its move lines (with their lots, units and locations). Cached document is returned only if the version
+    probed by single query is not changed, so repeated opening of the same picking does not convert it again.
+    Entries of the modified pickings are evicted by stock.picking and stock.move.line hooks of the worker,
+    other workers detect the modification (also of the related records) by the version.
+    Entries are separate for each user as the lines are read with the user's record rules.
+    """
+
+    # the maximum number of cached documents
+    _cache_size = 256
+
+    _entries = OrderedDict()
+    _lock = threading.Lock()
+
+    _cutils = CommonUtils()
+
+    @classmethod
+    def get(cls, env: Environment, picking_id: int, key: tuple) -> Union[dict, None]:
+        """
+        Returns cached document if its picking is not modified
+        @param env: Environment
+        @param picking_id: id of the stock.picking
+        @param key: additional key of the document (conversion arguments)
+        @return: copy of the cached document or None
+        """
+        entry_key = cls._get_entry_key(env, picking_id, key)
+        with cls._lock:
+            entry = cls._entries.get(entry_key)
+        if entry is None:
+            return None
+
+        (version, payload) = entry
+        if version != cls.get_version(env, picking_id):
+            with cls._lock:
+                cls._entries.pop(entry_key, None)
+            return None
+
+        with cls._lock:
+            if entry_key in cls._entries:
+                cls._entries.move_to_end(entry_key)
+        return json.loads(payload)
+
+    @classmethod
+    def put(cls, env: Environment, picking_id: int, key: tuple, version: Union[str, None], document: dict):
+        """
+        Stores the document converted from the picking
+        @param env: Environment
+        @param picking_id: id of the stock.picking
+        @param key: additional key of the document (conversion arguments)
+        @param version: version of the picking probed before the conversion (see get_version)
+        @param document: Inventory API document
+        """
+        if version is None:
+            return
+        payload = json.dumps(document, default=date_utils.json_default)
+        with cls._lock:
+            cls._entries[cls._get_entry_key(env, picking_id, key)] = (version, payload)
+            while len(cls._entries) > cls._cache_size:
+                cls._entries.popitem(last=False)
+
+    @classmethod
+    def invalidate(cls, db_name: str, picking_ids):
+        """
+        Removes cached documents of the pickings
+        @param db_name: name of the database
+        @param picking_ids: ids of the stock.picking
+        """
+        picking_ids = set(picking_ids)
+        if not picking_ids:
+            return
+        with cls._lock:
+            for entry_key in [entry_key for entry_key in cls._entries
+                              if entry_key[0] == db_name and entry_key[1] in picking_ids]:
+                del cls._entries[entry_key]
+
+    @classmethod
+    def get_version(cls, env: Environment, picking_id: int) -> Union[str, None]:
+        """
+        Returns version of the picking (None if the picking is not found)
+        @param env: Environment
+        @param picking_id: id of the stock.picking
+        @return:
+        """
+        cls._flush_pickings(env)
+        lot_table = env[cls._cutils.get_stock_lot_env_name()]._table
+        env.cr.execute(f'''
+            SELECT
+                concat_ws(':', p.write_date, partner.write_date, spt.write_date, wh.write_date,
+                          src.write_date, dest.write_date),
+                (SELECT md5(string_agg(concat_ws(':', m.id, m.write_date, pp.write_date, pt.write_date,
+                                                 uom.write_date, m_src.write_date, m_dest.write_date), ','
+                                       ORDER BY m.id))
+                 FROM stock_move m
+                 JOIN product_product pp ON pp.id = m.product_id
+                 JOIN product_template pt ON pt.id = pp.product_tmpl_id
+                 LEFT JOIN uom_uom uom ON uom.id = m.product_uom
+                 LEFT JOIN stock_location m_src ON m_src.id = m.location_id
+                 LEFT JOIN stock_location m_dest ON m_dest.id = m.location_dest_id
+                 WHERE m.picking_id = p.id),
+                (SELECT md5(string_agg(concat_ws(':', ml.id, ml.write_date, lot.write_date, ml_uom.write_date,
+                                                 ml_src.write_date, ml_dest.write_date), ','
+                                       ORDER BY ml.id))
+                 FROM stock_move_line ml
+                 LEFT JOIN "{lot_table}" lot ON lot.id = ml.lot_id
+                 LEFT JOIN uom_uom ml_uom ON ml_uom.id = ml.product_uom_id
+                 LEFT JOIN stock_location ml_src ON ml_src.id = ml.location_id
+                 LEFT JOIN stock_location ml_dest ON ml_dest.id = ml.location_dest_id
+                 WHERE ml.picking_id = p.id)
+            FROM stock_picking p
+            LEFT JOIN res_partner partner ON partner.id = p.partner_id
+            LEFT JOIN stock_picking_type spt ON spt.id = p.picking_type_id
+            LEFT JOIN stock_warehouse wh ON wh.id = spt.warehouse_id
+            LEFT JOIN stock_location src ON src.id = p.location_id
+            LEFT JOIN stock_location dest ON dest.id = p.location_dest_id
+            WHERE p.id = %s
+        ''', [picking_id])
+        row = env.cr.fetchone()
+        if not row:
+            return None
+        return '|'.join(str(value) for value in row)
+
+    @staticmethod
+    def _get_entry_key(env: Environment, picking_id: int, key: tuple) -> tuple:
+        return (env.cr.dbname, picking_id, env.uid, tuple(env.companies.ids), env.context.get('lang')) + tuple(key)
+
+    @classmethod
+    def _flush_pickings(cls, env: Environment):
+        # pending ORM updates must be written before the raw query
+        for model_name in ['stock.picking', 'stock.move', 'stock.move.line', cls._cutils.get_stock_lot_env_name(),
+                           'res.partner', 'stock.picking.type', 'stock.warehouse', 'stock.location', 'uom.uom']:
+            if version_info[0] >= 16:
+                env[model_name].flush_model(['write_date'])
+            else:
+                env[model_name].flush(['write_date'])
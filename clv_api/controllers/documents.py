@@ -21,7 +21,8 @@ class DocumentImpl:
         'stocktaking': DocumentStockTakingImpl()
     }
 
-    def get_descriptions(self, env: Environment, document_type_name: str, offset, limit, request_count: bool):
+    def get_descriptions(self, env: Environment, document_type_name: str, offset, limit, request_count: bool,
+                         page_token: str = None):
         """
         Returns document's headers page by passed arguments
         @param env: Environment
@@ -29,28 +30,59 @@ class DocumentImpl:
         @param offset: offset of the requesting page
         @param limit:  maximum number of the records in returning result
         @param request_count: need to return total number of records in filter?
+        @param page_token: continuation token of the keyset pagination (None to use offset)
         @return:
         """
         if not document_type_name.lower() in self._doc_processors:
             return {'result': []}
-        return self._doc_processors[document_type_name.lower()].get_descriptions(env, document_type_name, offset, limit,
-                                                                                 request_count)
+        doc_processor = self._doc_processors[document_type_name.lower()]
+        if isinstance(doc_processor, DocumentStockTakingImpl):
+            # stock taking documents are never paged
+            return doc_processor.get_descriptions(env, document_type_name, offset, limit, request_count)
+        return doc_processor.get_descriptions(env, document_type_name, offset, limit, request_count, page_token)
 
-    def get_document(self, env: Environment, search_mode: str, search_code: str, document_type_name: str):
+    def get_document(self, env: Environment, search_mode: str, search_code: str, document_type_name: str,
+                     paged_expected_lines: bool = False):
         """
         Returns document with expected and actual(optional) lines
         @param env: Environment
         @param search_mode: How to find document
         @param search_code: Identifier using for the search process
         @param document_type_name: the document's type name
+        @param paged_expected_lines: return stock taking document without expected lines
+            (they are requested by get_expected_lines)
         @return:
         """
         if not document_type_name.lower() in self._doc_processors:
             return {'document': None}
 
+        if paged_expected_lines and document_type_name.lower() == 'stocktaking':
+            return self._doc_processors['stocktaking'].get_document(env, search_mode, search_code, document_type_name,
+                                                                    paged_expected_lines=True)
+
         return self._doc_processors[document_type_name.lower()].get_document(env, search_mode, search_code,
                                                                              document_type_name)
 
+    def get_expected_lines(self, env: Environment, document_type_name: str, search_code: str, location_id,
+                           offset, limit, request_count: bool, page_token: str = None):
+        """
+        Returns the page of document's expected lines. Supported by stock taking documents only,
+        whose expected lines are all stock of the warehouse.
+        @param env: Environment
+        @param document_type_name: the document's type name
+        @param search_code: id of the document
+        @param location_id: id of the location to return lines of this location and its children only (optional)
+        @param offset: offset of the requesting page
+        @param limit: maximum number of the lines in returning result
+        @param request_count: need to return total number of lines?
+        @param page_token: continuation token of the keyset pagination (None to use offset)
+        @return:
+        """
+        if not document_type_name or document_type_name.lower() != 'stocktaking':
+            return {'result': []}
+        return self._doc_processors['stocktaking'].get_expected_lines(env, search_code, location_id, offset, limit,
+                                                                      request_count, page_token)
+
     def set_document(self, env: Environment, doc, device_info):
         """
         Processes finished document in odoo (modify or add stock.move.lines and validates document)
@@ -62,3 +94,31 @@ class DocumentImpl:
         if not document_type_name.lower() in self._doc_processors:
             return 200
         return self._doc_processors[document_type_name.lower()].set_document(env, doc, device_info)
+
+    def set_document_async(self, env: Environment, doc, device_info):
+        """
+        Queues finished document to be processed in background.
+        Resubmitting of the same document returns the existing job.
+        @param env: Environment
+        @param doc: Inventory API document
+        @param device_info: Inventory API device info
+        @return: status of the document's job
+        """
+        if doc is None:
+            return 200
+        return env['clv_api.document_job'].enqueue(doc, device_info).to_status()
+
+    def get_set_document_status(self, env: Environment, job_id: str):
+        """
+        Returns status of the document's job queued by set_document_async
+        @param env: Environment
+        @param job_id: id of the job
+        @return:
+        """
+        job = env['clv_api.document_job'].sudo().search([
+            ('document_uid', '=', str(job_id)),
+            ('user_id', '=', env.uid)
+        ], limit=1)
+        if not job:
+            return {'jobId': job_id, 'status': 'notFound', 'errorMessage': None}
+        return job.to_status()
@@ -0,0 +1,183 @@
+from typing import Union
+
+from odoo.api import Environment
+
+from .common_utils import CommonUtils
+from .location_tree import LocationTree
+
+
+class SetDocumentBatch:
+    """
+    Holds odoo records needed to process the finished Inventory API document.
+    Products, move lines, lots and locations of the whole document are loaded once,
+    so the document lines are matched to the odoo's move lines in memory.
+    Updates of the existing move lines are collected (matching takes them into account) and written grouped
+    by values, new move lines are collected and created at once.
+    """
+    _cutils = CommonUtils()
+
+    def __init__(self, env: Environment, odoo_doc, actual_lines):
+        """
+        Ctor
+        @param env: Environment
+        @param odoo_doc: stock.picking document
+        @param actual_lines: actual lines of the Inventory API document
+        """
+        self._env = env
+        self._new_move_lines_values = []
+        self._move_line_updates = {}
+
+        product_ids = self._collect_int_values(actual_lines, 'inventoryItemId')
+        self._products = {product.id: product for product in env['product.product'].search([('id', 'in', product_ids)])}
+
+        # Locations are described by the cached snapshot of the location tree,
+        # storages scanned by barcode (instead of id) are resolved to location ids
+        self._location_tree = LocationTree(env)
+        self._storage_location_ids = {}
+        for line in actual_lines:
+            storage_id = line.get('firstStorageId')
+            if storage_id and not str(storage_id).isdigit():
+                location_id = self._location_tree.find_by_barcode(str(storage_id))
+                if location_id:
+                    self._storage_location_ids[str(storage_id)] = location_id
+
+        # The snapshot contains all locations, so the locations of the document are checked to be readable by the user
+        location_ids = set(self._collect_int_values(actual_lines, 'firstStorageId'))
+        location_ids.update(self._storage_location_ids.values())
+        self._readable_location_ids = set(env['stock.location'].search([('id', 'in', list(location_ids))]).ids)
+        self._storage_location_ids = {storage_id: location_id
+                                      for storage_id, location_id in self._storage_location_ids.items()
+                                      if location_id in self._readable_location_ids}
+
+        # All move lines of the document (with fields used by matching) are loaded by single query
+        move_lines = env['stock.move.line'].search([('picking_id', '=', odoo_doc.id)])
+        move_lines.mapped('lot_id.name')
+        product_move_line_ids = {}
+        for move_line in move_lines:
+            product_move_line_ids.setdefault(move_line.product_id.id, []).append(move_line.id)
+        self._product_move_lines = {product_id: move_lines.browse(move_line_ids).with_prefetch(move_lines._prefetch_ids)
+                                    for product_id, move_line_ids in product_move_line_ids.items()}
+
+        lot_names = list({line.get('serialNumber') or line.get('seriesName')
+                          for line in actual_lines if line.get('serialNumber') or line.get('seriesName')})
+        self._lots = {}
+        if lot_names:
+            lots = env[self._cutils.get_stock_lot_env_name()].search([
+                ('name', 'in', lot_names),
+                ('product_id', 'in', list(self._products.keys())),
+                ('company_id', '=', odoo_doc.company_id.id)
+            ])
+            for lot in lots:
+                self._lots.setdefault((lot.product_id.id, lot.name), lot)
+
+    def get_product(self, product_id):
+        """
+        Returns product by id (empty recordset if not found)
+        """
+        product_id = int(product_id) if str(product_id).isdigit() else 0
+        return self._products.get(product_id, self._env['product.product'])
+
+    def get_storage_location_id(self, line) -> Union[int, None]:
+        """
+        Returns id of the location of the line's first storage: the storage id
+        or id of the location found by the scanned barcode (None if the line has no known storage)
+        """
+        storage_id = line.get('firstStorageId')
+        if not storage_id:
+            return None
+        storage_id = str(storage_id)
+        if storage_id.isdigit():
+            return int(storage_id)
+        return self._storage_location_ids.get(storage_id)
+
+    def get_location(self, location_id: int):
+        """
+        Returns location of the location tree snapshot by id (None if not found or not readable by the user)
+        """
+        if location_id not in self._readable_location_ids:
+            return None
+        return self._location_tree.get(location_id)
+
+    def get_lot(self, product_id: int, lot_name: str):
+        """
+        Returns lot (or serial number) of the product by its name (empty recordset if not found)
+        """
+        return self._lots.get((product_id, lot_name), self._env[self._cutils.get_stock_lot_env_name()])
+
+    def rename_lot(self, lot, new_name: str):
+        """
+        Renames the lot keeping loaded lots up to date
+        """
+        self._lots.pop((lot.product_id.id, lot.name), None)
+        lot.update({'name': new_name})
+        self._lots.setdefault((lot.product_id.id, new_name), lot)
+
+    def find_move_lines(self, product_id: int, predicate=None):
+        """
+        Returns the document's move lines of the product matching the predicate
+        """
+        product_move_lines = self._product_move_lines.get(product_id, self._env['stock.move.line'])
+        if predicate is None:
+            return product_move_lines
+        return product_move_lines.filtered(predicate)
+
+    def get_move_line_value(self, move_line, field_name: str):
+        """
+        Returns value of the move line's field taking into account the collected update of the line
+        (values of relational fields are returned as recordsets)
+        """
+        values = self._move_line_updates.get(move_line.id)
+        if values is None:
+            return move_line[field_name]
+
+        if field_name in values:
+            field = move_line._fields[field_name]
+            if field.relational:
+                return self._env[field.comodel_name].browse(values[field_name] or [])
+            return values[field_name]
+
+        if field_name == 'quantity_product_uom' and 'quantity' in values:
+            # the stored computed field (Odoo 17) follows the updated quantity
+            return move_line.product_uom_id._compute_quantity(values['quantity'], move_line.product_id.uom_id,
+                                                              rounding_method='HALF-UP')
+        return move_line[field_name]
+
+    def update_move_line(self, move_line, values: dict):
+        """
+        Collects values of the existing move line to be written by apply_move_line_updates
+        """
+        self._move_line_updates.setdefault(move_line.id, {}).update(values)
+
+    def apply_move_line_updates(self):
+        """
+        Writes all collected updates of the move lines, lines with the same values are written at once
+        """
+        move_line_ids_by_values = {}
+        for move_line_id, values in self._move_line_updates.items():
+            move_line_ids_by_values.setdefault(tuple(sorted(values.items())), []).append(move_line_id)
+        for values, move_line_ids in move_line_ids_by_values.items():
+            self._env['stock.move.line'].browse(move_line_ids).write(dict(values))
+        self._move_line_updates = {}
+
+    def add_new_move_line(self, values: dict):
+        """
+        Adds values of the move line to be created by create_new_move_lines
+        """
+        self._new_move_lines_values.append(values)
+
+    def create_new_move_lines(self):
+        """
+        Creates all added move lines at once
+        """
+        if self._new_move_lines_values:
+            self._env['stock.move.line'].create(self._new_move_lines_values)
+            self._new_move_lines_values = []
+
+    # noinspection PyMethodMayBeStatic
+    def _collect_int_values(self, actual_lines, key: str):
+        result = set()
+        for line in actual_lines:
+            value = line.get(key)
+            if value is not None and str(value).isdigit():
+                result.add(int(value))
+        return list(result)
@@ -2,13 +2,17 @@ import logging
 import threading
 import uuid
 from abc import abstractmethod
-from typing import Optional
 
 from odoo.api import Environment
 from odoo.release import version_info
 
 from ..utils.stock_picking_by_actual_doc_factory import StockPickingByActualDocFactory
+from .clv_settings_provider import ClvSettingsProvider
+from .document_cache import DocumentCache
+from .documents_set_document_batch import SetDocumentBatch
 from .model_converter import ModelConverter
+from .page_cursor import PageCursor
+from .record_counter import RecordCounter
 from .common_utils import CommonUtils
 from .document_type_info import BusinessLocationType, DocumentTypeInfo
 
@@ -38,7 +42,8 @@ class DocumentStockPickingImplBase:
         """
         pass
 
-    def get_descriptions(self, env: Environment, document_type_name: str, offset, limit, request_count: bool):
+    def get_descriptions(self, env: Environment, document_type_name: str, offset, limit, request_count: bool,
+                         page_token: str = None):
         """
         Returns list of the document's headers
         @param env: Environment
@@ -46,17 +51,25 @@ class DocumentStockPickingImplBase:
         @param offset: offset in selected documents page
         @param limit: the maximum number of records in the result
         @param request_count: if need to return the total number of records in query
+        @param page_token: continuation token of the keyset pagination (None to use offset)
         @return:
         """
         if not self.is_support_document_type_name(document_type_name):
             return {'result': []}
         filter_list = self.get_stock_picking_filter(env, document_type_name)
-        documents = env['stock.picking'].search(filter_list, limit=limit, offset=offset, order='id DESC')
+        page_cursor = None
+        if page_token is not None:
+            page_cursor = PageCursor(page_token)
+            documents = page_cursor.search(env['stock.picking'], filter_list, limit, 'id DESC')
+        else:
+            documents = env['stock.picking'].search(filter_list, limit=limit, offset=offset, order='id DESC')
         result = {}
         if request_count:
-            result['totalCount'] = len(env['stock.picking'].search(filter_list))
-        result = {'result': [self._model_converter.stock_picking_to_doc_description(doc, document_type_name) for doc in
-                             documents]}
+            result['totalCount'] = RecordCounter.count(env['stock.picking'], filter_list)
+        result['result'] = [self._model_converter.stock_picking_to_doc_description(doc, document_type_name) for doc in
+                            documents]
+        if page_cursor and page_cursor.next_token:
+            result['continuationToken'] = page_cursor.next_token
         return result
 
     def get_document(self, env: Environment, search_mode: str, search_code: str, document_type_name: str):
@@ -84,15 +97,24 @@ class DocumentStockPickingImplBase:
 
         pick_doc = pick_docs[0]
         doc_type = self._cutils.get_document_type_info_by_document(pick_doc)
-        doc = self._model_converter.stock_picking_to_doc_description(pick_doc, document_type_name)
-        doc['expectedLines'] = self._model_converter.stock_picking_to_expected_lines(pick_doc)
         ignore_zero_qty_done_actuals = doc_type.actual_lines_ignores_zero_qty_done
         if doc_type.clv_api_name == "Ship":
-            ignore_zero_qty_done_actuals = not bool(
-                env['ir.config_parameter'].sudo().get_param('clv_api.clv_ship_expected_actual_lines'))
+            ignore_zero_qty_done_actuals = not ClvSettingsProvider(env).ship_expected_actual_lines
+
+        # Repeated opening of the not modified picking returns the document converted before
+        cache_key = (document_type_name, ignore_zero_qty_done_actuals)
+        cached_doc = DocumentCache.get(env, pick_doc.id, cache_key)
+        if cached_doc is not None:
+            doc_result_container['document'] = cached_doc
+            return doc_result_container
+        version = DocumentCache.get_version(env, pick_doc.id)
+
+        doc = self._model_converter.stock_picking_to_doc_description(pick_doc, document_type_name)
+        doc['expectedLines'] = self._model_converter.stock_picking_to_expected_lines(pick_doc)
         actual_lines = self._model_converter.stock_picking_to_actual_lines(pick_doc, ignore_zero_qty_done_actuals)
         if actual_lines and len(actual_lines) > 0:
             doc['actualLines'] = actual_lines
+        DocumentCache.put(env, pick_doc.id, cache_key, version, doc)
         doc_result_container['document'] = doc
         return doc_result_container
 
@@ -122,6 +144,9 @@ class DocumentStockPickingImplBase:
 
         self._logger.debug('Processing document %s, id = %s', odoo_doc.name, str(odoo_doc.id))
 
+        # Products, move lines, lots and locations of the whole document are loaded once
+        batch = SetDocumentBatch(env, odoo_doc, doc['actualLines'])
+
         not_processed = {}
         self._logger.debug('Stage 1 (edit existing lines)')
         for line in doc['actualLines']:
@@ -129,7 +154,8 @@ class DocumentStockPickingImplBase:
                                                    add_to_any_line=False,
                                                    add_new_line_if_not_declared=False,
                                                    assign_new_barcodes=True,
-                                                   with_locations=with_locations):
+                                                   with_locations=with_locations,
+                                                   batch=batch):
                 not_processed[line['uid']] = line
         self._logger.debug('Stage 1 done')
 
@@ -139,7 +165,10 @@ class DocumentStockPickingImplBase:
                                             add_to_any_line=True,
                                             add_new_line_if_not_declared=True,
                                             assign_new_barcodes=False,
-                                            with_locations=with_locations)
+                                            with_locations=with_locations,
+                                            batch=batch)
+        batch.apply_move_line_updates()
+        batch.create_new_move_lines()
         self._logger.debug('Stage 2 done')
 
         need_backorder = self._get_auto_create_backorder_setting(env)
@@ -203,7 +232,8 @@ class DocumentStockPickingImplBase:
                                    add_to_any_line: bool,
                                    add_new_line_if_not_declared: bool,
                                    assign_new_barcodes: bool,
-                                   with_locations: bool) -> bool:
+                                   with_locations: bool,
+                                   batch: SetDocumentBatch) -> bool:
         """
         The core of the processing document line. It either modifies an existing odoo's line or
         creates new one.
@@ -215,6 +245,7 @@ class DocumentStockPickingImplBase:
         @param add_new_line_if_not_declared: Can we add new line if there is no appropriate line to modify
         @param assign_new_barcodes: Assign barcode to the odoo product if it filled in line and absent in odoo?
         @param with_locations: Apply location's filter to find appropriate odoo's document line?
+        @param batch: preloaded records of the document
         @return:
         """
 
@@ -223,7 +254,7 @@ class DocumentStockPickingImplBase:
         if line['actualQuantity'] == 0:
             return False
 
-        odoo_product = env['product.product'].search([('id', '=', line['inventoryItemId'])])
+        odoo_product = batch.get_product(line['inventoryItemId'])
         if not odoo_product:
             raise Exception('product with id ' + line['inventoryItemId'] + ' not found')
 
@@ -245,73 +276,62 @@ class DocumentStockPickingImplBase:
 
         # Trying to find an exactly matching line
 
-        exactly_matching_line_filter = [
-            ('picking_id', '=', odoo_doc.id),
-            ('product_id', '=', odoo_product.id),
-            ('picked', '=', False)
-        ]
-
+        line_lot = None
         if with_serial:
-            sn = line['serialNumber']
-            exactly_matching_line_filter.append('|')
-            exactly_matching_line_filter.append(('lot_name', '=', sn))
-            exactly_matching_line_filter.append(('lot_id.name', '=', sn))
+            line_lot = line['serialNumber']
         elif with_series:
-            lot = line['seriesName']
-            exactly_matching_line_filter.append('|')
-            exactly_matching_line_filter.append(('lot_name', '=', lot))
-            exactly_matching_line_filter.append(('lot_id.name', '=', lot))
-
-        if with_locations and line.get('firstStorageId'):
-            location = line.get('firstStorageId')
-            if doc_type.main_location_type == BusinessLocationType.DEST:
-                exactly_matching_line_filter.append(('location_dest_id', '=', location))
-            elif doc_type.main_location_type == BusinessLocationType.SRC:
-                exactly_matching_line_filter.append(('location_id', '=', location))
-
-        found_lines = env['stock.move.line'].search(exactly_matching_line_filter)
+            line_lot = line['seriesName']
+
+        line_location_id = None
+        if with_locations:
+            line_location_id = batch.get_storage_location_id(line)
+
+        def is_exactly_matching_line(odoo_line):
+            if batch.get_move_line_value(odoo_line, 'picked'):
+                return False
+            if line_lot and batch.get_move_line_value(odoo_line, 'lot_name') != line_lot \
+                    and batch.get_move_line_value(odoo_line, 'lot_id').name != line_lot:
+                return False
+            if line_location_id:
+                if doc_type.main_location_type == BusinessLocationType.DEST:
+                    return batch.get_move_line_value(odoo_line, 'location_dest_id').id == line_location_id
+                elif doc_type.main_location_type == BusinessLocationType.SRC:
+                    return batch.get_move_line_value(odoo_line, 'location_id').id == line_location_id
+            return True
+
+        found_lines = batch.find_move_lines(odoo_product.id, is_exactly_matching_line)
         if found_lines and len(found_lines) == 1:
             exact_line = found_lines[0]
-            if self._get_quantity_done(exact_line) >= self._get_product_uom_qty(exact_line):
+            if self._get_quantity_done(exact_line, batch) >= self._get_product_uom_qty(exact_line, batch):
                 return True
 
         if not found_lines and (with_serial or with_series):
             # Trying to find lines with lot not specified
-            lot_not_specified_line_filter = [
-                ('picking_id', '=', odoo_doc.id),
-                ('product_id', '=', odoo_product.id),
-                ('lot_id', '=', False),
-                '|',
-                ('lot_name', '=', False),
-                ('lot_name', '=', ''),
-                ('picked', '=', False)
-            ]
-            found_lines = env['stock.move.line'].search(lot_not_specified_line_filter)
+            found_lines = batch.find_move_lines(
+                odoo_product.id,
+                lambda odoo_line: not batch.get_move_line_value(odoo_line, 'lot_id')
+                and not batch.get_move_line_value(odoo_line, 'lot_name')
+                and not batch.get_move_line_value(odoo_line, 'picked')
+            )
 
             # Trying to fine lines with any lot and with zero qty done to replace lot
             if not found_lines and add_to_any_line:
-                any_zero_qty_line_filter = [
-                    ('picking_id', '=', odoo_doc.id),
-                    ('product_id', '=', odoo_product.id),
-                    '|',
-                    (self._get_quantity_done_name(), '=', 0),
-                    ('picked', '=', False)
-                ]
-                found_lines = env['stock.move.line'].search(any_zero_qty_line_filter)
+                found_lines = batch.find_move_lines(
+                    odoo_product.id,
+                    lambda odoo_line: batch.get_move_line_value(odoo_line, self._get_quantity_done_name()) == 0
+                    or not batch.get_move_line_value(odoo_line, 'picked')
+                )
         elif not found_lines:
             if self._has_valid_binded_move_line(line):
-                found_lines = env['stock.move.line'].search([
-                    ('picking_id', '=', odoo_doc.id),
-                    ('product_id', '=', odoo_product.id),
-                    ('move_id', '=', int(line['bindedDocumentLineUid']))
-                ])
+                binded_move_id = int(line['bindedDocumentLineUid'])
+                found_lines = batch.find_move_lines(
+                    odoo_product.id,
+                    lambda odoo_line: odoo_line.move_id.id == binded_move_id
+                )
 
             # Trying to find any containing product line
             if not found_lines and add_to_any_line:
-                found_lines = env['stock.move.line'].search([
-                    ('picking_id', '=', odoo_doc.id),
-                    ('product_id', '=', odoo_product.id)
-                ])
+                found_lines = batch.find_move_lines(odoo_product.id)
 
         self._logger.debug('Found %d possible existing lines to update', len(found_lines))
 
@@ -319,13 +339,12 @@ class DocumentStockPickingImplBase:
         while line['actualQuantity'] > 0:
             if found_lines:
                 found_lines = found_lines.filtered(
-                    lambda odoo_line: self._get_product_uom_qty(odoo_line) > self._get_quantity_done(odoo_line)
+                    lambda odoo_line: self._get_product_uom_qty(odoo_line, batch) > self._get_quantity_done(odoo_line, batch)
                 )
 
-            if found_lines and with_locations and self._is_doc_line_has_storage_id(line):
-                location_id = int(line.get('firstStorageId'))
+            if found_lines and line_location_id:
                 found_lines = found_lines.filtered(
-                    lambda odoo_line: self._get_odoo_line_location_id(odoo_doc, odoo_line) == location_id
+                    lambda odoo_line: self._get_odoo_line_location_id(odoo_doc, odoo_line, batch) == line_location_id
                 )
 
             if not found_lines:
@@ -333,43 +352,47 @@ class DocumentStockPickingImplBase:
                 if not add_new_line_if_not_declared:
                     return False
                 self._logger.debug('Adding new line to the document')
-                self._add_new_move_line(env, odoo_doc, odoo_product, line)
+                self._add_new_move_line(env, odoo_doc, odoo_product, line, batch)
                 break
 
             found_line = found_lines[0]
             self._logger.debug('Updating odoo line %d', found_line.id)
-            less_qty = self._get_product_uom_qty(found_line) - self._get_quantity_done(found_line)
+            less_qty = self._get_product_uom_qty(found_line, batch) - self._get_quantity_done(found_line, batch)
             add_qty = min(less_qty, line['actualQuantity'])
-            self._logger.debug('Found exact line to update id = %d, serial = %s', found_line.id, found_line.lot_name)
+            self._logger.debug('Found exact line to update id = %d, serial = %s', found_line.id,
+                               batch.get_move_line_value(found_line, 'lot_name'))
             self._logger.debug('Adding quantity=%f, serial=%s, location_id=%s',
                                add_qty,
                                line.get('serialNumber'),
                                str(line.get('firstStorageId')))
 
             updating_dict = {
-                self._get_quantity_done_name(): self._get_quantity_done(found_line) + add_qty,
+                self._get_quantity_done_name(): self._get_quantity_done(found_line, batch) + add_qty,
                 'picked': True,
                 'company_id': odoo_doc.company_id.id
             }
 
+            found_line_lot_name = batch.get_move_line_value(found_line, 'lot_name')
+            found_line_lot = batch.get_move_line_value(found_line, 'lot_id')
             if with_serial and \
-                    found_line.lot_name != line.get('serialNumber') and \
-                    found_line.lot_id.name != line.get('serialNumber'):
-                self._process_fake_serial_number_in_lot_storage(env, odoo_doc, found_line, line)
-                self._set_lot_id_or_name_to_update_dict(updating_dict, env, line.get('serialNumber'), odoo_product.id)
+                    found_line_lot_name != line.get('serialNumber') and \
+                    found_line_lot.name != line.get('serialNumber'):
+                self._process_fake_serial_number_in_lot_storage(env, odoo_doc, found_line, line, batch)
+                self._set_lot_id_or_name_to_update_dict(updating_dict, env, line.get('serialNumber'), odoo_product.id, batch)
             elif with_series and \
-                    found_line.lot_name != line.get('seriesName') and \
-                    found_line.lot_id.name != line.get('seriesName'):
-                self._set_lot_id_or_name_to_update_dict(updating_dict, env, line.get('seriesName'), odoo_product.id)
+                    found_line_lot_name != line.get('seriesName') and \
+                    found_line_lot.name != line.get('seriesName'):
+                self._set_lot_id_or_name_to_update_dict(updating_dict, env, line.get('seriesName'), odoo_product.id, batch)
             else:
                 self._logger.debug('pass through odoo line lot_id = %s, lot_name = %s',
-                                   self._model_converter.clear_to_str(found_line.lot_id),
-                                   self._model_converter.clear_to_str(found_line.lot_name))
+                                   self._model_converter.clear_to_str(found_line_lot),
+                                   self._model_converter.clear_to_str(found_line_lot_name))
 
             if with_locations:
-                self._add_line_location_to_line_update_dict(env, odoo_doc, line, updating_dict)
+                self._add_line_location_to_line_update_dict(env, odoo_doc, line, updating_dict, batch)
 
-            found_line.write(updating_dict)
+            # existing move lines are written at once after all document lines are processed
+            batch.update_move_line(found_line, updating_dict)
             line['actualQuantity'] = line['actualQuantity'] - add_qty
 
             if line['actualQuantity'] > 0:
@@ -382,31 +405,29 @@ class DocumentStockPickingImplBase:
 
         return True
 
-    def _set_lot_id_or_name_to_update_dict(self, update_dict, env: Environment, new_lot: str, product_id: Optional[int] = None):
+    def _set_lot_id_or_name_to_update_dict(self, update_dict, env: Environment, new_lot: str, product_id: int,
+                                           batch: SetDocumentBatch):
         """
         Sets either existing lot_id or new new_lot name to update dict
         @param update_dict: update dictionary or the odoo line
         @param env: Environment
         @param new_lot: new lot name (series or serial number)
+        @param product_id: id of the lot's product
+        @param batch: preloaded records of the document (lots of the document's company)
         @return:
         """
-        stock_lot_entity_name = self._cutils.get_stock_lot_env_name()
-        domain_filter = [('name', '=', new_lot)]
-        if product_id:
-            domain_filter.append(('product_id', '=', product_id))
-        if update_dict.get('company_id'):
-            domain_filter.append(('company_id', '=', update_dict.get('company_id')))
-        found_lot = env[stock_lot_entity_name].search(domain_filter)
+        found_lot = batch.get_lot(product_id, new_lot)
         if found_lot:
-            update_dict['lot_id'] = found_lot[0].id
+            update_dict['lot_id'] = found_lot.id
             update_dict['lot_name'] = None
-            self._logger.debug('line setted existing lot = %s with id = %s', new_lot, str(found_lot[0].id))
+            self._logger.debug('line setted existing lot = %s with id = %s', new_lot, str(found_lot.id))
         else:
             update_dict['lot_id'] = None
             update_dict['lot_name'] = new_lot
             self._logger.debug('line creating new lot = %s', new_lot)
 
-    def _process_fake_serial_number_in_lot_storage(self, env: Environment, odoo_doc, odoo_line, line):
+    def _process_fake_serial_number_in_lot_storage(self, env: Environment, odoo_doc, odoo_line, line,
+                                                   batch: SetDocumentBatch):
         """
         Processes case when current odoo_line contains fake serial number.
         It replaces lots and serial table storage.
@@ -415,6 +436,7 @@ class DocumentStockPickingImplBase:
         @param odoo_doc: odoo document
         @param odoo_line: odoo line
         @param line: Inventory API line (dictionary)
+        @param batch: preloaded records of the document
         @return:
         """
 
@@ -423,28 +445,14 @@ class DocumentStockPickingImplBase:
             return
 
         new_serial = line.get('serialNumber')
-        if not new_serial or not odoo_line.lot_id or not self._cutils.is_fake_serial_number(odoo_line.lot_id.name):
+        odoo_line_lot = batch.get_move_line_value(odoo_line, 'lot_id')
+        if not new_serial or not odoo_line_lot or not self._cutils.is_fake_serial_number(odoo_line_lot.name):
             return
         # stock_lot_entity_name = 'stock.production.lot'
         # if version_info[0] >= 16:
         #     stock_lot_entity_name = 'stock.lot'
-        self._logger.debug('fake serial number ' + str(odoo_line.lot_id.name) + ' updating to ' + new_serial)
-        odoo_line.lot_id.update({'name': new_serial})
-
-    def _is_doc_line_has_storage_id(self, line):
-        """
-        Returns true if passed Inventory API line contains valid storage id.
-        @param line: Inventory API line
-        @return:
-        """
-        try:
-            testid = line.get('firstStorageId')
-            if not testid or not testid.isdigit():
-                return False
-            int(testid)
-            return True
-        except ValueError:
-            return False
+        self._logger.debug('fake serial number ' + str(odoo_line_lot.name) + ' updating to ' + new_serial)
+        batch.rename_lot(odoo_line_lot, new_serial)
 
     def _get_auto_create_backorder_setting(self, env: Environment) -> bool:
         """
@@ -453,7 +461,8 @@ class DocumentStockPickingImplBase:
         @return:
         """
 
-        return not bool(env['ir.config_parameter'].sudo().get_param('clv_api.clv_auto_create_backorders'))
+        # the setting is stored inverted (see ResConfigSettings.set_values)
+        return not ClvSettingsProvider(env).auto_create_backorders
 
     def _get_use_fake_serial_numbers(self, env: Environment) -> bool:
         """
@@ -461,52 +470,53 @@ class DocumentStockPickingImplBase:
         @param env: Environment
         @return:
         """
-        return bool(env['ir.config_parameter'].sudo().get_param('clv_api.clv_use_fake_serials_in_receiving'))
+        return ClvSettingsProvider(env).use_fake_serials_in_receiving
 
-    def _add_line_location_to_line_update_dict(self, env: Environment, odoo_doc, line, update_dict):
+    def _add_line_location_to_line_update_dict(self, env: Environment, odoo_doc, line, update_dict,
+                                               batch: SetDocumentBatch):
         """
         Adds location id to update dictionary
         @param env: Environment
         @param odoo_doc: odoo document
         @param line: Inventory API line
         @param update_dict: odoo's line update dictionary
+        @param batch: preloaded records of the document
         @return:
         """
-        if not self._is_doc_line_has_storage_id(line):
+        line_storage_id = batch.get_storage_location_id(line)
+        if not line_storage_id:
             return
-        line_storage_id = line.get('firstStorageId')
-        line_storage_id = int(line_storage_id)
-        line_location = env['stock.location'].search([('id', '=', line_storage_id)])
+        line_location = batch.get_location(line_storage_id)
         if not line_location:
             return
-        line_location = line_location[0]
 
         doc_type = self._cutils.get_document_type_info_by_document(odoo_doc)
         doc_location = self._cutils.get_doc_main_location(odoo_doc)
 
         # Verify if line's first storage id corresponds to the document location
 
-        if not line_location.parent_path.startswith(doc_location.parent_path):
+        if not line_location['parentPath'].startswith(doc_location.parent_path):
             raise RuntimeError('Document location=%s does not contain line location=%s',
-                               doc_location.parent_path, line_location.parent_path)
+                               doc_location.parent_path, line_location['parentPath'])
 
         if doc_type.main_location_type == BusinessLocationType.DEST:
-            update_dict['location_dest_id'] = line_location.id
+            update_dict['location_dest_id'] = line_location['id']
         else:
-            update_dict['location_id'] = line_location.id
+            update_dict['location_id'] = line_location['id']
 
-    def _get_odoo_line_location_id(self, odoo_doc, odoo_line):
+    def _get_odoo_line_location_id(self, odoo_doc, odoo_line, batch: SetDocumentBatch):
         """
         Returns expected ood's line location id (depends on the document type).
         @param odoo_doc: odoo document
         @param odoo_line: odoo's line
+        @param batch: preloaded records of the document (with collected updates of the lines)
         @return:
         """
         doc_type = self._cutils.get_document_type_info_by_document(odoo_doc)
         if doc_type.main_location_type == BusinessLocationType.DEST:
-            return odoo_line.location_dest_id.id
+            return batch.get_move_line_value(odoo_line, 'location_dest_id').id
         else:
-            return odoo_line.location_id.id
+            return batch.get_move_line_value(odoo_line, 'location_id').id
 
     def _assign_line_barcode_to_odoo_product(self, odoo_product, line):
         """
@@ -524,13 +534,15 @@ class DocumentStockPickingImplBase:
             return
         odoo_product.write({'barcode': barcode})
 
-    def _add_new_move_line(self, env: Environment, odoo_doc, odoo_product, line):
+    def _add_new_move_line(self, env: Environment, odoo_doc, odoo_product, line, batch: SetDocumentBatch):
         """
-        Creates and ads new stock.move.line to the odoo stock.picking document
+        Adds new stock.move.line to the odoo stock.picking document.
+        Lines are created at once by the batch after all document lines are processed.
         @param env: Environment
         @param odoo_doc: odoo document
         @param odoo_product: odoo product corresponds to adding line
         @param line: Inventory API line object
+        @param batch: preloaded records of the document
         @return:
         """
         new_item = {
@@ -546,11 +558,11 @@ class DocumentStockPickingImplBase:
         if self._has_valid_binded_move_line(line):
             new_item['move_id'] = int(line['bindedDocumentLineUid'])
         if odoo_product.product_tmpl_id.tracking == 'serial' and line.get('serialNumber'):
-            self._set_lot_id_or_name_to_update_dict(new_item, env, line.get('serialNumber'), odoo_product.id)
+            self._set_lot_id_or_name_to_update_dict(new_item, env, line.get('serialNumber'), odoo_product.id, batch)
         elif odoo_product.product_tmpl_id.tracking == 'lot' and line.get('seriesName'):
-            self._set_lot_id_or_name_to_update_dict(new_item, env, line.get('seriesName'), odoo_product.id)
-        self._add_line_location_to_line_update_dict(env, odoo_doc, line, new_item)
-        odoo_doc.move_line_ids_without_package.create(new_item)
+            self._set_lot_id_or_name_to_update_dict(new_item, env, line.get('seriesName'), odoo_product.id, batch)
+        self._add_line_location_to_line_update_dict(env, odoo_doc, line, new_item, batch)
+        batch.add_new_move_line(new_item)
 
     def _has_valid_binded_move_line(self, line) -> bool:
         """
@@ -571,30 +583,26 @@ class DocumentStockPickingImplBase:
         while len(list) > length:
             list.pop()
 
-    def _get_quantity_done(self, odoo_line):
+    def _get_quantity_done(self, odoo_line, batch: SetDocumentBatch):
         if version_info[0] == 17:
-            if odoo_line.picked:
-                return odoo_line.quantity
+            if batch.get_move_line_value(odoo_line, 'picked'):
+                return batch.get_move_line_value(odoo_line, 'quantity')
             return 0
-        return odoo_line.qty_done
+        return batch.get_move_line_value(odoo_line, 'qty_done')
 
     def _get_quantity_done_name(self):
         if version_info[0] == 17:
             return 'quantity'
         return 'qty_done'
 
-    def _get_product_uom_qty(self, odoo_line):
+    def _get_product_uom_qty(self, odoo_line, batch: SetDocumentBatch):
         """
         Returns valid reserved (expected) odoo line quantity
         @param odoo_line: odoo document line stock.move.line
+        @param batch: preloaded records of the document (with collected updates of the lines)
         @return:
         """
-        if version_info[0] == 17:
-            return odoo_line.quantity_product_uom
-        if version_info[0] >= 16:
-            return odoo_line.reserved_uom_qty
-        else:
-            return odoo_line.product_uom_qty
+        return batch.get_move_line_value(odoo_line, self._get_product_uom_qty_name())
 
     def _get_product_uom_qty_name(self):
         """
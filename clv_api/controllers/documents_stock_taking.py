@@ -8,6 +8,8 @@ from .clv_settings_provider import ClvSettingsProvider
 from .model_converter import ModelConverter
 from .common_utils import CommonUtils
 from .documents_utils import DocumentsUtils
+from .page_cursor import PageCursor
+from .record_counter import RecordCounter
 
 
 class DocumentStockTakingImpl:
@@ -25,6 +27,7 @@ class DocumentStockTakingImpl:
             offset: Union[int, None],
             limit: Union[int, None],
             request_count: Union[bool, None]):
+        # The number of stock taking documents equals to the number of warehouses, so they are never paged
 
         result = {}
         if request_count:
@@ -40,8 +43,69 @@ class DocumentStockTakingImpl:
             env: Environment,
             search_mode: str,
             search_code: str,
-            document_type_name: str):
+            document_type_name: str,
+            paged_expected_lines: bool = False):
+        # With paged_expected_lines the document is returned without expected lines,
+        # they are requested by pages using get_expected_lines
+
+        warehouse = self._find_warehouse(env, search_code)
+        if warehouse:
+            return self._generate_inv_adj_doc(warehouse, env, paged_expected_lines)
+
+        return None
+
+    def get_expected_lines(
+            self,
+            env: Environment,
+            search_code: str,
+            location_id: Union[str, None],
+            offset: Union[int, None],
+            limit: Union[int, None],
+            request_count: Union[bool, None],
+            page_token: Union[str, None] = None):
+        """
+        Returns the page of expected lines of the stock taking document
+        @param env: Environment
+        @param search_code: id of the document (warehouse)
+        @param location_id: id of the location to return lines of this location and its children only (optional)
+        @param offset: first line index to return
+        @param limit: the maximum number of lines to return
+        @param request_count: need to return total number of lines
+        @param page_token: continuation token of the keyset pagination (None to use offset)
+        @return:
+        """
+        warehouse = self._find_warehouse(env, search_code)
+        if not warehouse:
+            return {'result': []}
+
+        domain_filter = self._get_expected_stock_quants_domain(warehouse)
+        if location_id:
+            try:
+                location_odoo_id = int(location_id)
+            except (TypeError, ValueError):
+                raise RuntimeError(f'Location id \'{location_id}\' is invalid')
+            domain_filter.append(('location_id', 'child_of', location_odoo_id))
 
+        result = {}
+        if request_count:
+            result['totalCount'] = RecordCounter.count(env['stock.quant'], domain_filter)
+            result['result'] = []
+            return result
+
+        if page_token is not None:
+            page_cursor = PageCursor(page_token)
+            stock_quants = page_cursor.search(env['stock.quant'], domain_filter, limit, 'id ASC')
+            if page_cursor.next_token:
+                result['continuationToken'] = page_cursor.next_token
+        else:
+            stock_quants = env['stock.quant'].search(domain_filter, offset=offset, limit=limit, order='id ASC')
+
+        doc_id = self._model_converter.clear_to_str(warehouse.id)
+        result['result'] = [self._stock_quant_to_expected_line(stock_quant, doc_id) for stock_quant in stock_quants]
+        return result
+
+    # noinspection PyMethodMayBeStatic
+    def _find_warehouse(self, env: Environment, search_code: str):
         warehouse_id = CommonUtils.convert_warehouse_id_from_clv_to_odoo(search_code)
 
         found_warehouses = env['stock.warehouse'].search([
@@ -51,8 +115,7 @@ class DocumentStockTakingImpl:
         ])
 
         if found_warehouses and len(found_warehouses) > 0:
-            warehouse = found_warehouses[0]
-            return self._generate_inv_adj_doc(warehouse, env)
+            return found_warehouses[0]
 
         return None
 
@@ -81,7 +144,7 @@ class DocumentStockTakingImpl:
         # Odoo does not have any specific document for stock taking process,
         # therefore we generate fake inventory adjustment document for each Odoo warehouse.
         # So, count of inventory adjustment documents is equal to warehouse count.
-        return env['stock.warehouse'].searc_count([
+        return RecordCounter.count(env['stock.warehouse'], [
             ('active', '=', True),
             ('company_id.active', '=', True)
         ])
@@ -120,7 +183,7 @@ class DocumentStockTakingImpl:
 
         return descriptions
 
-    def _generate_inv_adj_doc(self, warehouse, env: Environment):
+    def _generate_inv_adj_doc(self, warehouse, env: Environment, paged_expected_lines: bool = False):
         # Odoo does not have any specific document for stock taking process,
         # therefore we generate fake inventory adjustment document for each Odoo warehouse.
         scan_locations = CommonUtils.is_storage_locations_enabled(env) \
@@ -143,48 +206,57 @@ class DocumentStockTakingImpl:
             'sourceDocumentType': 'StockTaking'
         }
 
-        stock_quants = env['stock.quant'].search([
-            ('warehouse_id', '=', warehouse.id),
-            ('location_id.active', '=', True)
-        ])
+        if paged_expected_lines:
+            doc['expectedLinesPaged'] = True
+            doc['expectedLines'] = []
+            doc['actualLines'] = []
+            return {'document': doc}
 
-        expected_lines = []
-        actual_lines = []
+        stock_quants = env['stock.quant'].search(self._get_expected_stock_quants_domain(warehouse))
 
-        for stock_quant in stock_quants:
-            if stock_quant.quantity <= 0 and not stock_quant.inventory_quantity_set and stock_quant.inventory_quantity <= 0:
-                continue
+        doc['expectedLines'] = [self._stock_quant_to_expected_line(stock_quant, doc['id']) for stock_quant in stock_quants]
+        doc['actualLines'] = []
 
-            expected_line = {
-                'uid': self._model_converter.clear_to_str(stock_quant.id),
-                'inventoryItemId': self._model_converter.clear_to_str(stock_quant.product_id.id),
-                'expectedQuantity': self._model_converter.clear_to_str(stock_quant.quantity),
-                'actualQuantity': self._model_converter.clear_to_str(stock_quant.inventory_quantity),
-                'unitOfMeasureId': self._model_converter.clear_to_str(stock_quant.product_uom_id.id),
-                'inventoryItemName': self._model_converter.clear_to_str(stock_quant.product_id.name),
-                'inventoryItemBarcode': self._model_converter.clear_to_str(stock_quant.product_id.barcode),
-                'unitOfMeasureName': self._model_converter.clear_to_str(stock_quant.product_uom_id.name),
-                'registrationDate': str(),
-                'documentId': self._model_converter.clear_to_str(doc['id']),
-                'lastChangeDate': str(),
-                'price': str(),
-                'purchasePrice': str(),
-                'sourceDocumentId': str(),
-                'firstStorageId': self._model_converter.clear_to_str(stock_quant.location_id.id)
-            }
-
-            if stock_quant.tracking == 'serial':
-                expected_line['serialNumber'] = self._model_converter.clear_to_str(stock_quant.lot_id.name)
-            elif stock_quant.tracking == 'lot':
-                expected_line['seriesId'] = self._model_converter.clear_to_str(stock_quant.lot_id.id)
-                expected_line['seriesName'] = self._model_converter.clear_to_str(stock_quant.lot_id.name)
+        return {'document': doc}
 
-            expected_lines.append(expected_line)
+    # noinspection PyMethodMayBeStatic
+    def _get_expected_stock_quants_domain(self, warehouse):
+        # Quants without stock and not counted are not expected
+        return [
+            ('warehouse_id', '=', warehouse.id),
+            ('location_id.active', '=', True),
+            '|', '|',
+            ('quantity', '>', 0),
+            ('inventory_quantity_set', '=', True),
+            ('inventory_quantity', '>', 0)
+        ]
+
+    def _stock_quant_to_expected_line(self, stock_quant, doc_id: str):
+        expected_line = {
+            'uid': self._model_converter.clear_to_str(stock_quant.id),
+            'inventoryItemId': self._model_converter.clear_to_str(stock_quant.product_id.id),
+            'expectedQuantity': self._model_converter.clear_to_str(stock_quant.quantity),
+            'actualQuantity': self._model_converter.clear_to_str(stock_quant.inventory_quantity),
+            'unitOfMeasureId': self._model_converter.clear_to_str(stock_quant.product_uom_id.id),
+            'inventoryItemName': self._model_converter.clear_to_str(stock_quant.product_id.name),
+            'inventoryItemBarcode': self._model_converter.clear_to_str(stock_quant.product_id.barcode),
+            'unitOfMeasureName': self._model_converter.clear_to_str(stock_quant.product_uom_id.name),
+            'registrationDate': str(),
+            'documentId': self._model_converter.clear_to_str(doc_id),
+            'lastChangeDate': str(),
+            'price': str(),
+            'purchasePrice': str(),
+            'sourceDocumentId': str(),
+            'firstStorageId': self._model_converter.clear_to_str(stock_quant.location_id.id)
+        }
 
-        doc['expectedLines'] = expected_lines
-        doc['actualLines'] = actual_lines
+        if stock_quant.tracking == 'serial':
+            expected_line['serialNumber'] = self._model_converter.clear_to_str(stock_quant.lot_id.name)
+        elif stock_quant.tracking == 'lot':
+            expected_line['seriesId'] = self._model_converter.clear_to_str(stock_quant.lot_id.id)
+            expected_line['seriesName'] = self._model_converter.clear_to_str(stock_quant.lot_id.name)
 
-        return {'document': doc}
+        return expected_line
 
     def _set_inv_adj_doc(self, doc, device_info, warehouse, env: Environment):
 
@@ -198,96 +270,166 @@ class DocumentStockTakingImpl:
         if bp_settings.get('RewriteAllStock'):
             rewrite_all_stock = str(bp_settings.get('RewriteAllStock')).lower() == 'true'
 
-        modified_stock_ids = []
-        if doc.get('actualLines'):
-            for actual_line in doc.get('actualLines'):
+        grouped_quantities = self._group_warehouse_actual_quantities(doc.get('actualLines'), warehouse, env)
+        if not grouped_quantities:
+            return
 
-                if actual_line.get('firstStorageId'):
-                    location_id = int(actual_line.get('firstStorageId'))
-                    if env['stock.location'].search_count([('id', '=', location_id), ('warehouse_id', '=', warehouse.id)]) < 1:
-                        raise RuntimeError('Document contains actual line with location of another warehouse')
+        product_ids = list({group_key[1] for group_key in grouped_quantities})
+        location_ids = list({group_key[0] for group_key in grouped_quantities})
+
+        # All quants of the counted products and locations are loaded at once
+        # (they are kept in the search order, the first one matches the line without lot)
+        quants_by_key = {}
+        quants_by_lot_key = {}
+        for stock_quant in env['stock.quant'].search([
+            ('product_id', 'in', product_ids),
+            ('location_id', 'in', location_ids),
+            ('warehouse_id', '=', warehouse.id),
+            ('company_id', '=', warehouse.company_id.id)
+        ]):
+            quant_key = (stock_quant.location_id.id, stock_quant.product_id.id, stock_quant.product_uom_id.id)
+            quants_by_key.setdefault(quant_key, []).append(stock_quant)
+            quants_by_lot_key.setdefault(quant_key + (stock_quant.lot_id.name,), stock_quant)
+
+        last_count_date = datetime.datetime.now()
+        # quantities added to the existing quants: quant id -> [quant, added quantity]
+        updated_quants = {}
+        # values of the quants to create: (location, product, uom, lot) -> values
+        new_quants = {}
+        for (group_key, actual_quantity) in grouped_quantities.items():
+            (location_id, product_id, uom_id, lot_name) = group_key
+            quant_key = (location_id, product_id, uom_id)
+
+            if lot_name:
+                existing_stock_quant = quants_by_lot_key.get(group_key)
+            else:
+                existing_stock_quant = (quants_by_key.get(quant_key) or [None])[0]
+
+            if existing_stock_quant:
+                updated_quant = updated_quants.get(existing_stock_quant.id)
+                # In case 'RewriteAllStock' option is disabled and 'stock.quant' line was not modified and was not scanned then skip it
+                if not updated_quant and not existing_stock_quant.inventory_quantity_set \
+                        and not rewrite_all_stock and actual_quantity == 0:
+                    continue
+                if updated_quant:
+                    updated_quant[1] += actual_quantity
                 else:
-                    location_id = warehouse.lot_stock_id.id
+                    updated_quants[existing_stock_quant.id] = [existing_stock_quant, actual_quantity]
+                continue
 
-                product_id = int(actual_line.get('inventoryItemId'))
-                uom_id = int(actual_line.get('unitOfMeasureId'))
+            new_quant_key = group_key
+            if not lot_name:
+                # the line without lot is added to any quant of the product created by previous lines
+                new_quant_key = next((key for key in new_quants if key[:3] == quant_key), group_key)
+            if new_quant_key in new_quants:
+                new_quants[new_quant_key]['inventory_quantity'] += actual_quantity
+                continue
 
-                lot_id = False
-                if actual_line.get('serialNumber'):
-                    lot_id = actual_line.get('serialNumber')
-                elif actual_line.get('seriesName'):
-                    lot_id = actual_line.get('seriesName')
+            new_quants[new_quant_key] = {
+                'product_id': product_id,
+                'product_uom_id': uom_id,
+                'location_id': location_id,
+                'quantity': 0,
+                'inventory_quantity': actual_quantity,
+                'inventory_quantity_set': True,
+                'last_count_date': last_count_date,
+                'warehouse_id': warehouse.id,
+                'company_id': warehouse.company_id.id
+            }
 
-                domain_filter = [
-                    ('product_id.id', '=', product_id),
-                    ('product_uom_id.id', '=', uom_id),
-                    ('location_id.id', '=', location_id),
-                    ('warehouse_id.id', '=', warehouse.id),
-                    ('company_id.id', '=', warehouse.company_id.id)
-                ]
-
-                if lot_id:
-                    domain_filter.append(('lot_id.name', '=', lot_id))
-
-                found_stock_quants = env['stock.quant'].search(domain_filter, limit=1)
-                if found_stock_quants and len(found_stock_quants) > 0:
-                    existing_stock_quant = found_stock_quants[0]
-
-                    # In case 'RewriteAllStock' option is disabled and 'stock.quant' line was not modified and was not scanned then skip it
-                    if not existing_stock_quant.inventory_quantity_set and not rewrite_all_stock and actual_line.get('actualQuantity') == 0:
-                        continue
-
-                    values = {
-                        'inventory_quantity': existing_stock_quant.inventory_quantity + actual_line.get('actualQuantity'),
-                        'inventory_quantity_set': True,
-                        'last_count_date': datetime.datetime.now()
-                    }
-                    existing_stock_quant.write(values)
-                    if existing_stock_quant.id not in modified_stock_ids:
-                        modified_stock_ids.append(existing_stock_quant.id)
-                    continue
+        for (stock_quant, added_quantity) in updated_quants.values():
+            stock_quant.write({
+                'inventory_quantity': stock_quant.inventory_quantity + added_quantity,
+                'inventory_quantity_set': True,
+                'last_count_date': last_count_date
+            })
 
-                new_stock_quant = {
-                    'product_id': product_id,
-                    'product_uom_id': uom_id,
-                    'location_id': location_id,
-                    'quantity': 0,
-                    'inventory_quantity': actual_line.get('actualQuantity'),
-                    'inventory_quantity_set': True,
-                    'last_count_date': datetime.datetime.now(),
-                    'warehouse_id': warehouse.id,
-                    'company_id': warehouse.company_id.id
-                }
-
-                if lot_id:
-                    found_lots = env['stock.lot'].search([
-                        ('product_id', '=', product_id),
-                        ('name', '=', lot_id),
-                        ('company_id', '=', warehouse.company_id.id)
-                    ], limit=1)
-                    if found_lots and len(found_lots) > 0:
-                        existing_lot = found_lots[0]
-                        new_stock_quant['lot_id'] = existing_lot.id
-                    else:
-                        new_lot = {
-                            'product_id': product_id,
-                            'name': lot_id,
-                            'company_id': warehouse.company_id.id
-                        }
-
-                        new_lot = env['stock.lot'].create(new_lot)
-                        new_stock_quant['lot_id'] = new_lot.id
-
-                new_stock_quant = env['stock.quant'].create(new_stock_quant)
-                if new_stock_quant.id not in modified_stock_ids:
-                    modified_stock_ids.append(new_stock_quant.id)
+        modified_stock_quants = env['stock.quant'].browse(list(updated_quants.keys()))
+        if new_quants:
+            self._set_new_quants_lots(new_quants, warehouse, env)
+            modified_stock_quants |= env['stock.quant'].create(list(new_quants.values()))
 
         if auto_apply_inventory_adjustment:
-            for stock_quant_id in modified_stock_ids:
-                stock_quant = env['stock.quant'].search([('id', '=', stock_quant_id)], limit=1)[0]
-                stock_quant \
-                    .with_context({f'inventory_name': self._generate_completed_inv_adj_doc_name(doc, device_info)}) \
-                    .action_apply_inventory()
+            self._apply_inventory(modified_stock_quants, self._generate_completed_inv_adj_doc_name(doc, device_info))
+
+    def _group_warehouse_actual_quantities(self, actual_lines, warehouse, env: Environment):
+        """
+        Groups actual quantities by (location, product, uom, lot name).
+        Lines without location are counted to the warehouse's stock location.
+        @param actual_lines: actual lines of the Inventory API document
+        @param warehouse: counted warehouse
+        @param env: Environment
+        @return: dictionary of the quantities in order of the lines
+        """
+        grouped_quantities = self._group_actual_quantities(actual_lines)
+
+        line_location_ids = list({group_key[0] for group_key in grouped_quantities if group_key[0] is not None})
+        if line_location_ids:
+            warehouse_location_count = env['stock.location'].search_count([
+                ('id', 'in', line_location_ids),
+                ('warehouse_id', '=', warehouse.id)
+            ])
+            if warehouse_location_count < len(line_location_ids):
+                raise RuntimeError('Document contains actual line with location of another warehouse')
+
+        result = {}
+        for ((location_id, product_id, uom_id, lot_name), actual_quantity) in grouped_quantities.items():
+            if location_id is None:
+                location_id = warehouse.lot_stock_id.id
+            group_key = (location_id, product_id, uom_id, lot_name or None)
+            result[group_key] = result.get(group_key, 0) + actual_quantity
+        return result
+
+    def _set_new_quants_lots(self, new_quants, warehouse, env: Environment):
+        """
+        Sets lots to the values of creating quants. Lots absent in odoo are created at once.
+        @param new_quants: values of the quants keyed by (location, product, uom, lot name)
+        @param warehouse: counted warehouse
+        @param env: Environment
+        """
+        lot_keys = {(key[1], key[3]) for key in new_quants if key[3]}
+        if not lot_keys:
+            return
+
+        lots = {}
+        for lot in env['stock.lot'].search([
+            ('product_id', 'in', list({lot_key[0] for lot_key in lot_keys})),
+            ('name', 'in', list({lot_key[1] for lot_key in lot_keys})),
+            ('company_id', '=', warehouse.company_id.id)
+        ]):
+            lots.setdefault((lot.product_id.id, lot.name), lot)
+
+        absent_lot_keys = [lot_key for lot_key in lot_keys if lot_key not in lots]
+        if absent_lot_keys:
+            new_lots = env['stock.lot'].create([{
+                'product_id': lot_key[0],
+                'name': lot_key[1],
+                'company_id': warehouse.company_id.id
+            } for lot_key in absent_lot_keys])
+            for (lot_key, new_lot) in zip(absent_lot_keys, new_lots):
+                lots[lot_key] = new_lot
+
+        for (key, values) in new_quants.items():
+            if key[3]:
+                values['lot_id'] = lots[(key[1], key[3])].id
+
+    def _apply_inventory(self, stock_quants, inventory_name: str):
+        """
+        Applies counted quantities of the quants.
+        Quants requiring user's confirmation in odoo (outdated or tracked without lot) are applied one by one,
+        so they do not prevent applying of the others.
+        @param stock_quants: modified quants
+        @param inventory_name: name of the inventory adjustment
+        """
+        stock_quants = stock_quants.with_context({'inventory_name': inventory_name})
+        confirmation_quants = stock_quants.filtered(
+            lambda quant: quant.is_outdated or (quant.product_id.tracking in ['lot', 'serial'] and not quant.lot_id)
+        )
+        batch_quants = stock_quants - confirmation_quants
+        if batch_quants:
+            batch_quants.action_apply_inventory()
+        for stock_quant in confirmation_quants:
+            stock_quant.action_apply_inventory()
 
     def _group_actual_quantities(self, actual_lines):
         result = {}
@@ -0,0 +1,151 @@
+import contextlib
+import json
+from datetime import datetime
+from typing import Iterator
+
+from odoo import api
+from odoo.api import Environment
+from odoo.modules.registry import Registry
+from odoo.release import version_info
+from odoo.tools import date_utils
+
+from .common_utils import CommonUtils
+from .model_converter import ModelConverter
+from .stock_quantity import StockQuantity
+
+
+class ExportImpl:
+    """
+    Implements full export of the warehouse data used to provision the new mobile device.
+    The data is streamed as newline-delimited JSON (one object per line):
+        {"type": "header", ...} - the first line with export information;
+        {"type": "inventoryItem", "inventoryItem": ..., "relatedData": ...} - inventory items with units of measure;
+        {"type": "series", "row": ...} - rows of the series table;
+        {"type": "stock", "row": ...} - rows of the stock table of the warehouse;
+        {"type": "footer", ...} - the last line with the numbers of exported objects.
+    Records are read by chunks in the order of ids and the ORM cache is cleared after each chunk,
+    so the memory used by the export does not depend on the size of the data.
+    """
+    _model_converter = ModelConverter()
+    _cutils = CommonUtils()
+
+    # the number of records read by single query
+    _chunk_size = 500
+
+    def get_warehouse(self, env: Environment, warehouse_id: str):
+        """
+        Returns active warehouse by Inventory API id
+        @param env: Environment
+        @param warehouse_id: Inventory API id of the warehouse
+        @return: stock.warehouse object
+        """
+        if not warehouse_id:
+            raise RuntimeError('Warehouse is not specified')
+
+        found_warehouses = env['stock.warehouse'].search([
+            ('active', '=', True),
+            ('company_id.active', '=', True),
+            ('id', '=', CommonUtils.convert_warehouse_id_from_clv_to_odoo(warehouse_id))
+        ])
+        if not found_warehouses:
+            raise RuntimeError('Unknown or inactive warehouse id')
+        return found_warehouses[0]
+
+    def stream_warehouse_data(self, db_name: str, uid: int, context: dict, warehouse_id: str) -> Iterator[bytes]:
+        """
+        Streams export of the warehouse data.
+        The stream is consumed after the request's cursor is closed, therefore it uses its own cursor.
+        @param db_name: name of the database
+        @param uid: id of the user
+        @param context: context of the request's environment
+        @param warehouse_id: Inventory API id of the warehouse
+        @return: iterator of the NDJSON lines
+        """
+        with contextlib.ExitStack() as stack:
+            if version_info[0] < 15:
+                stack.enter_context(api.Environment.manage())
+            cr = stack.enter_context(Registry(db_name).cursor())
+            env = api.Environment(cr, uid, context)
+            warehouse = self.get_warehouse(env, warehouse_id)
+            # stock quantities of the inventory items are the quantities of the exported warehouse
+            env = StockQuantity.with_warehouse(env, warehouse.id)
+            for line in self.export_warehouse_data(env, warehouse.with_env(env)):
+                yield (json.dumps(line, default=date_utils.json_default) + '\n').encode()
+
+    def export_warehouse_data(self, env: Environment, warehouse) -> Iterator[dict]:
+        """
+        Returns iterator of the exported objects of the warehouse (see the class description)
+        @param env: Environment
+        @param warehouse: stock.warehouse object
+        @return:
+        """
+        yield {
+            'type': 'header',
+            'warehouseId': CommonUtils.convert_warehouse_id_from_odoo_to_clv(warehouse.id),
+            'warehouseName': self._model_converter.clear_to_str(warehouse.name),
+            'exportDate': datetime.utcnow()
+        }
+
+        counts = {'inventoryItem': 0, 'series': 0, 'stock': 0}
+
+        for product_templates in self._read_chunks(env, 'product.template', [
+            (self._get_detailed_type_name(), '=', 'product'),
+            ('active', '=', True)
+        ]):
+            stock_quantities = self._model_converter.prefetch_product_templates(env, product_templates)
+            for prod_template in product_templates:
+                counts['inventoryItem'] += 1
+                yield {
+                    'type': 'inventoryItem',
+                    'inventoryItem': self._model_converter.product_template_to_inventory_item(env, prod_template),
+                    'relatedData': self._model_converter.product_template_to_related_data(env, prod_template,
+                                                                                          stock_quantities)
+                }
+
+        lots_domain_filter = [('product_id.product_tmpl_id.tracking', '=', 'lot')]
+        self._cutils.append_company_filter(lots_domain_filter, warehouse.company_id.id)
+        for lots in self._read_chunks(env, self._cutils.get_stock_lot_env_name(), lots_domain_filter):
+            for lot in lots:
+                counts['series'] += 1
+                yield {'type': 'series', 'row': self._model_converter.convert_odoo_lot_to_series(lot)}
+
+        for stock_quants in self._read_chunks(env, 'stock.quant', [
+            ('warehouse_id', '=', warehouse.id),
+            ('location_id.active', '=', True)
+        ]):
+            for stock_quant in stock_quants:
+                counts['stock'] += 1
+                yield {'type': 'stock', 'row': self._model_converter.convert_odoo_stock_quant_to_stock_row(stock_quant)}
+
+        yield {'type': 'footer', 'counts': counts}
+
+    def _read_chunks(self, env: Environment, model_name: str, domain_filter) -> Iterator:
+        """
+        Returns iterator of the recordsets matching the domain filter (by chunks in the order of ids).
+        The ORM cache is cleared after each chunk is processed.
+        """
+        last_id = 0
+        while True:
+            records = env[model_name].search(domain_filter + [('id', '>', last_id)], limit=self._chunk_size,
+                                             order='id ASC')
+            if not records:
+                return
+            last_id = records[-1].id
+            yield records
+            self._invalidate_cache(env)
+            if len(records) < self._chunk_size:
+                return
+
+    # noinspection PyMethodMayBeStatic
+    def _invalidate_cache(self, env: Environment):
+        if version_info[0] >= 16:
+            env.invalidate_all()
+        else:
+            env['base'].invalidate_cache()
+
+    # noinspection PyMethodMayBeStatic
+    def _get_detailed_type_name(self):
+        if version_info[0] <= 14:
+            return 'type'
+        else:
+            return 'detailed_type'
@@ -1,6 +1,9 @@
 from odoo.api import Environment
 from odoo.release import version_info
+from .barcode_utils import BarcodeUtils
 from .model_converter import ModelConverter
+from .page_cursor import PageCursor
+from .record_counter import RecordCounter
 
 
 class InventoryImpl:
@@ -9,7 +12,7 @@ class InventoryImpl:
     """
     _model_converter = ModelConverter()
 
-    def get_items(self, env: Environment, parent_id: str, offset, limit, request_count: bool):
+    def get_items(self, env: Environment, parent_id: str, offset, limit, request_count: bool, page_token: str = None):
         """
         Returns the page of the inventory items (products)
         @param env: Environment
@@ -17,6 +20,7 @@ class InventoryImpl:
         @param offset: the first record index to be returned
         @param limit: the maximum number of records
         @param request_count: Need to return total number of records
+        @param page_token: continuation token of the keyset pagination (None to use offset)
         @return:
         """
         result = {}
@@ -29,15 +33,12 @@ class InventoryImpl:
                 ('id', 'in', [int(template_id_for_folder)])
             ]
             if request_count:
-                result['totalCount'] = env['product.template'].search_count(domain_filter)
+                result['totalCount'] = RecordCounter.count(env['product.template'], domain_filter)
             templates = env['product.template'].search(domain_filter, limit=limit, offset=offset, order='id ASC')
             if not templates or len(templates) != 1:
                 raise Exception('No such folder with id ' + template_id_for_folder + ' found')
             template = templates[0]
-            for prod in template.product_variant_ids:
-                result_list.append(self._make_inventory_item_result(
-                    self._model_converter.product_to_inventory_item(env, prod),
-                    self._model_converter.product_to_related_data(env, prod)))
+            result_list = self._make_inventory_item_result_list(env, template.product_variant_ids)
         else:
             domain_filter = [
                 (self._get_detailed_type_name(), '=', 'product'),
@@ -45,18 +46,16 @@ class InventoryImpl:
             ]
 
             if request_count:
-                result['totalCount'] = env['product.template'].search_count(domain_filter)
-            product_templates = env['product.template'].search(domain_filter, limit=limit, offset=offset, order='id ASC')
-            for product_template in product_templates:
-                result_list.append(self._make_inventory_item_result(
-                    self._model_converter.product_template_to_inventory_item(env, product_template),
-                    self._model_converter.product_template_to_related_data(env, product_template)))
+                result['totalCount'] = RecordCounter.count(env['product.template'], domain_filter)
+            product_templates = self._search_templates_page(env, domain_filter, offset, limit, page_token, result)
+            result_list = self._make_inventory_item_result_list_from_templates(env, product_templates)
 
         result['result'] = result_list
 
         return result
 
-    def get_items_by_string(self, env: Environment, match_str: str, offset, limit, request_count: bool):
+    def get_items_by_string(self, env: Environment, match_str: str, offset, limit, request_count: bool,
+                            page_token: str = None):
         """
         Searches products by string match
         @param env: Environment
@@ -64,6 +63,7 @@ class InventoryImpl:
         @param offset: the first record index to be returned
         @param limit: the maximum number of records
         @param request_count: Need to return total number of records
+        @param page_token: continuation token of the keyset pagination (None to use offset)
         @return:
         """
         result = {}
@@ -74,34 +74,44 @@ class InventoryImpl:
         ]
 
         if request_count:
-            result['totalCount'] = env['product.template'].search_count(domain_filter)
+            result['totalCount'] = RecordCounter.count(env['product.template'], domain_filter)
 
-        product_template_ids = env['product.template'].search(domain_filter, limit=limit, offset=offset, order='id ASC')
-        result_data_list = []
-        for pt_id in product_template_ids:
-            result_data_list.append(self._make_inventory_item_result(
-                self._model_converter.product_template_to_inventory_item(env, pt_id),
-                self._model_converter.product_template_to_related_data(env, pt_id)
-            ))
-        result['result'] = result_data_list
+        product_templates = self._search_templates_page(env, domain_filter, offset, limit, page_token, result)
+        result['result'] = self._make_inventory_item_result_list_from_templates(env, product_templates)
 
         return result
 
     def get_items_by_ids(self, env: Environment, ids_list: list):
         """
-        Searches products, and it's unit of measures
+        Searches products, and it's unit of measures.
+        Items are returned in the order of the request, unknown ids are skipped.
+        Units of measure of the item are limited by the requested ones (all if the pair has no uom id).
         @param env: Environment
         @param ids_list: requested pairs of product's ids and uom ids
         @return:
         """
-        item_ids = [id_elem['inventoryItemId'] for id_elem in ids_list]
+        requested_uom_ids = self._get_requested_uom_ids(ids_list)
+        if not requested_uom_ids:
+            return {'result': []}
+
+        # all products are resolved by the single search, their quantities - by the single grouped read
+        products = env['product.product'].search([('id', 'in', list(requested_uom_ids))])
+        stock_quantities = self._model_converter.prefetch_products(env, products)
+        products_by_id = {prod.id: prod for prod in products}
 
-        products = env['product.product'].search([('id', 'in', item_ids)])
         result_data_list = []
-        for prod in products:
+        for product_id, uom_ids in requested_uom_ids.items():
+            prod = products_by_id.get(product_id)
+            if not prod:
+                continue
+
+            related_data = self._model_converter.product_to_related_data(env, prod, stock_quantities)
+            if uom_ids is not None:
+                related_data['unitOfMeasure'] = [uom for uom in related_data['unitOfMeasure'] if uom['id'] in uom_ids]
+
             result_data_list.append(self._make_inventory_item_result(
                 self._model_converter.product_to_inventory_item(env, prod),
-                self._model_converter.product_to_related_data(env, prod)
+                related_data
             ))
         return {"result": result_data_list}
 
@@ -116,7 +126,7 @@ class InventoryImpl:
         if not search_mode:
             search_mode = {'byId': True}
 
-        search_list = []
+        product_ids = []
 
         if 'byId' in search_mode and bool(search_mode['byId']):
             if self._model_converter.is_non_empty_str_in_dict(search_data, 'raw'):
@@ -133,37 +143,66 @@ class InventoryImpl:
                         return {'result': []}
 
                     if raw_id.isdigit():
-                        search_list.append(('id', 'in', [int(raw_id)]))
+                        product_ids.append(int(raw_id))
 
+        barcodes = []
         if 'byBarcode' in search_mode and bool(search_mode['byBarcode']):
-            if self._model_converter.is_non_empty_str_in_dict(search_data, 'ean13'):
-                search_list.append(('barcode', '=', search_data['ean13']))
-            if self._model_converter.is_non_empty_str_in_dict(search_data, 'gtin14'):
-                search_list.append(('barcode', '=', search_data['gtin14']))
-            if self._model_converter.is_non_empty_str_in_dict(search_data, 'ean8'):
-                search_list.append(('barcode', '=', search_data['ean8']))
-            if self._model_converter.is_non_empty_str_in_dict(search_data, 'upca'):
-                search_list.append(('barcode', '=', search_data['upca']))
+            for barcode_key in ['ean13', 'gtin14', 'ean8', 'upca', 'upce', 'raw']:
+                if self._model_converter.is_non_empty_str_in_dict(search_data, barcode_key):
+                    barcodes.append(search_data[barcode_key])
             if self._model_converter.is_non_empty_str_in_dict(search_data, 'upce'):
-                search_list.append(('barcode', '=', search_data['upce']))
-            if self._model_converter.is_non_empty_str_in_dict(search_data, 'raw'):
-                search_list.append(('barcode', '=', search_data['raw']))
+                barcodes.append(BarcodeUtils.convert_upce_to_upca(search_data['upce']))
 
+        markings = []
         if 'byMarking' in search_mode and bool(search_mode['byMarking']):
-            search_list.append(('default_code', '=', search_data['raw']))
-
-        if len(search_list) > 1:
-            new_search_list = []
-            for i in range(0, len(search_list) - 1):
-                new_search_list.append('|')
-            new_search_list.extend(search_list)
-            search_list = new_search_list
+            if self._model_converter.is_non_empty_str_in_dict(search_data, 'raw'):
+                markings.append(search_data['raw'])
 
-        search_list.append(('active', '=', True))
+        # Barcodes and markings are resolved by the single probe of the search codes index
+        product_ids.extend(env['clv_api.product_search_code'].find_product_ids(barcodes, markings))
+        if not product_ids:
+            return {'result': []}
 
-        products = env['product.product'].search(search_list)
+        products = env['product.product'].search([('id', 'in', product_ids), ('active', '=', True)])
         return {"result": self._make_inventory_item_result_list(env, products)}
 
+    # noinspection PyMethodMayBeStatic
+    def _get_requested_uom_ids(self, ids_list: list) -> dict:
+        """
+        Returns requested uom ids by product id in the order of the request
+        (None instead of the set of uom ids if all units of measure of the product are requested).
+        Ids which are not product ids (folders, etc.) are skipped.
+        """
+        requested_uom_ids = {}
+        for id_elem in ids_list or []:
+            item_id = str(id_elem.get('inventoryItemId') or '')
+            if not item_id.isdigit():
+                continue
+
+            product_id = int(item_id)
+            uom_id = id_elem.get('unitOfMeasureId')
+            if not uom_id:
+                requested_uom_ids[product_id] = None
+            elif product_id not in requested_uom_ids:
+                requested_uom_ids[product_id] = {str(uom_id)}
+            elif requested_uom_ids[product_id] is not None:
+                requested_uom_ids[product_id].add(str(uom_id))
+        return requested_uom_ids
+
+    def _search_templates_page(self, env: Environment, domain_filter, offset, limit, page_token, result: dict):
+        """
+        Searches the page of product templates either by offset or by continuation token (if passed).
+        Continuation token of the next page is added to the result.
+        """
+        if page_token is None:
+            return env['product.template'].search(domain_filter, limit=limit, offset=offset, order='id ASC')
+
+        page_cursor = PageCursor(page_token)
+        product_templates = page_cursor.search(env['product.template'], domain_filter, limit, 'id ASC')
+        if page_cursor.next_token:
+            result['continuationToken'] = page_cursor.next_token
+        return product_templates
+
     def _make_inventory_item_result(self, inventory_item, related_data):
         return {
                 'inventoryItem': inventory_item,
@@ -171,20 +210,24 @@ class InventoryImpl:
             }
 
     def _make_inventory_item_result_list(self, env : Environment, products):
+        stock_quantities = self._model_converter.prefetch_products(env, products)
         result_data_list = []
         for prod in products:
             result_data_list.append(self._make_inventory_item_result(
                 self._model_converter.product_to_inventory_item(env, prod),
-                self._model_converter.product_to_related_data(env, prod)
+                self._model_converter.product_to_related_data(env, prod, stock_quantities)
             ))
         return result_data_list
 
     def _make_inventory_item_result_list_from_templates(self, env : Environment, product_templates):
+        # Variants, units of measure and quantities are loaded for the whole page at once
+        # instead of touching them record by record during the conversion.
+        stock_quantities = self._model_converter.prefetch_product_templates(env, product_templates)
         result_data_list = []
         for prod_template in product_templates:
             result_data_list.append(self._make_inventory_item_result(
                 self._model_converter.product_template_to_inventory_item(env, prod_template),
-                self._model_converter.product_template_to_related_data(env, prod_template)
+                self._model_converter.product_template_to_related_data(env, prod_template, stock_quantities)
             ))
         return result_data_list
 
@@ -0,0 +1,183 @@
+import threading
+from typing import Union
+
+from odoo.api import Environment
+from odoo.release import version_info
+
+from .record_counter import RecordCounter
+
+
+class LocationTree:
+    """
+    Worker's cache of the location tree snapshot: all locations of the allowed companies
+    (and the locations without company). Used to describe locations without reading them record by record.
+    The version of the snapshot (number, latest write date and row versions of the locations) is read
+    from the database by single aggregate query, so modifications made by any worker are detected.
+    When the version is changed, only the added and the modified locations are read again.
+    The snapshot contains:
+        'version' - version of the snapshot;
+        'locations' - dictionary of the locations by id, each location is dictionary with keys
+            'id', 'name' (complete name), 'barcode' (barcode or complete name), 'parentId', 'usage', 'active',
+            'warehouseId', 'parentPath', 'childCount' (number of active children), 'isLowestLevel';
+        'barcodes' - ids of the locations by their barcodes (or complete names);
+        'rowVersions' - row versions (transaction ids of the last modifications) of the locations by id.
+    """
+
+    # snapshots by database name and allowed companies
+    _snapshots = {}
+    _lock = threading.Lock()
+
+    def __init__(self, env: Environment):
+        """
+        Ctor
+        @param env: Environment
+        """
+        self._env = env
+        self._snapshot = self._get_snapshot(env)
+
+    @property
+    def version(self) -> str:
+        """
+        Version of the snapshot
+        """
+        return self._snapshot['version']
+
+    def get(self, location_id: int) -> Union[dict, None]:
+        """
+        Returns location of the snapshot by id (None if not found)
+        @param location_id: id of the location
+        @return: location dictionary (must not be modified)
+        """
+        return self._snapshot['locations'].get(location_id)
+
+    def get_all(self, location_ids) -> dict:
+        """
+        Returns locations by ids. Locations absent in the snapshot (e.g. readable locations of other companies)
+        are read from the records.
+        @param location_ids: ids of the locations
+        @return: dictionary of the location dictionaries by id (ids of not existing locations are absent)
+        """
+        result = {location_id: self._snapshot['locations'][location_id]
+                  for location_id in location_ids if location_id in self._snapshot['locations']}
+        missing_ids = [location_id for location_id in location_ids if location_id not in result]
+        if missing_ids:
+            result.update(self._read_missing_locations(missing_ids))
+        return result
+
+    def find_by_barcode(self, barcode: str) -> Union[int, None]:
+        """
+        Returns id of the location by its barcode or complete name (None if not found)
+        @param barcode: barcode of the location
+        @return:
+        """
+        if not barcode:
+            return None
+        return self._snapshot['barcodes'].get(barcode)
+
+    @classmethod
+    def _get_snapshot(cls, env: Environment) -> dict:
+        company_ids = sorted(env.companies.ids)
+        snapshot_key = (env.cr.dbname, tuple(company_ids))
+        locations_model = env['stock.location'].sudo().with_context(active_test=False)
+        locations_domain = ['|', ('company_id', '=', False), ('company_id', 'in', company_ids)]
+
+        (locations_count, last_write_date, row_versions_sum) = \
+            RecordCounter.get_version_values(locations_model, locations_domain)
+        version = f'{locations_count}-{last_write_date.isoformat() if last_write_date else ""}-{row_versions_sum}'
+
+        with cls._lock:
+            snapshot = cls._snapshots.get(snapshot_key)
+        if snapshot is not None and snapshot['version'] == version:
+            return snapshot
+
+        row_versions = cls._read_row_versions(env, company_ids)
+        if snapshot is None:
+            locations = {}
+            changed_ids = list(row_versions.keys())
+        else:
+            locations = {location_id: location for location_id, location in snapshot['locations'].items()
+                         if location_id in row_versions}
+            changed_ids = [location_id for location_id, row_version in row_versions.items()
+                           if snapshot['rowVersions'].get(location_id) != row_version]
+
+        locations.update(cls._read_locations(locations_model, changed_ids))
+        snapshot = cls._build_snapshot(version, locations, row_versions)
+        with cls._lock:
+            cls._snapshots[snapshot_key] = snapshot
+        return snapshot
+
+    @staticmethod
+    def _read_row_versions(env: Environment, company_ids) -> dict:
+        env.cr.execute('''
+            SELECT "id", "xmin"::text::bigint
+            FROM "stock_location"
+            WHERE "company_id" IS NULL OR "company_id" = ANY(%s)''', [list(company_ids)])
+        return dict(env.cr.fetchall())
+
+    @staticmethod
+    def _read_locations(locations_model, location_ids) -> dict:
+        if not location_ids:
+            return {}
+
+        locations = {}
+        for values in locations_model.browse(location_ids).read(
+                ['location_id', 'complete_name', 'barcode', 'usage', 'active', 'warehouse_id', 'parent_path'],
+                load=None):
+            locations[values['id']] = {
+                'id': values['id'],
+                'name': values['complete_name'] or '',
+                'barcode': values['barcode'] or values['complete_name'] or '',
+                'explicitBarcode': values['barcode'] or '',
+                'parentId': values['location_id'] or False,
+                'usage': values['usage'],
+                'active': values['active'],
+                'warehouseId': values['warehouse_id'] or False,
+                'parentPath': values['parent_path'] or ''
+            }
+        return locations
+
+    def _read_missing_locations(self, location_ids) -> dict:
+        locations_model = self._env['stock.location'].with_context(active_test=False)
+        locations = self._read_locations(locations_model, locations_model.search([('id', 'in', location_ids)]).ids)
+        if not locations:
+            return {}
+
+        domain_filter = [('location_id', 'in', list(locations.keys()))]
+        if version_info[0] >= 17:
+            child_counts = {location.id: count for location, count
+                            in self._env['stock.location']._read_group(domain_filter, ['location_id'], ['__count'])}
+        else:
+            child_counts = {group['location_id'][0]: group['__count'] for group
+                            in self._env['stock.location'].read_group(domain_filter, ['location_id'], ['location_id'],
+                                                                      lazy=False)}
+
+        for location in locations.values():
+            location['childCount'] = child_counts.get(location['id'], 0)
+            location['isLowestLevel'] = location['childCount'] == 0
+        return locations
+
+    @staticmethod
+    def _build_snapshot(version: str, locations: dict, row_versions: dict) -> dict:
+        # derived values are computed for the copies, the published snapshot is never modified
+        locations = {location_id: dict(location, childCount=0) for location_id, location in locations.items()}
+        for location in locations.values():
+            if location['active'] and location['parentId'] in locations:
+                locations[location['parentId']]['childCount'] += 1
+        for location in locations.values():
+            location['isLowestLevel'] = location['childCount'] == 0
+
+        # explicit barcodes take precedence over complete names of other locations
+        barcodes = {}
+        for location_id in sorted(locations.keys()):
+            if locations[location_id]['explicitBarcode']:
+                barcodes.setdefault(locations[location_id]['explicitBarcode'], location_id)
+        for location_id in sorted(locations.keys()):
+            if locations[location_id]['name']:
+                barcodes.setdefault(locations[location_id]['name'], location_id)
+
+        return {
+            'version': version,
+            'locations': locations,
+            'barcodes': barcodes,
+            'rowVersions': row_versions
+        }
@@ -2,6 +2,7 @@ from odoo.addons.stock.models.product import ProductTemplate, Product
 from odoo.api import Environment
 from odoo.release import version_info
 from .common_utils import CommonUtils
+from .stock_quantity import StockQuantity
 
 FOLDER_ID_PREFIX = 'folder_'
 
@@ -67,54 +68,99 @@ class ModelConverter:
             'unitOfMeasureId': str(prod.uom_id.id),
         })
 
-    def product_to_related_data(self, env: Environment, prod: Product):
+    def product_to_related_data(self, env: Environment, prod: Product, stock_quantities: dict = None):
         """
         Create related data from the product (fills only unit of measure array)
         @param env:
         @param prod:
+        @param stock_quantities: prefetched stock quantities by product id (see prefetch_products)
         @return:
         """
-        return {'unitOfMeasure': self.product_to_unit_of_measure(env, prod)}
+        return {'unitOfMeasure': self.product_to_unit_of_measure(env, prod, stock_quantities)}
 
-    def product_to_unit_of_measure(self, env: Environment, prod: Product):
+    def product_to_unit_of_measure(self, env: Environment, prod: Product, stock_quantities: dict = None):
         """
         Converts base uom of the product to UnitOfMeasure object
         @param env:
         @param prod:
+        @param stock_quantities: prefetched stock quantities by product id (see prefetch_products)
         @return:
         """
         packaging = []
         if prod.uom_id:
+            if stock_quantities is not None and prod.id in stock_quantities:
+                stock_quantity = stock_quantities[prod.id]
+            else:
+                stock_quantity = StockQuantity.get_quantities(env, [prod.id])[prod.id]
+
             packaging.append({
                 'id': str(prod.uom_id.id),
                 'inventoryItemId': str(prod.id),
                 'name': prod.uom_id.name,
                 'unitsQuantity': 1,
                 'price': 1 * prod.lst_price,
-                'stockQuantity': prod.qty_available,
+                'stockQuantity': stock_quantity,
             })
         return packaging
 
-    def product_template_to_related_data(self, env: Environment, prod_tmpl: ProductTemplate):
+    def product_template_to_related_data(self, env: Environment, prod_tmpl: ProductTemplate, stock_quantities: dict = None):
         """
         Converts product template to related data (array of unit of measures)
         @param env:
         @param prod_tmpl:
+        @param stock_quantities: prefetched stock quantities by product id (see prefetch_products)
         @return:
         """
-        return {'unitOfMeasure': self.product_template_to_unit_of_measure(env, prod_tmpl)}
+        return {'unitOfMeasure': self.product_template_to_unit_of_measure(env, prod_tmpl, stock_quantities)}
 
-    def product_template_to_unit_of_measure(self, env: Environment, prod_tmpl: ProductTemplate):
+    def product_template_to_unit_of_measure(self, env: Environment, prod_tmpl: ProductTemplate, stock_quantities: dict = None):
         """
         Converts product template to UnitOfMeasure object
         @param env:
         @param prod_tmpl:
+        @param stock_quantities: prefetched stock quantities by product id (see prefetch_products)
         @return:
         """
         if prod_tmpl.product_variant_count == 1:
-            return self.product_to_unit_of_measure(env, prod_tmpl.product_variant_ids[0])
+            return self.product_to_unit_of_measure(env, prod_tmpl.product_variant_ids[0], stock_quantities)
         return []
 
+    def prefetch_product_templates(self, env: Environment, prod_tmpls) -> dict:
+        """
+        Loads variants, units of measure and tracking of the whole page of product templates at once
+        @param env:
+        @param prod_tmpls: product.template recordset
+        @return: stock quantities of the variants by product id
+        """
+        prod_tmpls.mapped('barcode')
+        return self.prefetch_products(env, prod_tmpls.mapped('product_variant_ids'))
+
+    def prefetch_products(self, env: Environment, products) -> dict:
+        """
+        Loads units of measure, tracking, prices and stock quantities of the whole page of products at once.
+        Converting the products afterwards does not touch database per record.
+        @param env:
+        @param products: product.product recordset
+        @return: stock quantities by product id
+        """
+        if not products:
+            return {}
+
+        products.mapped('uom_id.name')
+        products.mapped('product_tmpl_id.tracking')
+        # 'lst_price' is non-stored computed field, reading it on the whole recordset computes it in batch.
+        products.read(['lst_price'])
+        return self.get_stock_quantities(env, products.ids)
+
+    def get_stock_quantities(self, env: Environment, product_ids: list) -> dict:
+        """
+        Returns on hand quantities of the products by single grouped query (see StockQuantity)
+        @param env:
+        @param product_ids: ids of the products
+        @return: stock quantities by product id (0.0 for products without stock)
+        """
+        return StockQuantity.get_quantities(env, product_ids)
+
     def stock_picking_to_doc_description(self, pick, document_type_name):
         """
         Fills InventoryAPI Document (header) object from the odoo stock.picking
@@ -345,7 +391,7 @@ class ModelConverter:
             'isFolder': len(odoo_partner.child_ids) > 0,
             'name': name,
             'parentId': self.clear_to_str(odoo_partner.parent_id.id),
-            'search': CommonUtils.generate_search_string([code, name, tin]),
+            'search': self.clear_to_str(odoo_partner.clv_search),
             'tIN': tin,
             'type': customer_vendor_type
         })
@@ -362,7 +408,7 @@ class ModelConverter:
             'seriesName': self.clear_to_str(odoo_lot.name),
             'seriesDate': self.clear_to_str(odoo_lot.create_date),
             'seriesKey': self.clear_to_str(odoo_lot.product_id.id),
-            'search': CommonUtils.generate_search_string([odoo_lot.name, odoo_lot.create_date])
+            'search': self.clear_to_str(odoo_lot.clv_search)
         })
 
     def convert_odoo_stock_quant_to_stock_row(self, stock_quant):
@@ -397,6 +443,34 @@ class ModelConverter:
             'warehouseId': warehouse_id
         })
 
+    def convert_stock_quant_keys_to_deleted_stock_row(self, quant_keys: dict):
+        """
+        Converts key values of the deleted 'stock.quant' record to the deleted 'TableStockRow' object
+        (only the fields identifying the row).
+        @param quant_keys: dictionary with keys 'product_id', 'location_id', 'lot_id', 'lot_name', 'tracking',
+            'uom_id', 'warehouse_id'
+        """
+        serial_number = ''
+        if quant_keys['tracking'] == 'serial' and quant_keys['lot_id']:
+            serial_number = self.clear_to_str(quant_keys['lot_name'])
+
+        series_id = ''
+        if quant_keys['tracking'] == 'lot' and quant_keys['lot_id']:
+            series_id = self.clear_to_str(quant_keys['lot_id'])
+
+        warehouse_id = ''
+        if quant_keys['warehouse_id']:
+            warehouse_id = CommonUtils.convert_warehouse_id_from_odoo_to_clv(quant_keys['warehouse_id'])
+
+        return self._clear_output_dict({
+            'inventoryItemId': self.clear_to_str(quant_keys['product_id']),
+            'locationId': self.clear_to_str(quant_keys['location_id']),
+            'serialNumber': serial_number,
+            'seriesId': series_id,
+            'unitId': self.clear_to_str(quant_keys['uom_id']),
+            'warehouseId': warehouse_id
+        })
+
     def is_non_empty_str_in_dict(self, d, key):
         """
         Routine if dict contains non empty d[key] equal to if d.get(key): expression
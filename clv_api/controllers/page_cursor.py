@@ -0,0 +1,139 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Union
+
+from odoo.osv.query import Query
+from odoo.release import version_info
+
+
+class PageCursor:
+    """
+    Continuation cursor of the keyset (seek) pagination.
+    Instead of skipping 'offset' records, each page continues right after the last record of the previous page,
+    so every page costs the same and rows do not shift between pages because of concurrent writes.
+    Supported orders are 'id ASC', 'id DESC' and '<datetime field> ASC|DESC, id ASC|DESC'.
+    The token may also carry the state of the sync cursor computed on the first page of the synchronization,
+    so all the pages continue the same synchronization (see SyncCursor.state).
+    """
+
+    def __init__(self, token: Union[str, None]):
+        """
+        Ctor
+        @param token: continuation token returned with the previous page (empty for the first page)
+        """
+        self._last_values = None
+        self._next_values = None
+        self.sync_state = None
+        if token:
+            try:
+                token_data = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+            except ValueError:
+                raise RuntimeError(f'Continuation token \'{token}\' is invalid')
+            if isinstance(token_data, dict):
+                self.sync_state = token_data.get('syncState')
+                token_data = token_data.get('lastValues')
+            if not isinstance(token_data, list):
+                raise RuntimeError(f'Continuation token \'{token}\' is invalid')
+            self._last_values = token_data
+
+    @property
+    def last_values(self) -> Union[List, None]:
+        """
+        Order key values of the last record of the previous page (None for the first page)
+        """
+        return self._last_values
+
+    @property
+    def next_token(self) -> Union[str, None]:
+        """
+        Token to request the next page or None if there are no more records
+        """
+        if self._next_values is None:
+            return None
+        token_data = self._next_values
+        if self.sync_state:
+            token_data = {'lastValues': self._next_values, 'syncState': self.sync_state}
+        return base64.urlsafe_b64encode(json.dumps(token_data).encode()).decode()
+
+    def set_next_values(self, values: Union[List, None]):
+        """
+        Sets order key values of the last record of the current page
+        """
+        self._next_values = values
+
+    def search(self, model, domain_filter: List, limit, order: str):
+        """
+        Searches the page of records following the last record of the previous page
+        @param model: odoo model (empty recordset)
+        @param domain_filter: domain filter
+        @param limit: the maximum number of records
+        @param order: order of the records (see supported orders in the class description)
+        @return: records of the page
+        """
+        keys = self._parse_order(order)
+
+        if len(keys) == 1:
+            records = self._search_by_id(model, domain_filter, limit, order, keys[0])
+        else:
+            records = self._search_by_datetime_and_id(model, domain_filter, limit, order, keys)
+
+        self._next_values = None
+        if limit and len(records) >= limit:
+            last_record = records[-1]
+            # date-time values keep microseconds (records modified by single transaction have equal values)
+            self._next_values = [last_record.id if field_name == 'id' else
+                                 (last_record[field_name].isoformat() if last_record[field_name] else None)
+                                 for (field_name, descending) in keys]
+
+        return records
+
+    def _search_by_id(self, model, domain_filter, limit, order, id_key):
+        seek_filter = []
+        if self._last_values:
+            seek_filter.append(('id', '<' if id_key[1] else '>', int(self._last_values[0])))
+        return model.search(domain_filter + seek_filter, limit=limit, order=order)
+
+    def _search_by_datetime_and_id(self, model, domain_filter, limit, order, keys):
+        if not self._last_values:
+            return model.search(domain_filter, limit=limit, order=order)
+
+        (datetime_field, datetime_descending) = keys[0]
+        id_descending = keys[1][1]
+        try:
+            last_datetime = datetime.fromisoformat(self._last_values[0])
+            last_id = int(self._last_values[1])
+        except (TypeError, ValueError):
+            raise RuntimeError('Continuation token is invalid')
+
+        # Odoo domains compare date-time fields with seconds precision, so the page is seeked by raw SQL condition
+        # keeping the microseconds: (datetime, id) follows the last record in the page order.
+        column = f'"{model._table}"."{datetime_field}"'
+        seek_sql = f'({column} {"<" if datetime_descending else ">"} %s ' \
+                   f'OR ({column} = %s AND "{model._table}"."id" {"<" if id_descending else ">"} %s))'
+        seek_params = [last_datetime, last_datetime, last_id]
+
+        if version_info[0] < 14:
+            seek_filter = [('id', 'inselect', (f'SELECT "id" FROM "{model._table}" WHERE {seek_sql}', seek_params))]
+            return model.search(domain_filter + seek_filter, limit=limit, order=order)
+
+        query = model._search(domain_filter, limit=limit, order=order)
+        if not isinstance(query, Query):
+            # the domain is always false
+            return model.browse()
+        query.add_where(seek_sql, seek_params)
+        return model.browse(query)
+
+    # noinspection PyMethodMayBeStatic
+    def _parse_order(self, order: str) -> List:
+        keys = []
+        for order_part in order.split(','):
+            order_items = order_part.split()
+            field_name = order_items[0]
+            descending = len(order_items) > 1 and order_items[1].upper() == 'DESC'
+            keys.append((field_name, descending))
+
+        if keys[-1][0] != 'id' or len(keys) > 2:
+            raise RuntimeError(f'Keyset pagination does not support order \'{order}\'')
+
+        return keys
@@ -1,3 +1,6 @@
+import threading
+from collections import OrderedDict
+
 from dateutil.parser import parser
 
 
@@ -34,66 +37,154 @@ class QueryConverter:
         'Not': '!'
     }
 
+    # the maximum number of compiled query plans kept by the cache
+    _plans_cache_size = 256
+
+    def __init__(self):
+        # compiled query plans by (field map, query shape), the least recently used plan is evicted first
+        self._plans_cache = OrderedDict()
+        self._plans_cache_lock = threading.Lock()
+
     def convert_api_where_expression_to_domain_filter(self, where_root, field_name_map):
         """
-        Converts filter where expression do domain list query in ODOO
+        Converts filter where expression do domain list query in ODOO.
+        The shape of the expression (the tree without values) is compiled once to the domain template,
+        so for the same query shapes only values are converted and bound to the template.
         @param where_root: the root of the where expression
         @param field_name_map: filed map
         @return:
         """
-        return self._convert_node(where_root, field_name_map)
+        values = []
+        shape = self._get_node_shape(where_root, values)
+        plan = self._get_plan(shape, field_name_map)
+        return self._bind_plan(plan, values)
+
+    def _get_plan(self, shape, field_name_map):
+        # the field map is kept in the cache entry, so its id can not be reused by another map
+        plan_key = (id(field_name_map), shape)
+        with self._plans_cache_lock:
+            cache_entry = self._plans_cache.get(plan_key)
+            if cache_entry and cache_entry[0] is field_name_map:
+                self._plans_cache.move_to_end(plan_key)
+                return cache_entry[1]
 
-    def _convert_node(self, where_root, api_to_odoo_field_map):
+        slots = []
+        template = self._compile_shape(shape, field_name_map, slots)
+        plan = (template, slots)
+
+        with self._plans_cache_lock:
+            self._plans_cache[plan_key] = (field_name_map, plan)
+            self._plans_cache.move_to_end(plan_key)
+            while len(self._plans_cache) > self._plans_cache_size:
+                self._plans_cache.popitem(last=False)
+        return plan
+
+    def _get_node_shape(self, where_root, values):
+        """
+        Returns hashable shape of the where expression and collects its values (in the order of compiled slots)
+        """
         if not where_root:
-            return []
+            return None
         node_type = where_root.get('nodeType')
         value = where_root.get('value')
         operands = where_root.get('operands')
 
         if node_type == 'Field':
-            field_info = api_to_odoo_field_map.get(value.get('value').lower())
-            if not field_info:
-                raise RuntimeError('Unknown field name for the query: ' + str(value.get('value')))
-            return [field_info.odoo_name]
+            return 'Field', str(value.get('value')).lower()
         if node_type == 'Value':
             if not value or value.get('valueType') == 'DBNull':
-                return []
-            return [self._convert_plain_value(value.get('value'), value.get('valueType'))]
+                return 'Null',
+            values.append(value.get('value'))
+            return 'Value', value.get('valueType')
+        if node_type == 'Not':
+            return node_type, self._get_node_shape(operands[0], values)
+        return node_type, self._get_node_shape(operands[0], values), self._get_node_shape(operands[1], values)
+
+    def _compile_shape(self, shape, api_to_odoo_field_map, slots):
+        """
+        Compiles the shape of where expression to the domain template.
+        Template items are ('operator', op), ('field', odoo field name), ('value', slot index)
+        and ('leaf', operand item, op, operand item) for binary operations.
+        Each slot is (api value type, FieldInfo to convert value to or None).
+        """
+        if not shape:
+            return []
+        node_type = shape[0]
+
+        if node_type == 'Field':
+            field_info = api_to_odoo_field_map.get(shape[1].lower())
+            if not field_info:
+                raise RuntimeError('Unknown field name for the query: ' + str(shape[1]))
+            return [('field', field_info.odoo_name)]
+        if node_type == 'Null':
+            return []
+        if node_type == 'Value':
+            slots.append((shape[1], None))
+            return [('value', len(slots) - 1)]
 
         result = []
         if node_type == 'Not':
-            arg = self._convert_node(operands[0], api_to_odoo_field_map)
-            result.append('!')
+            arg = self._compile_shape(shape[1], api_to_odoo_field_map, slots)
+            result.append(('operator', '!'))
             result.extend(arg)
         elif node_type == 'Or' or node_type == 'And':
-            arg1 = self._convert_node(operands[0], api_to_odoo_field_map)
-            arg2 = self._convert_node(operands[1], api_to_odoo_field_map)
-            result.append(self._odoo_operations_map[node_type])
+            arg1 = self._compile_shape(shape[1], api_to_odoo_field_map, slots)
+            arg2 = self._compile_shape(shape[2], api_to_odoo_field_map, slots)
+            result.append(('operator', self._odoo_operations_map[node_type]))
             result.extend(arg1)
             result.extend(arg2)
         else:
             mapped_operation = self._odoo_operations_map.get(node_type)
             if not mapped_operation:
                 raise RuntimeError('Unknown where expression node type ' + str(node_type))
-            arg1 = self._convert_node(operands[0], api_to_odoo_field_map)
-            arg2 = self._convert_node(operands[1], api_to_odoo_field_map)
+            arg1 = self._compile_shape(shape[1], api_to_odoo_field_map, slots)
+            arg2 = self._compile_shape(shape[2], api_to_odoo_field_map, slots)
             if len(arg1) != 1 or len(arg2) != 1:
                 raise RuntimeError('Invalid operands of binary operation in query filter')
-            if operands[0].get('nodeType') == 'Field' and operands[1].get('nodeType') == 'Value':
-                field_name = operands[0].get('value').get('value')
-                field_info = api_to_odoo_field_map.get(field_name.lower())
-                if not field_info:
-                    raise RuntimeError('Unknown field name for the query: ' + str(field_name))
+            if shape[1][0] == 'Field' and shape[2][0] == 'Value':
+                field_info = api_to_odoo_field_map.get(shape[1][1].lower())
                 if field_info.odoo_type:
-                    # If api_type allows None, but odoo_type does not, we need to replace the value.
-                    # For example, if api_type is str and odoo_type is int, operation int(None) can't be done.
-                    if (not arg2[0] or arg2[0] == 'None') and field_info.odoo_null_value_equivalent:
-                        arg2[0] = field_info.odoo_null_value_equivalent
-                    arg2[0] = field_info.odoo_type(arg2[0])
+                    # the value is converted to the odoo type of the field when bound
+                    slot_index = arg2[0][1]
+                    slots[slot_index] = (slots[slot_index][0], field_info)
+            result = [('leaf', arg1[0], mapped_operation, arg2[0])]
+        return result
 
-            result = [(arg1[0], mapped_operation, arg2[0])]
+    def _bind_plan(self, plan, values):
+        """
+        Binds values of the where expression to the compiled domain template
+        """
+        (template, slots) = plan
+
+        bound_values = []
+        for (slot, value) in zip(slots, values):
+            (value_type, field_info) = slot
+            bound_value = self._convert_plain_value(value, value_type)
+            if field_info:
+                # If api_type allows None, but odoo_type does not, we need to replace the value.
+                # For example, if api_type is str and odoo_type is int, operation int(None) can't be done.
+                if (not bound_value or bound_value == 'None') and field_info.odoo_null_value_equivalent:
+                    bound_value = field_info.odoo_null_value_equivalent
+                bound_value = field_info.odoo_type(bound_value)
+            bound_values.append(bound_value)
+
+        result = []
+        for item in template:
+            if item[0] == 'operator' or item[0] == 'field':
+                result.append(item[1])
+            elif item[0] == 'value':
+                result.append(bound_values[item[1]])
+            else:
+                result.append((self._bind_leaf_operand(item[1], bound_values), item[2],
+                               self._bind_leaf_operand(item[3], bound_values)))
         return result
 
+    # noinspection PyMethodMayBeStatic
+    def _bind_leaf_operand(self, operand, bound_values):
+        if operand[0] == 'value':
+            return bound_values[operand[1]]
+        return operand[1]
+
     def _convert_plain_value(self, plain_value, plain_type):
         if plain_type == 'String':
             return str(plain_value) if plain_value else ''
@@ -0,0 +1,93 @@
+import logging
+
+from odoo.osv.query import Query
+from odoo.release import version_info
+
+
+class RecordCounter:
+    """
+    Counts records for the 'totalCount' of the Inventory API responses.
+    Issues single 'SELECT count(*)' query or, if 'clv_estimate_count' is set in the context,
+    returns estimation of the query planner for huge tables.
+    """
+    _logger = logging.getLogger(__name__)
+
+    # estimated counts less than this value are replaced by the exact ones
+    _estimate_threshold = 100000
+
+    @classmethod
+    def count(cls, model, domain_filter) -> int:
+        """
+        Returns the number of records matching the domain filter
+        @param model: odoo model (empty recordset)
+        @param domain_filter: domain filter
+        @return: exact or estimated number of records
+        """
+        if model.env.context.get('clv_estimate_count'):
+            estimated_count = cls._estimate_count(model, domain_filter)
+            if estimated_count is not None and estimated_count >= cls._estimate_threshold:
+                return estimated_count
+
+        return model.search_count(domain_filter)
+
+    @classmethod
+    def get_version_values(cls, model, domain_filter):
+        """
+        Returns values changed by any modification of the records matching the domain filter (by single aggregate query):
+        the number of records, the latest write date and the sum of the row versions (transaction ids of the last
+        modifications). The sum catches modifications which do not increase the latest write date,
+        e.g. transaction committed after the later one with the older write date.
+        Limits: records of the other models the rows are made of are not covered,
+        two different sets of row versions can give the same sum (unlikely).
+        @param model: odoo model (empty recordset)
+        @param domain_filter: domain filter
+        @return: tuple (count, last write date or None, sum of the row versions or None)
+        """
+        if version_info[0] < 14:
+            select_sql = ('SELECT unnest(%s::integer[])', [model.search(domain_filter).ids])
+        else:
+            select_sql = cls._get_select_sql(model, domain_filter)
+            if select_sql is None:
+                return 0, None, None
+
+        # pending ORM updates must be written before the raw query
+        if version_info[0] >= 16:
+            model.flush_model(['write_date'])
+        else:
+            model.flush(['write_date'])
+
+        query_str, params = select_sql
+        model.env.cr.execute(f'''
+            SELECT count(*), max("write_date"), sum("xmin"::text::bigint)
+            FROM "{model._table}" WHERE "id" IN ({query_str})''', params)
+        return model.env.cr.fetchone()
+
+    @classmethod
+    def _estimate_count(cls, model, domain_filter):
+        if version_info[0] < 14:
+            return None
+
+        select_sql = cls._get_select_sql(model, domain_filter)
+        if select_sql is None:
+            return 0
+
+        query_str, params = select_sql
+        try:
+            model.env.cr.execute('EXPLAIN (FORMAT JSON) ' + query_str, params)
+            plan = model.env.cr.fetchone()[0]
+            return int(plan[0]['Plan']['Plan Rows'])
+        except (KeyError, IndexError, TypeError, ValueError):
+            cls._logger.debug('Unable to estimate the number of %s records', model._name)
+            return None
+
+    @classmethod
+    def _get_select_sql(cls, model, domain_filter):
+        # SQL selecting ids of the records matching the domain filter (with access rules applied)
+        # or None if the domain filter is always false
+        query = model._search(domain_filter)
+        if not isinstance(query, Query):
+            return None
+        if version_info[0] >= 17:
+            select_sql = query.select()
+            return select_sql.code, select_sql.params
+        return query.select()
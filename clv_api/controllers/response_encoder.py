@@ -0,0 +1,89 @@
+import gzip
+import zlib
+from typing import Union
+
+
+class ResponseEncoder:
+    """
+    Encodes table rows to the compact response formats negotiated by the mobile device.
+    The format is requested by 'responseFormat' field of DeviceInfo:
+        'dicts' (default) - list of rows, each row is a dictionary (Inventory API swagger model);
+        'rows' - 'columns' list with the names of fields and 'rows' list of the row values lists;
+        'columns' - 'columns' dictionary with the list of values of each field.
+    'responseCompression' field of DeviceInfo requests 'gzip' or 'deflate' compression of the response body.
+    """
+
+    DICTS_FORMAT = 'dicts'
+    ROWS_FORMAT = 'rows'
+    COLUMNS_FORMAT = 'columns'
+
+    _supported_formats = [DICTS_FORMAT, ROWS_FORMAT, COLUMNS_FORMAT]
+    _supported_compressions = ['gzip', 'deflate']
+
+    @staticmethod
+    def get_response_format(device_info) -> str:
+        """
+        Returns response format requested by the device
+        @param device_info: Inventory API DeviceInfo
+        @return: one of the *_FORMAT constants
+        """
+        if not device_info or not device_info.get('responseFormat'):
+            return ResponseEncoder.DICTS_FORMAT
+        response_format = str(device_info.get('responseFormat')).lower()
+        if response_format not in ResponseEncoder._supported_formats:
+            raise RuntimeError(f'Response format \'{response_format}\' is not supported')
+        return response_format
+
+    @staticmethod
+    def get_response_compression(device_info) -> Union[str, None]:
+        """
+        Returns compression of the response body requested by the device (None if not requested)
+        @param device_info: Inventory API DeviceInfo
+        @return: 'gzip', 'deflate' or None
+        """
+        if not device_info or not device_info.get('responseCompression'):
+            return None
+        compression = str(device_info.get('responseCompression')).lower()
+        if compression not in ResponseEncoder._supported_compressions:
+            raise RuntimeError(f'Response compression \'{compression}\' is not supported')
+        return compression
+
+    @staticmethod
+    def encode_rows(result: dict, response_format: str) -> dict:
+        """
+        Replaces 'result' list of rows in the response by the rows encoded to the requested format
+        @param result: response dictionary
+        @param response_format: one of the *_FORMAT constants
+        @return: response dictionary
+        """
+        rows = result.get('result')
+        if response_format == ResponseEncoder.DICTS_FORMAT or rows is None:
+            return result
+
+        # rows may have optional fields, so columns are collected from all rows (in order of appearance)
+        columns = {}
+        for row in rows:
+            for column_name in row:
+                columns.setdefault(column_name, None)
+        column_names = list(columns)
+
+        del result['result']
+        result['format'] = response_format
+        if response_format == ResponseEncoder.ROWS_FORMAT:
+            result['columns'] = column_names
+            result['rows'] = [[row.get(column_name) for column_name in column_names] for row in rows]
+        else:
+            result['columns'] = {column_name: [row.get(column_name) for row in rows] for column_name in column_names}
+        return result
+
+    @staticmethod
+    def compress(body: bytes, compression: str) -> bytes:
+        """
+        Compresses response body
+        @param body: response body
+        @param compression: 'gzip' or 'deflate'
+        @return: compressed body
+        """
+        if compression == 'gzip':
+            return gzip.compress(body)
+        return zlib.compress(body)
@@ -0,0 +1,115 @@
+from typing import Union
+
+from odoo.api import Environment
+from odoo.release import version_info
+from odoo.tools import float_round
+
+from .common_utils import CommonUtils
+
+
+class StockQuantity:
+    """
+    Computes on hand quantities ('stockQuantity' of the Inventory API) of many products at once
+    by single grouped aggregate over the 'stock_quant' table.
+    Quantities are summed over the internal locations of the allowed companies (like 'qty_available')
+    or, if the warehouse is set by 'clv_stock_warehouse_id' context key, over the internal locations of that warehouse.
+    Unlike 'qty_available', incoming and outgoing moves are not read.
+    Like 'qty_available', the quantities are rounded to the precision of the product's unit of measure.
+    """
+
+    # context key of the odoo id of the warehouse used to scope the quantities
+    WAREHOUSE_CONTEXT_KEY = 'clv_stock_warehouse_id'
+
+    @classmethod
+    def get_quantities(cls, env: Environment, product_ids) -> dict:
+        """
+        Returns on hand quantities of the products
+        @param env: Environment
+        @param product_ids: odoo ids of the products
+        @return: stock quantities by product id (0.0 for products without stock)
+        """
+        product_ids = list(product_ids)
+        stock_quantities = dict.fromkeys(product_ids, 0.0)
+        if not product_ids:
+            return stock_quantities
+
+        query_str = '''
+            SELECT q.product_id, SUM(q.quantity), u.rounding
+            FROM stock_quant q
+            JOIN stock_location l ON l.id = q.location_id
+            JOIN product_product p ON p.id = q.product_id
+            JOIN product_template t ON t.id = p.product_tmpl_id
+            JOIN uom_uom u ON u.id = t.uom_id
+            WHERE q.product_id = ANY(%s)
+              AND q.company_id = ANY(%s)
+              AND l.usage = 'internal'
+        '''
+        params = [product_ids, env.companies.ids]
+
+        warehouse_parent_path = cls._get_warehouse_parent_path(env)
+        if warehouse_parent_path:
+            query_str += ' AND l.parent_path LIKE %s'
+            params.append(warehouse_parent_path + '%')
+
+        cls._flush_quants(env)
+        env.cr.execute(query_str + ' GROUP BY q.product_id, u.rounding', params)
+        for product_id, quantity, rounding in env.cr.fetchall():
+            stock_quantities[product_id] = float_round(quantity or 0.0, precision_rounding=rounding)
+        return stock_quantities
+
+    @classmethod
+    def with_device_warehouse(cls, env: Environment, device_info) -> Environment:
+        """
+        Returns environment computing quantities of the device's warehouse
+        ('warehouseId' of the device info, unchanged environment if it is not set)
+        @param env: Environment
+        @param device_info: Inventory API DeviceInfo
+        @return: Environment
+        """
+        warehouse_id = cls.get_device_warehouse_id(device_info)
+        if not warehouse_id:
+            return env
+        return cls.with_warehouse(env, warehouse_id)
+
+    @classmethod
+    def with_warehouse(cls, env: Environment, warehouse_id: int) -> Environment:
+        """
+        Returns environment computing quantities of the warehouse
+        @param env: Environment
+        @param warehouse_id: odoo id of the warehouse
+        @return: Environment
+        """
+        return env(context=dict(env.context, **{cls.WAREHOUSE_CONTEXT_KEY: warehouse_id}))
+
+    @staticmethod
+    def get_device_warehouse_id(device_info) -> Union[int, None]:
+        """
+        Returns odoo id of the device's warehouse
+        @param device_info: Inventory API DeviceInfo
+        @return: odoo id of the warehouse or None if it is not set
+        """
+        if not device_info or not device_info.get('warehouseId'):
+            return None
+        try:
+            return CommonUtils.convert_warehouse_id_from_clv_to_odoo(str(device_info.get('warehouseId')))
+        except ValueError:
+            raise RuntimeError(f'Warehouse id \'{device_info.get("warehouseId")}\' is invalid')
+
+    @staticmethod
+    def _flush_quants(env: Environment):
+        # pending ORM updates of the quants must be written before the raw query
+        if version_info[0] >= 16:
+            env['stock.quant'].flush_model(['product_id', 'company_id', 'location_id', 'quantity'])
+        else:
+            env['stock.quant'].flush(['product_id', 'company_id', 'location_id', 'quantity'])
+
+    @classmethod
+    def _get_warehouse_parent_path(cls, env: Environment) -> Union[str, None]:
+        # locations of the warehouse are the children of its view location
+        warehouse_id = env.context.get(cls.WAREHOUSE_CONTEXT_KEY)
+        if not warehouse_id:
+            return None
+        warehouse = env['stock.warehouse'].browse(warehouse_id).exists()
+        if not warehouse or not warehouse.view_location_id:
+            return None
+        return warehouse.view_location_id.parent_path
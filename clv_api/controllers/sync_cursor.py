@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+from typing import List, Union
+
+from odoo.api import Environment
+
+
+class SyncCursor:
+    """
+    Change token of the incremental (delta) tables synchronization.
+    The device passes the token received from the previous synchronization
+    and gets only rows created, modified or deleted since then.
+    """
+
+    _token_format = '%Y-%m-%d %H:%M:%S.%f'
+
+    # Transactions running during the synchronization may commit their changes later with earlier write dates,
+    # so the next cursor starts at the start of the oldest running transaction of the database.
+    # The overlap is subtracted additionally as write dates may be set by the clock of the application server.
+    _overlap = timedelta(minutes=1)
+
+    # Deleted rows are returned by single list, so if there are more of them, full synchronization is required
+    _max_deleted_rows = 10000
+
+    def __init__(self, env: Environment, token: Union[str, None], deleted_model_names: List[str] = None,
+                 state: dict = None):
+        """
+        Ctor
+        @param env: Environment
+        @param token: sync cursor token passed by the device (empty for the first synchronization)
+        @param deleted_model_names: names of the models whose deleted records are reported as deleted rows
+        @param state: state of the sync cursor computed on the first page of the paged synchronization
+            (None for the first page, see state property)
+        """
+        if state:
+            # The following pages continue the synchronization started by the first page: the rows changed and
+            # deleted during the paging are returned by the next synchronization, so it starts where the first
+            # page started, and the decision on the full synchronization is not changed between the pages.
+            try:
+                self._next_changed_since = self._parse_token(state['next'])
+                self._changed_since = self._parse_token(state['since']) if state['since'] else None
+            except (KeyError, TypeError):
+                raise RuntimeError('Sync cursor state is invalid')
+            return
+
+        env.cr.execute('''
+            SELECT least(now(), min(xact_start)) AT TIME ZONE 'UTC'
+            FROM pg_stat_activity
+            WHERE datname = current_database() AND xact_start IS NOT NULL''')
+        self._next_changed_since = env.cr.fetchone()[0] - self._overlap
+
+        self._changed_since = None
+        if token:
+            changed_since = self._parse_token(token)
+            # Deleted rows are not kept forever, so too old cursor leads to the full synchronization
+            deleted_record = env['clv_api.deleted_record']
+            if changed_since >= deleted_record.get_retention_start() and \
+                    deleted_record.count_deleted_rows(deleted_model_names, changed_since) <= self._max_deleted_rows:
+                self._changed_since = changed_since
+
+    @classmethod
+    def _parse_token(cls, token: str) -> datetime:
+        try:
+            return datetime.strptime(token, cls._token_format)
+        except ValueError:
+            raise RuntimeError(f'Sync cursor \'{token}\' is invalid')
+
+    @property
+    def changed_since(self) -> Union[datetime, None]:
+        """
+        UTC date-time of the previous synchronization or None if full synchronization is required
+        """
+        return self._changed_since
+
+    @property
+    def is_delta(self) -> bool:
+        """
+        True if only changes since the previous synchronization are returned
+        """
+        return self._changed_since is not None
+
+    @property
+    def next_token(self) -> str:
+        """
+        Token to be passed by the device on the next synchronization
+        """
+        return self._next_changed_since.strftime(self._token_format)
+
+    @property
+    def state(self) -> dict:
+        """
+        State of the cursor to be passed to the following pages of the paged synchronization
+        """
+        return {
+            'next': self.next_token,
+            'since': self._changed_since.strftime(self._token_format) if self._changed_since else None
+        }
+
+    def get_changed_since_domain(self, field_names: List[str] = None) -> List:
+        """
+        Returns domain filter selecting records changed since the previous synchronization
+        @param field_names: date-time fields any of which is checked (write_date by default)
+        @return: empty domain in case of full synchronization
+        """
+        if not self.is_delta:
+            return []
+
+        if not field_names:
+            field_names = ['write_date']
+
+        domain = ['|'] * (len(field_names) - 1)
+        for field_name in field_names:
+            domain.append((field_name, '>', self._changed_since))
+        return domain
+
+    def get_deleted_rows(self, env: Environment, model_names: List[str]) -> List:
+        """
+        Returns rows of the passed models deleted since the previous synchronization
+        """
+        if not self.is_delta:
+            return []
+        return env['clv_api.deleted_record'].get_deleted_rows(model_names, self._changed_since,
+                                                              limit=self._max_deleted_rows)
@@ -2,6 +2,7 @@ from typing import Union
 
 from odoo.api import Environment
 from .model_converter import ModelConverter
+from .response_encoder import ResponseEncoder
 from .tables_locations import TableLocationsProcessor
 from .tables_customers_vendors import TableCustomersVendorsProcessor
 from .tables_series import TableSeriesProcessor
@@ -28,7 +29,8 @@ class TablesImpl:
         'contacts': TableContactsProcessor()
     }
 
-    def get_rows(self, env: Environment, query, device_info, offset, limit, request_count: bool):
+    def get_rows(self, env: Environment, query, device_info, offset, limit, request_count: bool,
+                 sync_token: str = None, page_token: str = None, if_unchanged_token: str = None):
         """
         Returns the page of rows depends on passed query
         @param env: Environment
@@ -37,11 +39,43 @@ class TablesImpl:
         @param offset: first record index to return
         @param limit: the maximum number of records to return
         @param request_count: need to return total number of records in query
-        @return:
+        @param sync_token: sync cursor of the previous synchronization to return only changed rows
+            (empty for the first synchronization, None if synchronization is not requested)
+        @param page_token: continuation token of the keyset pagination (used instead of offset)
+            (empty for the first page, None if keyset pagination is not requested)
+        @param if_unchanged_token: version stamp of the previously returned rows to return 'notModified' response
+            if they are not changed (empty to get the version stamp, None if version stamp is not requested)
+        @return: rows encoded to the format requested by device_info (see ResponseEncoder)
         """
-        
+        response_format = ResponseEncoder.get_response_format(device_info)
+
         key = query['from'].lower()
         if key in self._table_processor:
-            return self._table_processor[key].get_rows(env, query, device_info, offset, limit, request_count)
+            result = self._table_processor[key].get_rows(env, query, device_info, offset, limit, request_count,
+                                                         sync_token, page_token, if_unchanged_token)
         else:
-            return {"result": []}
+            result = {"result": []}
+        return ResponseEncoder.encode_rows(result, response_format)
+
+    def get_rows_batch(self, env: Environment, table_requests, device_info):
+        """
+        Returns rows of several tables. All requests are executed in the same transaction
+        (odoo's repeatable read isolation), so they see the same state of the database.
+        @param env: Environment
+        @param table_requests: list of dictionaries with get_rows arguments:
+            query, offset, limit, request_count, sync_token, page_token, if_unchanged_token
+        @param device_info: Inventory API DeviceInfo
+        @return: dictionary with 'results' list containing get_rows result of each request in the same order
+        """
+        results = []
+        for table_request in table_requests:
+            results.append(self.get_rows(env,
+                                         table_request['query'],
+                                         device_info,
+                                         table_request['offset'],
+                                         table_request['limit'],
+                                         table_request['request_count'],
+                                         table_request['sync_token'],
+                                         table_request['page_token'],
+                                         table_request['if_unchanged_token']))
+        return {'results': results}
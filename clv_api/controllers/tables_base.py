@@ -1,9 +1,15 @@
+import hashlib
+import json
 from abc import abstractmethod
-from typing import List
+from typing import List, Tuple, Union
+
 from odoo.api import Environment
 from .model_converter import ModelConverter
 from .query_converter import QueryConverter
 from .common_utils import CommonUtils
+from .page_cursor import PageCursor
+from .record_counter import RecordCounter
+from .sync_cursor import SyncCursor
 
 class TableProcessorBase:
     """
@@ -13,7 +19,8 @@ class TableProcessorBase:
     _query_converter = QueryConverter()
     cutils = CommonUtils()
 
-    def get_rows(self, env: Environment, query, device_info, offset, limit, request_count: bool):
+    def get_rows(self, env: Environment, query, device_info, offset, limit, request_count: bool,
+                 sync_token: str = None, page_token: str = None, if_unchanged_token: str = None):
         """
         Returns the page of rows depends on passed query
         @param env: Environment
@@ -22,17 +29,98 @@ class TableProcessorBase:
         @param offset: first record index to return
         @param limit: the maximum number of records to return
         @param request_count: need to return total number of records in query
+        @param sync_token: sync cursor of the previous synchronization to return only changed rows
+            (empty for the first synchronization, None if synchronization is not requested);
+            the next sync cursor is returned with the first page (with every page in case of keyset pagination)
+        @param page_token: continuation token of the keyset pagination (used instead of offset)
+            (empty for the first page, None if keyset pagination is not requested)
+        @param if_unchanged_token: version stamp of the previously returned rows,
+            the rows are not returned if the table is not modified since then
+            (empty to get the version stamp, None if version stamp is not requested)
         @return:
         """
-        res_list = self._get_rows_int(env, query, device_info, offset, limit, request_count)
+        version_stamp = None
+        if if_unchanged_token is not None:
+            version_stamp = self._get_version_stamp(env, query, device_info, offset, limit, request_count,
+                                                    sync_token, page_token)
+            if version_stamp and version_stamp == if_unchanged_token:
+                return {'notModified': True, 'versionStamp': version_stamp}
+
+        page_cursor = None
+        if page_token is not None:
+            page_cursor = PageCursor(page_token)
+
+        sync_cursor = None
+        if sync_token is not None:
+            sync_cursor = SyncCursor(env, sync_token, self._get_deleted_rows_model_names(env),
+                                     page_cursor.sync_state if page_cursor else None)
+            if page_cursor:
+                page_cursor.sync_state = sync_cursor.state
+
+        res_list = self._get_rows_int(env, query, device_info, offset, limit, request_count, sync_cursor, page_cursor)
         result = {}
         if res_list[0]:
             result['totalCount'] = res_list[0]
         result['result'] = res_list[1]
+
+        if sync_cursor:
+            # The next sync cursor is computed on the first page: with keyset pagination it is carried to the following
+            # pages by the continuation token, with offset pagination it is returned with the first page only.
+            is_first_page = not offset and not (page_cursor and page_cursor.last_values)
+            if page_cursor or is_first_page:
+                result['syncCursor'] = sync_cursor.next_token
+            result['fullSync'] = not sync_cursor.is_delta
+            # Deleted rows are returned once, with the first page of changed rows
+            if sync_cursor.is_delta and is_first_page and not request_count:
+                result['deletedRows'] = sync_cursor.get_deleted_rows(env, self._get_deleted_rows_model_names(env))
+
+        if page_cursor and page_cursor.next_token:
+            result['continuationToken'] = page_cursor.next_token
+
+        if version_stamp:
+            result['versionStamp'] = version_stamp
+
         return result
 
+    def _get_version_stamp(self, env: Environment, query, device_info, offset, limit, request_count: bool,
+                           sync_token: str, page_token: str) -> Union[str, None]:
+        """
+        Returns version stamp of the rows requested by passed arguments.
+        Stamp is computed from the number, the latest write date and the row versions of the records the rows
+        are made of, so it is changed when any of them is created, modified or deleted (see RecordCounter).
+        @return: version stamp or None if the table does not support version stamps
+        """
+        version_sources = self._get_version_sources(env, query, device_info)
+        if version_sources is None:
+            return None
+
+        stamp_data = [
+            query, offset, limit, request_count, sync_token, page_token,
+            env.uid, env.companies.ids,
+            env['ir.config_parameter'].clv_get_settings_snapshot()
+        ]
+        for (model, domain_filter) in version_sources:
+            (records_count, last_write_date, row_versions) = RecordCounter.get_version_values(model, domain_filter)
+            stamp_data.append([model._name, records_count, last_write_date.isoformat() if last_write_date else None,
+                               row_versions])
+
+        stamp_json = json.dumps(stamp_data, sort_keys=True, default=str)
+        return hashlib.sha1(stamp_json.encode()).hexdigest()
+
+    # noinspection PyMethodMayBeStatic
+    def _get_version_sources(self, env: Environment, query, device_info) -> Union[List[Tuple], None]:
+        """
+        Returns list of (model, domain filter) of the records the rows of the table are made of
+        (None if the table does not support version stamps)
+        @param env: Environment
+        @param query: Inventory API query object
+        @param device_info: Inventory API DeviceInfo
+        """
+        return None
+
     @abstractmethod
-    def _get_rows_int(self, env: Environment, query, device_info, offset, limit, request_count: bool) -> List:
+    def _get_rows_int(self, env: Environment, query, device_info, offset, limit, request_count: bool,
+                      sync_cursor: SyncCursor = None, page_cursor: PageCursor = None) -> List:
         """
         Returns the page of rows depends on passed query
         @param env: Environment
@@ -41,10 +129,45 @@ class TableProcessorBase:
         @param offset: first record index to return
         @param limit: the maximum number of records to return
         @param request_count: need to return total number of records in query
+        @param sync_cursor: sync cursor to return only rows changed since the previous synchronization or None
+        @param page_cursor: continuation cursor of the keyset pagination or None to use offset
         @return:
         """
         pass
 
+    # noinspection PyMethodMayBeStatic
+    def _count_rows(self, model, domain_filter) -> int:
+        """
+        Returns the number of records matching the domain filter (see RecordCounter)
+        """
+        return RecordCounter.count(model, domain_filter)
+
+    # noinspection PyMethodMayBeStatic
+    def _search_page(self, model, domain_filter, offset, limit, order: str, page_cursor: PageCursor = None):
+        """
+        Searches the page of records either by offset or by continuation cursor (if passed)
+        """
+        if page_cursor:
+            return page_cursor.search(model, domain_filter, limit, order)
+        return model.search(domain_filter, limit=limit, offset=offset, order=order)
+
+    # noinspection PyMethodMayBeStatic
+    def _get_deleted_rows_model_names(self, env: Environment) -> List[str]:
+        """
+        Returns names of the models whose deleted records are reported as deleted rows of the table
+        """
+        return []
+
+    # noinspection PyMethodMayBeStatic
+    def _get_changed_since_domain(self, sync_cursor: SyncCursor, field_names: List[str] = None) -> List:
+        """
+        Returns domain filter selecting records changed since the previous synchronization
+        (empty if synchronization is not requested or full synchronization is required)
+        """
+        if not sync_cursor:
+            return []
+        return sync_cursor.get_changed_since_domain(field_names)
+
     def _remove_domain_filter_by_none_id_expr(self, domain_filter, field_name):
         """
         Removes domain filter by replacing it by id != none
@@ -1,5 +1,7 @@
 from typing import List
 from .field_info import FieldInfo
+from .page_cursor import PageCursor
+from .sync_cursor import SyncCursor
 from .tables_base import TableProcessorBase
 from odoo.api import Environment
 
@@ -64,7 +66,8 @@ class TableContactsProcessor(TableProcessorBase):
     def __init__(self):
         self._api_to_odoo_map = FieldInfo.create_api_to_odoo_field_map(self._mapping_fields)
 
-    def _get_rows_int(self, env: Environment, query, device_info, offset, limit, request_count: bool) -> List:
+    def _get_rows_int(self, env: Environment, query, device_info, offset, limit, request_count: bool,
+                      sync_cursor: SyncCursor = None, page_cursor: PageCursor = None) -> List:
         where_root = query.get('whereTreeRoot')
 
         domain_filter = [('active', '=', True), ('is_blacklisted', '=', False)]
@@ -73,11 +76,13 @@ class TableContactsProcessor(TableProcessorBase):
             additional_field = self._query_converter.convert_api_where_expression_to_domain_filter(where_root, self._api_to_odoo_map)
             domain_filter.extend(additional_field)
 
+        domain_filter.extend(self._get_changed_since_domain(sync_cursor))
+
         if request_count:
-            contacts_count = env['res.partner'].search_count(domain_filter)
+            contacts_count = self._count_rows(env['res.partner'], domain_filter)
             return [contacts_count, None]
 
-        partners = env['res.partner'].search(domain_filter, limit=limit, offset=offset, order='id ASC')
+        partners = self._search_page(env['res.partner'], domain_filter, offset, limit, 'id ASC', page_cursor)
 
         contacts = []
         for partner in partners:
@@ -86,6 +91,9 @@ class TableContactsProcessor(TableProcessorBase):
 
         return [None, contacts]
 
+    def _get_deleted_rows_model_names(self, env: Environment) -> List[str]:
+        return ['res.partner']
+
     def _convert_odoo_partner_to_contact(self, partner):
         return {
             'id': self._model_converter.clear_to_str(partner.id),
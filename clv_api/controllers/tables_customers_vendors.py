@@ -2,6 +2,8 @@ from typing import List
 
 from odoo.api import Environment
 from .field_info import FieldInfo
+from .page_cursor import PageCursor
+from .sync_cursor import SyncCursor
 from .tables_base import TableProcessorBase
 
 
@@ -45,6 +47,7 @@ class TableCustomersVendorsProcessor(TableProcessorBase):
         FieldInfo(api_name_arg='isFolder'.lower(), api_type_arg=bool, odoo_name_arg='is_folder', odoo_type_arg=bool),
         FieldInfo(api_name_arg='name', api_type_arg=str, odoo_name_arg='name', odoo_type_arg=str),
         FieldInfo(api_name_arg='parentId'.lower(), api_type_arg=str, odoo_name_arg='parent_id', odoo_type_arg=str),
+        FieldInfo(api_name_arg='search', api_type_arg=str, odoo_name_arg='clv_search', odoo_type_arg=str),
         FieldInfo(api_name_arg='tin', api_type_arg=str, odoo_name_arg='vat', odoo_type_arg=str),
         FieldInfo(api_name_arg='type', api_type_arg=str, odoo_name_arg='type', odoo_type_arg=str)
     ]
@@ -52,21 +55,16 @@ class TableCustomersVendorsProcessor(TableProcessorBase):
     def __init__(self):
         self._api_to_odoo_map = FieldInfo.create_api_to_odoo_field_map(self._mapping_fields)
 
-    def _get_rows_int(self, env: Environment, query, device_info, offset, limit, request_count: bool) -> List:
-        where_root = query.get('whereTreeRoot')
-
-        domain_filter = [('active', '=', True)]
-
-        if where_root:
-            additional_filter = self._query_converter.convert_api_where_expression_to_domain_filter(where_root, self._api_to_odoo_map)
-            additional_filter = self._modify_domain_query(env, additional_filter)
-            domain_filter.extend(additional_filter)
+    def _get_rows_int(self, env: Environment, query, device_info, offset, limit, request_count: bool,
+                      sync_cursor: SyncCursor = None, page_cursor: PageCursor = None) -> List:
+        domain_filter = self._get_partners_domain_filter(env, query)
+        domain_filter.extend(self._get_changed_since_domain(sync_cursor))
 
         if request_count:
-            customers_vendors_count = env['res.partner'].search_count(domain_filter)
+            customers_vendors_count = self._count_rows(env['res.partner'], domain_filter)
             return [customers_vendors_count, None]
 
-        partners = env['res.partner'].search(domain_filter, limit=limit, offset=offset, order='id ASC')
+        partners = self._search_page(env['res.partner'], domain_filter, offset, limit, 'id ASC', page_cursor)
 
         customers_vendors = []
         for partner in partners:
@@ -74,6 +72,24 @@ class TableCustomersVendorsProcessor(TableProcessorBase):
 
         return [None, customers_vendors]
 
+    def _get_deleted_rows_model_names(self, env: Environment) -> List[str]:
+        return ['res.partner']
+
+    def _get_version_sources(self, env: Environment, query, device_info):
+        return [(env['res.partner'], self._get_partners_domain_filter(env, query))]
+
+    def _get_partners_domain_filter(self, env: Environment, query):
+        where_root = query.get('whereTreeRoot')
+
+        domain_filter = [('active', '=', True)]
+
+        if where_root:
+            additional_filter = self._query_converter.convert_api_where_expression_to_domain_filter(where_root, self._api_to_odoo_map)
+            additional_filter = self._modify_domain_query(env, additional_filter)
+            domain_filter.extend(additional_filter)
+
+        return domain_filter
+
     # noinspection PyMethodMayBeStatic
     def _modify_domain_query(self, env, domain_filter):
         result = []
@@ -1,6 +1,9 @@
 from typing import List
 
 from .field_info import FieldInfo
+from .page_cursor import PageCursor
+from .stock_quantity import StockQuantity
+from .sync_cursor import SyncCursor
 from .tables_base import TableProcessorBase
 from odoo.api import Environment
 
@@ -22,7 +25,8 @@ class TableInventoryProcessor(TableProcessorBase):
     def __init__(self):
         self._api_to_odoo_map = FieldInfo.create_api_to_odoo_field_map(self._mapping_fields)
 
-    def _get_rows_int(self, env: Environment, query, device_info, offset, limit, request_count: bool) -> List:
+    def _get_rows_int(self, env: Environment, query, device_info, offset, limit, request_count: bool,
+                      sync_cursor: SyncCursor = None, page_cursor: PageCursor = None) -> List:
         where_root = query.get('whereTreeRoot')
 
         domain_filter = [
@@ -35,19 +39,24 @@ class TableInventoryProcessor(TableProcessorBase):
             additional_filter = self._replace_specific_filters(additional_filter)
             domain_filter.extend(additional_filter)
 
+        # Stock quantity of the item changes without modification of the product itself
+        domain_filter.extend(self._get_changed_since_domain(sync_cursor, ['write_date', 'stock_quant_ids.write_date']))
+
         result = [None, None]
 
         if request_count:
-            result[0] = len(env['product.product'].search(domain_filter, limit=limit, offset=offset, order='id ASC'))
+            result[0] = self._count_rows(env['product.product'], domain_filter)
 
-        items = env['product.product'].search(domain_filter, limit=limit, offset=offset, order='id ASC')
+        items = self._search_page(env['product.product'], domain_filter, offset, limit, 'id ASC', page_cursor)
+        # quantities of the whole page by single query (of the device's warehouse if it is requested)
+        stock_quantities = StockQuantity.get_quantities(env, items.ids)
 
         rows = []
         for item in items:
             row = {
                 'id': str(item.id),
                 'name': str(item.name),
-                'stockquantity': item.qty_available,
+                'stockquantity': stock_quantities[item.id],
                 'withserialnumber': item.tracking == 'serial',
                 'withseries': item.tracking == 'lot'
             }
@@ -3,6 +3,9 @@ from typing import List
 from .clv_settings_provider import ClvSettingsProvider
 from .common_utils import CommonUtils
 from .field_info import FieldInfo
+from .location_tree import LocationTree
+from .page_cursor import PageCursor
+from .sync_cursor import SyncCursor
 from .tables_base import TableProcessorBase
 from odoo.api import Environment
 
@@ -43,7 +46,28 @@ class TableLocationsProcessor(TableProcessorBase):
     def __init__(self):
         self._api_to_odoo_map = FieldInfo.create_api_to_odoo_field_map(self._mapping_fields)
 
-    def _get_rows_int(self, env: Environment, query, device_info, offset, limit, request_count: bool):
+    def _get_rows_int(self, env: Environment, query, device_info, offset, limit, request_count: bool,
+                      sync_cursor: SyncCursor = None, page_cursor: PageCursor = None):
+        business_query = self._get_business_query(env, query, device_info)
+
+        changed_since_filter = self._get_changed_since_domain(sync_cursor)
+
+        if request_count:
+            return [self._get_clv_locations_count(env, business_query, changed_since_filter), None]
+
+        return [None, self._get_clv_locations(env, business_query, changed_since_filter, limit, offset, page_cursor)]
+
+    def _get_deleted_rows_model_names(self, env: Environment) -> List[str]:
+        return ['stock.warehouse', 'stock.location']
+
+    def _get_version_sources(self, env: Environment, query, device_info):
+        business_query = self._get_business_query(env, query, device_info)
+        return [
+            (env['stock.warehouse'], self._get_warehouses_domain_filter(business_query, [])),
+            (env['stock.location'], self._get_locations_domain_filter(business_query, []))
+        ]
+
+    def _get_business_query(self, env: Environment, query, device_info):
         where_root = query.get('whereTreeRoot')
 
         pick_doc = self.cutils.get_odoo_doc_from_device_info(env, device_info)
@@ -57,20 +81,18 @@ class TableLocationsProcessor(TableProcessorBase):
         if location_parent_path:
             business_query.append(('parent_path', '=like', location_parent_path + '%'))
 
-        if request_count:
-            return [self._get_clv_locations_count(env, business_query), None]
-
-        return [None, self._get_clv_locations(env, business_query, limit, offset)]
+        return business_query
 
-    def _get_clv_locations_count(self, env: Environment, additional_filter) -> int:
+    def _get_warehouses_domain_filter(self, additional_filter, changed_since_filter):
         warehouses_domain_filter = [
             ('active', '=', True),
             ('company_id.active', '=', True)
         ]
-
         warehouses_domain_filter.extend(self._prepare_filter_for_odoo_warehouses(additional_filter))
-        warehouses_count = env['stock.warehouse'].search_count(warehouses_domain_filter)
+        warehouses_domain_filter.extend(changed_since_filter)
+        return warehouses_domain_filter
 
+    def _get_locations_domain_filter(self, additional_filter, changed_since_filter):
         locations_domain_filter = [
             '|',
             ('active', '=', True),
@@ -83,19 +105,44 @@ class TableLocationsProcessor(TableProcessorBase):
             ('warehouse_id.active', '=', True)
         ]
         locations_domain_filter.extend(self._prepare_filter_for_odoo_locations(additional_filter))
-        locations_count = env['stock.location'].search_count(locations_domain_filter)
+        locations_domain_filter.extend(changed_since_filter)
+        return locations_domain_filter
+
+    def _get_clv_locations_count(self, env: Environment, additional_filter, changed_since_filter) -> int:
+        warehouses_domain_filter = self._get_warehouses_domain_filter(additional_filter, changed_since_filter)
+        warehouses_count = self._count_rows(env['stock.warehouse'], warehouses_domain_filter)
+
+        locations_domain_filter = self._get_locations_domain_filter(additional_filter, changed_since_filter)
+        locations_count = self._count_rows(env['stock.location'], locations_domain_filter)
 
         return warehouses_count + locations_count
 
-    def _get_clv_locations(self, env: Environment, additional_filter, limit, offset):
+    def _get_clv_locations(self, env: Environment, additional_filter, changed_since_filter, limit, offset,
+                           page_cursor: PageCursor = None):
+        # Warehouses and locations are returned as a single ordered stream of rows: warehouses first, then locations.
         result = []
 
-        warehouses_domain_filter = [
-            ('active', '=', True),
-            ('company_id.active', '=', True)
-        ]
-        warehouses_domain_filter.extend(self._prepare_filter_for_odoo_warehouses(additional_filter))
-        warehouses = env['stock.warehouse'].search(warehouses_domain_filter, limit=limit, offset=offset, order='id ASC')
+        warehouses_domain_filter = self._get_warehouses_domain_filter(additional_filter, changed_since_filter)
+        locations_domain_filter = self._get_locations_domain_filter(additional_filter, changed_since_filter)
+
+        if page_cursor:
+            (warehouses, locations) = self._search_clv_locations_page(env, warehouses_domain_filter, locations_domain_filter,
+                                                                      limit, page_cursor)
+        else:
+            (warehouses, locations) = self._search_clv_locations_offset_page(env, warehouses_domain_filter,
+                                                                             locations_domain_filter, limit, offset)
+
+        # Locations are described by the cached snapshot of the location tree instead of reading their relations
+        # (locations absent in the snapshot are read from the records)
+        tree_locations = LocationTree(env).get_all(locations.ids)
+
+        # Page may contain locations without their warehouses
+        visible_warehouse_ids = set(warehouses.ids)
+        not_paged_warehouse_ids = {location['warehouseId'] for location in tree_locations.values()
+                                   if location['warehouseId']} - visible_warehouse_ids
+        if not_paged_warehouse_ids:
+            visible_warehouse_ids.update(env['stock.warehouse'].search(
+                warehouses_domain_filter + [('id', 'in', list(not_paged_warehouse_ids))]).ids)
 
         for warehouse in warehouses:
             result.append({
@@ -107,49 +154,80 @@ class TableLocationsProcessor(TableProcessorBase):
                 'parentId': self._model_converter.clear_to_str(warehouse.view_location_id.location_id.id)
             })
 
-        locations_domain_filter = [
-            '|',
-            ('active', '=', True),
-            ('active', '=', False),
-            '|',
-            ('company_id', '=', False),
-            ('company_id.active', '=', True),
-            '|',
-            ('warehouse_id', '=', False),
-            ('warehouse_id.active', '=', True)
-        ]
-        locations_domain_filter.extend(self._prepare_filter_for_odoo_locations(additional_filter))
-        locations = env['stock.location'].search(locations_domain_filter, limit=limit, offset=offset, order='id ASC')
+        allow_only_lowest_level_locations = ClvSettingsProvider(env).allow_only_lowest_level_locations
 
-        for location in locations:
-            parent_id = None
-            if location.location_id:
-                parent_id = location.location_id.id
+        for location_id in locations.ids:
+            location = tree_locations[location_id]
 
-            if location.usage == 'view':
-                if location.warehouse_id:
-                    if location.warehouse_id in warehouses:
-                        parent_id = CommonUtils.convert_warehouse_id_from_odoo_to_clv(location.warehouse_id.id)
+            parent_id = location['parentId'] or None
 
-            barcode = location.complete_name
-            if location.barcode:
-                barcode = location.barcode
+            if location['usage'] == 'view':
+                if location['warehouseId']:
+                    if location['warehouseId'] in visible_warehouse_ids:
+                        parent_id = CommonUtils.convert_warehouse_id_from_odoo_to_clv(location['warehouseId'])
 
-            not_selectable = not location.active \
-                or location.usage in ['view'] \
-                or (ClvSettingsProvider(env).allow_only_lowest_level_locations and len(location.child_ids) > 0)
+            not_selectable = not location['active'] \
+                or location['usage'] in ['view'] \
+                or (allow_only_lowest_level_locations and not location['isLowestLevel'])
 
             result.append({
-                'id': self._model_converter.clear_to_str(location.id),
-                'name': self._model_converter.clear_to_str(location.complete_name),
-                'barcode': self._model_converter.clear_to_str(barcode),
-                'isGroup': len(location.child_ids) > 0,
+                'id': self._model_converter.clear_to_str(location_id),
+                'name': self._model_converter.clear_to_str(location['name']),
+                'barcode': self._model_converter.clear_to_str(location['barcode']),
+                'isGroup': location['childCount'] > 0,
                 'notSelectable': not_selectable,
                 'parentId': self._model_converter.clear_to_str(parent_id)
             })
 
         return result
 
+    def _search_clv_locations_offset_page(self, env: Environment, warehouses_domain_filter, locations_domain_filter,
+                                          limit, offset):
+        # Offset is applied to the single stream: warehouses first, then locations.
+        offset = offset or 0
+        warehouses = env['stock.warehouse'].search(warehouses_domain_filter, limit=limit, offset=offset, order='id ASC')
+
+        locations = env['stock.location']
+        rest_limit = limit - len(warehouses) if limit else None
+        if rest_limit is None or rest_limit > 0:
+            if warehouses:
+                # the page contains the last warehouses, locations start from the first one
+                locations_offset = 0
+            else:
+                locations_offset = max(offset - env['stock.warehouse'].search_count(warehouses_domain_filter), 0)
+            locations = env['stock.location'].search(locations_domain_filter, limit=rest_limit, offset=locations_offset,
+                                                     order='id ASC')
+
+        return warehouses, locations
+
+    def _search_clv_locations_page(self, env: Environment, warehouses_domain_filter, locations_domain_filter, limit,
+                                   page_cursor: PageCursor):
+        # Warehouses and locations are paged as a single stream: warehouses first, then locations.
+        # Continuation token contains the kind and the id of the last row: ['warehouse', id] or ['location', id].
+        last_values = page_cursor.last_values
+
+        warehouses = env['stock.warehouse']
+        if not last_values or last_values[0] == 'warehouse':
+            seek_filter = [('id', '>', int(last_values[1]))] if last_values else []
+            warehouses = env['stock.warehouse'].search(warehouses_domain_filter + seek_filter, limit=limit, order='id ASC')
+
+        locations = env['stock.location']
+        rest_limit = limit - len(warehouses) if limit else None
+        if rest_limit is None or rest_limit > 0:
+            seek_filter = []
+            if last_values and last_values[0] == 'location':
+                seek_filter = [('id', '>', int(last_values[1]))]
+            locations = env['stock.location'].search(locations_domain_filter + seek_filter, limit=rest_limit, order='id ASC')
+
+        page_cursor.set_next_values(None)
+        if limit and len(warehouses) + len(locations) >= limit:
+            if locations:
+                page_cursor.set_next_values(['location', locations[-1].id])
+            else:
+                page_cursor.set_next_values(['warehouse', warehouses[-1].id])
+
+        return warehouses, locations
+
     def _prepare_filter_for_odoo_warehouses(self, domain_filter):
         result = []
         for item in domain_filter:
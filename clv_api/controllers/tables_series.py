@@ -3,6 +3,8 @@ from typing import List
 
 from odoo.release import version_info
 from .field_info import FieldInfo
+from .page_cursor import PageCursor
+from .sync_cursor import SyncCursor
 from .tables_base import TableProcessorBase
 from odoo.api import Environment
 
@@ -51,6 +53,7 @@ class TableSeriesProcessor(TableProcessorBase):
         FieldInfo(api_name_arg='number', api_type_arg=str, odoo_name_arg='number', odoo_type_arg=str),
         FieldInfo(api_name_arg='seriesDate'.lower(), api_type_arg=str, odoo_name_arg='create_date', odoo_type_arg=datetime.datetime),
         FieldInfo(api_name_arg='seriesName'.lower(), api_type_arg=str, odoo_name_arg='name', odoo_type_arg=str),
+        FieldInfo(api_name_arg='search', api_type_arg=str, odoo_name_arg='clv_search', odoo_type_arg=str),
         FieldInfo(api_name_arg='seriesKey'.lower(), api_type_arg=str, odoo_name_arg='product_id', odoo_type_arg=int, odoo_null_value_equivalent_arg='-1'),
         FieldInfo(api_name_arg='sortIndex'.lower(), api_type_arg=int, odoo_name_arg='sort_index', odoo_type_arg=int)
     ]
@@ -58,7 +61,8 @@ class TableSeriesProcessor(TableProcessorBase):
     def __init__(self):
         self._api_to_odoo_map = FieldInfo.create_api_to_odoo_field_map(self._mapping_fields)
 
-    def _get_rows_int(self, env: Environment, query, device_info, offset, limit, request_count: bool):
+    def _get_rows_int(self, env: Environment, query, device_info, offset, limit, request_count: bool,
+                      sync_cursor: SyncCursor = None, page_cursor: PageCursor = None):
         where_root = query.get('whereTreeRoot')
 
         domain_filter = [('product_id.product_tmpl_id.tracking', '=', 'lot')]
@@ -71,15 +75,20 @@ class TableSeriesProcessor(TableProcessorBase):
             additional_filter = self._modify_domain_query(env, additional_filter)
             domain_filter.extend(additional_filter)
 
+        domain_filter.extend(self._get_changed_since_domain(sync_cursor))
+
         stock_lot_entity_name = self.cutils.get_stock_lot_env_name()
         if request_count:
-            rows_count = env[stock_lot_entity_name].search_count(domain_filter)
+            rows_count = self._count_rows(env[stock_lot_entity_name], domain_filter)
             return [rows_count, None]
 
-        series = env[stock_lot_entity_name].search(domain_filter, limit=limit, offset=offset, order='id ASC')
+        series = self._search_page(env[stock_lot_entity_name], domain_filter, offset, limit, 'id ASC', page_cursor)
         rows = [self._model_converter.convert_odoo_lot_to_series(s) for s in series]
         return [None, rows]
 
+    def _get_deleted_rows_model_names(self, env: Environment) -> List[str]:
+        return [self.cutils.get_stock_lot_env_name()]
+
     # noinspection PyMethodMayBeStatic
     def _modify_domain_query(self, env, domain_filter):
         result = []
@@ -2,8 +2,11 @@ from typing import List
 
 from .common_utils import CommonUtils
 from .field_info import FieldInfo
+from .page_cursor import PageCursor
+from .sync_cursor import SyncCursor
 from .tables_base import TableProcessorBase
 from odoo.api import Environment
+from odoo.release import version_info
 
 
 class TableStockProcessor(TableProcessorBase):
@@ -66,10 +69,14 @@ class TableStockProcessor(TableProcessorBase):
         FieldInfo(api_name_arg='warehouseId'.lower(), api_type_arg=str, odoo_name_arg='location_id.warehouse_id.id', odoo_type_arg=str, odoo_null_value_equivalent_arg='-1')
     ]
 
+    # comparison operators allowed in the filter by available quantity
+    _available_quantity_operators = ['=', '!=', '<', '>', '<=', '>=']
+
     def __init__(self):
         self._api_to_odoo_map = FieldInfo.create_api_to_odoo_field_map(self._mapping_fields)
 
-    def _get_rows_int(self, env: Environment, query, device_info, offset, limit, request_count: bool) -> List:
+    def _get_rows_int(self, env: Environment, query, device_info, offset, limit, request_count: bool,
+                      sync_cursor: SyncCursor = None, page_cursor: PageCursor = None) -> List:
         where_root = query.get('whereTreeRoot')
 
         domain_filter = [
@@ -81,12 +88,15 @@ class TableStockProcessor(TableProcessorBase):
             additional_filter = self._modify_domain_query(env, additional_filter)
             domain_filter.extend(additional_filter)
 
+        # quants of the restored (unarchived) locations are returned again
+        domain_filter.extend(self._get_changed_since_domain(sync_cursor, ['write_date', 'location_id.write_date']))
+
         if request_count:
-            rows_count = env['stock.quant'].search_count(domain_filter)
+            rows_count = self._count_rows(env['stock.quant'], domain_filter)
             return [rows_count, None]
         
         # Arrange stock quantities in descending order of the write date in order to get the most recent ones first
-        stock_quants = env['stock.quant'].search(domain_filter, limit=limit, offset=offset, order='write_date DESC, id ASC')
+        stock_quants = self._search_page(env['stock.quant'], domain_filter, offset, limit, 'write_date DESC, id ASC', page_cursor)
 
         rows = []
         for stock_quant in stock_quants:
@@ -94,6 +104,9 @@ class TableStockProcessor(TableProcessorBase):
 
         return [None, rows]
 
+    def _get_deleted_rows_model_names(self, env: Environment) -> List[str]:
+        return ['stock.quant']
+
     # noinspection PyMethodMayBeStatic
     def _modify_domain_query(self, env, domain_filter):
         result = []
@@ -125,24 +138,26 @@ class TableStockProcessor(TableProcessorBase):
     def _modify_available_quantity_field_filter(self, env, origin_filter):
         # 'available_quantity' is calculated and non-stored field of 'stock.quant'
         # therefore it is not impossible to use it in domain filter directly.
-        # To solve this, we use this tricky way with additional request to 'stock.quant' table.
-        # Direct SQL-request is using to improve performance.
+        # To solve this, the condition is pushed down to the database
+        # as parameterized sub-query of the main 'stock.quant' search.
         operator = origin_filter[1]
-        value = origin_filter[2]
-
-        query = f"""
-                    SELECT sq.id
-                    FROM stock_quant sq
-                    JOIN stock_location sl ON sq.location_id = sl.id
-                    WHERE (sq.quantity - sq.reserved_quantity) {operator} {value}
-                    AND sl.active = True
-                """
-        env.cr.execute(query)
-        stock_quants = env.cr.fetchall()
-        ids = [stock_quant[0] for stock_quant in stock_quants]
+        if operator not in self._available_quantity_operators:
+            raise RuntimeError(f'Operator \'{operator}\' is not supported for \'quantity\' field')
+        value = float(origin_filter[2])
+
+        condition = f'("stock_quant"."quantity" - "stock_quant"."reserved_quantity") {operator} %s'
+
+        if version_info[0] < 14:
+            # Old versions do not support sub-queries in domain filters
+            env.cr.execute(f'SELECT id FROM stock_quant WHERE {condition}', [value])
+            # noinspection PyRedundantParentheses
+            return ('id', 'in', [row[0] for row in env.cr.fetchall()])
+
+        available_quants_query = env['stock.quant']._search([])
+        available_quants_query.add_where(condition, [value])
 
         # noinspection PyRedundantParentheses
-        return ('id', 'in', ids)
+        return ('id', 'in', available_quants_query)
 
     # noinspection PyMethodMayBeStatic
     def _modify_quantity_for_placement_field_filter(self, env, origin_filter):
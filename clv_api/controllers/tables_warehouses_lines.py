@@ -5,6 +5,8 @@ from odoo.api import Environment
 from .clv_settings_provider import ClvSettingsProvider
 from .common_utils import CommonUtils
 from .field_info import FieldInfo
+from .page_cursor import PageCursor
+from .sync_cursor import SyncCursor
 from .tables_base import TableProcessorBase
 
 
@@ -42,35 +44,22 @@ class TableWarehousesLinesProcessor(TableProcessorBase):
         FieldInfo(api_name_arg='addressable', api_type_arg=bool, odoo_name_arg='addressable', odoo_type_arg=bool),
         FieldInfo(api_name_arg='isfolder', api_type_arg=bool, odoo_name_arg='is_folder', odoo_type_arg=bool),
         FieldInfo(api_name_arg='parentid', api_type_arg=str, odoo_name_arg='parent_id', odoo_type_arg=str),
+        FieldInfo(api_name_arg='search', api_type_arg=str, odoo_name_arg='clv_search', odoo_type_arg=str),
     ]
 
     def __init__(self):
         self._api_to_odoo_map = FieldInfo.create_api_to_odoo_field_map(self._mapping_fields)
 
-    def _get_rows_int(self, env: Environment, query, device_info, offset, limit, request_count: bool):
-        where_root = query.get('whereTreeRoot')
+    def _get_rows_int(self, env: Environment, query, device_info, offset, limit, request_count: bool,
+                      sync_cursor: SyncCursor = None, page_cursor: PageCursor = None):
         result = [None, []]
-        domain_filter = [
-            ('active', '=', True),
-            ('company_id.active', '=', True)
-        ]
-
-        # If 'deviceInfo' contains information about document
-        # then if possible we try to add a filter by company
-        # in order to return only warehouses of the company that is selected in the document.
-        found_doc = self.cutils.get_odoo_doc_from_device_info(env, device_info)
-        self.cutils.append_company_filter_by_doc(domain_filter, found_doc)
-
-        if where_root:
-            domain_query_list = self._query_converter \
-                .convert_api_where_expression_to_domain_filter(where_root, self._api_to_odoo_map)
-            domain_query_list = self._modify_domain_query(env, domain_query_list)
-            domain_filter.extend(domain_query_list)
+        domain_filter = self._get_warehouses_domain_filter(env, query, device_info)
+        domain_filter.extend(self._get_changed_since_domain(sync_cursor))
 
         if request_count:
-            result[0] = env['stock.warehouse'].search_count(domain_filter)
+            result[0] = self._count_rows(env['stock.warehouse'], domain_filter)
 
-        warehouses = env['stock.warehouse'].search(domain_filter, limit=limit, offset=offset, order='id ASC')
+        warehouses = self._search_page(env['stock.warehouse'], domain_filter, offset, limit, 'id ASC', page_cursor)
         locations_enabled = CommonUtils.is_storage_locations_enabled(env) and ClvSettingsProvider(env).default_scan_locations
 
         rows = []
@@ -83,13 +72,44 @@ class TableWarehousesLinesProcessor(TableProcessorBase):
                 'parentId': '',
                 'isFolder': False,
                 'addressable': locations_enabled and bool(warehouse.lot_stock_id.child_ids),
-                'search': CommonUtils.generate_search_string([warehouse.name, warehouse.code])
+                'search': self._model_converter.clear_to_str(warehouse.clv_search)
             }
             rows.append(row)
 
         result[1] = rows
         return result
 
+    def _get_deleted_rows_model_names(self, env: Environment) -> List[str]:
+        return ['stock.warehouse']
+
+    def _get_version_sources(self, env: Environment, query, device_info):
+        return [
+            (env['stock.warehouse'], self._get_warehouses_domain_filter(env, query, device_info)),
+            # 'addressable' depends on child locations of the warehouses
+            (env['stock.location'], [('warehouse_id', '!=', False)])
+        ]
+
+    def _get_warehouses_domain_filter(self, env: Environment, query, device_info):
+        where_root = query.get('whereTreeRoot')
+        domain_filter = [
+            ('active', '=', True),
+            ('company_id.active', '=', True)
+        ]
+
+        # If 'deviceInfo' contains information about document
+        # then if possible we try to add a filter by company
+        # in order to return only warehouses of the company that is selected in the document.
+        found_doc = self.cutils.get_odoo_doc_from_device_info(env, device_info)
+        self.cutils.append_company_filter_by_doc(domain_filter, found_doc)
+
+        if where_root:
+            domain_query_list = self._query_converter \
+                .convert_api_where_expression_to_domain_filter(where_root, self._api_to_odoo_map)
+            domain_query_list = self._modify_domain_query(env, domain_query_list)
+            domain_filter.extend(domain_query_list)
+
+        return domain_filter
+
     # noinspection PyMethodMayBeStatic
     def _modify_domain_query(self, env, domain_filter):
         result = []
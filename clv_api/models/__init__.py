@@ -1,4 +1,15 @@
-
 from . import stock_picking
 from . import clv_api_settings
-from . import clv_connected_database_info
\ No newline at end of file
+from . import clv_connected_database_info
+from . import clv_product_search_code
+from . import product_product
+from . import clv_deleted_record
+from . import stock_quant
+from . import stock_lot
+from . import stock_location
+from . import clv_document_job
+from . import stock_warehouse
+from . import ir_config_parameter
+from . import res_partner
+from . import clv_call_metric
+from . import stock_move_line
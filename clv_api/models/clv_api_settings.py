@@ -19,6 +19,7 @@ class ResConfigSettings(models.TransientModel):
     clv_auto_create_backorders = fields.Boolean(string="Automatic Backorder Document Generation")
     clv_use_fake_serials_in_receiving = fields.Boolean(string="Temporary Serial Numbers")
     clv_ship_expected_actual_lines = fields.Boolean(string="Send Actual Quantities")
+    clv_collect_call_metrics = fields.Boolean(string="Collect API Call Statistics")
 
     def set_values(self):
         res = super(ResConfigSettings, self).set_values()
@@ -32,6 +33,7 @@ class ResConfigSettings(models.TransientModel):
         config_params.set_param('clv_api.clv_auto_create_backorders', not self.clv_auto_create_backorders)
         config_params.set_param('clv_api.clv_use_fake_serials_in_receiving', self.clv_use_fake_serials_in_receiving)
         config_params.set_param('clv_api.clv_ship_expected_actual_lines', self.clv_ship_expected_actual_lines)
+        config_params.set_param('clv_api.clv_collect_call_metrics', self.clv_collect_call_metrics)
 
         return res
 
@@ -52,6 +54,7 @@ class ResConfigSettings(models.TransientModel):
         auto_backorders_value = not config_params.get_param('clv_api.clv_auto_create_backorders')
         use_fake_serials_value = config_params.get_param('clv_api.clv_use_fake_serials_in_receiving')
         ship_expected_actual_lines_value = config_params.get_param('clv_api.clv_ship_expected_actual_lines')
+        collect_call_metrics_value = config_params.get_param('clv_api.clv_collect_call_metrics')
 
         res.update(
             clv_warehouse15_connected=warehouse15_connected,
@@ -60,7 +63,8 @@ class ResConfigSettings(models.TransientModel):
             clv_allow_only_lowest_level_locations=bool(value_only_lowest_locs),
             clv_auto_create_backorders=bool(auto_backorders_value),
             clv_use_fake_serials_in_receiving=bool(use_fake_serials_value),
-            clv_ship_expected_actual_lines=bool(ship_expected_actual_lines_value)
+            clv_ship_expected_actual_lines=bool(ship_expected_actual_lines_value),
+            clv_collect_call_metrics=bool(collect_call_metrics_value)
         )
 
         return res
@@ -0,0 +1,84 @@
+from odoo import models, fields, api, tools
+
+
+class CallMetric(models.Model):
+    """
+    Measurements of the Inventory API calls (collected if 'clv_api.clv_collect_call_metrics' setting is on).
+    Used to find slow device calls and for capacity planning.
+    """
+    _name = 'clv_api.call_metric'
+    _description = 'API call metric'
+    _order = 'id DESC'
+
+    # measurements older than this are removed
+    _retention_days = 14
+
+    endpoint = fields.Char(string="Endpoint", required=True, index=True)
+    type_name = fields.Char(string="Table / Document Type")
+    user_id = fields.Many2one('res.users', string="User", ondelete='set null')
+    call_date = fields.Datetime(string="Call Date", required=True, index=True, default=fields.Datetime.now)
+    duration_ms = fields.Float(string="Duration (ms)")
+    sql_count = fields.Integer(string="SQL Queries")
+    sql_time_ms = fields.Float(string="SQL Time (ms)")
+    rows_count = fields.Integer(string="Rows")
+    response_bytes = fields.Integer(string="Response Size (bytes)")
+
+    @api.model
+    def register(self, values: dict):
+        """
+        Stores measurements of the call
+        @param values: values of the metric's fields
+        """
+        self.sudo().create(values)
+
+    @api.model
+    def _gc_call_metrics(self):
+        # called by the daily cron job (@api.autovacuum is not available in Odoo 13)
+        retention_start = fields.Datetime.subtract(fields.Datetime.now(), days=self._retention_days)
+        self.sudo().search([('call_date', '<', retention_start)]).unlink()
+
+
+class CallMetricSummary(models.Model):
+    """
+    Percentiles of the stored call metrics by endpoint and table / document type
+    """
+    _name = 'clv_api.call_metric_summary'
+    _description = 'API call metrics summary'
+    _auto = False
+    _order = 'duration_p95 DESC'
+
+    endpoint = fields.Char(string="Endpoint", readonly=True)
+    type_name = fields.Char(string="Table / Document Type", readonly=True)
+    calls_count = fields.Integer(string="Calls", readonly=True)
+    duration_p50 = fields.Float(string="Duration p50 (ms)", readonly=True)
+    duration_p95 = fields.Float(string="Duration p95 (ms)", readonly=True)
+    duration_p99 = fields.Float(string="Duration p99 (ms)", readonly=True)
+    sql_count_p50 = fields.Float(string="SQL Queries p50", readonly=True)
+    sql_count_p95 = fields.Float(string="SQL Queries p95", readonly=True)
+    sql_time_p95 = fields.Float(string="SQL Time p95 (ms)", readonly=True)
+    rows_p95 = fields.Float(string="Rows p95", readonly=True)
+    response_bytes_p95 = fields.Float(string="Response Size p95 (bytes)", readonly=True)
+    last_call_date = fields.Datetime(string="Last Call", readonly=True)
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute(f'''
+            CREATE OR REPLACE VIEW {self._table} AS (
+                SELECT
+                    row_number() OVER (ORDER BY endpoint, type_name) AS id,
+                    endpoint,
+                    type_name,
+                    count(*) AS calls_count,
+                    percentile_cont(0.5) WITHIN GROUP (ORDER BY duration_ms) AS duration_p50,
+                    percentile_cont(0.95) WITHIN GROUP (ORDER BY duration_ms) AS duration_p95,
+                    percentile_cont(0.99) WITHIN GROUP (ORDER BY duration_ms) AS duration_p99,
+                    percentile_cont(0.5) WITHIN GROUP (ORDER BY sql_count) AS sql_count_p50,
+                    percentile_cont(0.95) WITHIN GROUP (ORDER BY sql_count) AS sql_count_p95,
+                    percentile_cont(0.95) WITHIN GROUP (ORDER BY sql_time_ms) AS sql_time_p95,
+                    percentile_cont(0.95) WITHIN GROUP (ORDER BY rows_count) AS rows_p95,
+                    percentile_cont(0.95) WITHIN GROUP (ORDER BY response_bytes) AS response_bytes_p95,
+                    max(call_date) AS last_call_date
+                FROM clv_api_call_metric
+                GROUP BY endpoint, type_name
+            )
+        ''')
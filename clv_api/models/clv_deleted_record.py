@@ -0,0 +1,101 @@
+import json
+from datetime import datetime, timedelta
+
+from odoo import models, fields, api
+
+
+class DeletedRecord(models.Model):
+    """
+    Contains tombstones of the deleted (or archived) records.
+    Used by incremental (delta) synchronization of the tables to report deleted rows to mobile devices.
+    """
+    _name = 'clv_api.deleted_record'
+    _description = 'Deleted record'
+
+    # tombstones older than this are removed, devices with older sync cursor have to make full synchronization
+    _retention_days = 30
+
+    model_name = fields.Char(string="Model Name", required=True, index=True)
+    res_id = fields.Integer(string="Record ID", required=True)
+    row_data = fields.Text(string="Row Data")
+    deletion_date = fields.Datetime(string="Deletion Date", required=True, index=True, default=fields.Datetime.now)
+
+    @api.model
+    def register(self, records, rows=None):
+        """
+        Creates tombstones for the records which are going to be deleted.
+        @param records: deleting records
+        @param rows: optional list of table rows (one per record) to be reported as deleted instead of the record id
+        """
+        if not records:
+            return
+
+        values = []
+        for index, record in enumerate(records):
+            record_values = {'model_name': records._name, 'res_id': record.id}
+            if rows:
+                record_values['row_data'] = json.dumps(rows[index])
+            values.append(record_values)
+
+        self.sudo().create(values)
+
+    @api.model
+    def unregister(self, records):
+        """
+        Removes tombstones of the records which are restored (unarchived),
+        so they are reported by the synchronization as changed rows only
+        @param records: restored records
+        """
+        if not records:
+            return
+        self.sudo().search([('model_name', '=', records._name), ('res_id', 'in', records.ids)]).unlink()
+
+    @api.model
+    def get_deleted_rows(self, model_names, deleted_since: datetime, limit: int = None) -> list:
+        """
+        Returns rows deleted since passed date-time
+        @param model_names: names of the models to return deleted rows of
+        @param deleted_since: UTC date-time of the previous synchronization
+        @param limit: the maximum number of rows to return
+        @return: list of deleted rows ({'id': ...} if row data was not registered)
+        """
+        if not model_names:
+            return []
+
+        tombstones = self.sudo().search(self._get_deleted_since_domain(model_names, deleted_since),
+                                        limit=limit, order='id ASC')
+
+        result = []
+        for tombstone in tombstones:
+            if tombstone.row_data:
+                result.append(json.loads(tombstone.row_data))
+            else:
+                result.append({'id': str(tombstone.res_id)})
+        return result
+
+    @api.model
+    def count_deleted_rows(self, model_names, deleted_since: datetime) -> int:
+        """
+        Returns the number of rows deleted since passed date-time
+        @param model_names: names of the models to count deleted rows of
+        @param deleted_since: UTC date-time of the previous synchronization
+        """
+        if not model_names:
+            return 0
+        return self.sudo().search_count(self._get_deleted_since_domain(model_names, deleted_since))
+
+    @api.model
+    def get_retention_start(self) -> datetime:
+        """
+        Returns UTC date-time since that tombstones are guaranteed to be kept
+        """
+        return datetime.utcnow() - timedelta(days=self._retention_days)
+
+    # noinspection PyMethodMayBeStatic
+    def _get_deleted_since_domain(self, model_names, deleted_since: datetime) -> list:
+        return [('model_name', 'in', model_names), ('deletion_date', '>', deleted_since)]
+
+    @api.model
+    def _gc_deleted_records(self):
+        # called by the daily cron job (@api.autovacuum is not available in Odoo 13)
+        self.sudo().search([('deletion_date', '<', self.get_retention_start())]).unlink()
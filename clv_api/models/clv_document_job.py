@@ -0,0 +1,177 @@
+import json
+import logging
+import uuid
+
+from odoo import models, fields, api
+from odoo.release import version_info
+
+
+class DocumentJob(models.Model):
+    """
+    Finished Inventory API document queued to be processed in the background.
+    Large documents are processed by cron worker instead of the HTTP request
+    (mobile device polls the job's status).
+    """
+    _name = 'clv_api.document_job'
+    _description = 'Document processing job'
+    _order = 'id ASC'
+
+    _logger = logging.getLogger(__name__)
+
+    # finished jobs older than this are removed
+    _retention_days = 30
+
+    # job running longer than this is queued again if it is not locked by the processing transaction
+    # (the worker processing it was stopped)
+    _running_timeout_minutes = 30
+
+    document_uid = fields.Char(string="Document UID", required=True, index=True)
+    document_type_name = fields.Char(string="Document Type Name")
+    payload = fields.Text(string="Document")
+    device_info = fields.Text(string="Device Info")
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed')
+    ], string="State", required=True, default='queued', index=True)
+    error_message = fields.Text(string="Error Message")
+    user_id = fields.Many2one('res.users', string="User", required=True, ondelete='cascade')
+    company_id = fields.Many2one('res.company', string="Company")
+    date_started = fields.Datetime(string="Started")
+    date_finished = fields.Datetime(string="Finished")
+
+    _sql_constraints = [
+        ('document_uid_uniq', 'unique(document_uid, user_id)', 'Document is already submitted.')
+    ]
+
+    @api.model
+    def enqueue(self, doc, device_info):
+        """
+        Queues the finished document to be processed in background.
+        Resubmitting of the document with the same uid by the same user returns existing job
+        (failed job and job left running by the stopped worker are queued again with the new payload).
+        @param doc: Inventory API document
+        @param device_info: Inventory API device info
+        @return: the document's job
+        """
+        document_uid = self.get_document_uid(doc)
+
+        job = self.sudo().search([('document_uid', '=', document_uid), ('user_id', '=', self.env.uid)], limit=1)
+        if job and job.state != 'failed' and not self._get_stale_running_jobs([('id', '=', job.id)]):
+            return job
+
+        values = {
+            'document_type_name': doc.get('documentTypeName'),
+            'payload': json.dumps(doc),
+            'device_info': json.dumps(device_info),
+            'state': 'queued',
+            'error_message': False,
+            'user_id': self.env.uid,
+            'company_id': self.env.company.id,
+            'date_started': False,
+            'date_finished': False
+        }
+        if job:
+            job.write(values)
+        else:
+            values['document_uid'] = document_uid
+            job = self.sudo().create(values)
+
+        self._trigger_processing()
+        return job
+
+    @api.model
+    def get_document_uid(self, doc) -> str:
+        """
+        Returns identifier of the submission: document's uid or random uid.
+        Odoo id of the document is not used as the same document may be submitted several times
+        (e.g. partial receipts).
+        """
+        document_uid = doc.get('uid')
+        if document_uid:
+            return str(document_uid)
+        return str(uuid.uuid4())
+
+    def to_status(self) -> dict:
+        """
+        Returns Inventory API status of the job
+        """
+        self.ensure_one()
+        return {
+            'jobId': self.document_uid,
+            'status': self.state,
+            'errorMessage': self.error_message or None
+        }
+
+    @api.model
+    def _trigger_processing(self):
+        """
+        Asks cron worker to process queued jobs as soon as possible
+        """
+        if version_info[0] < 14:
+            # the cron is started by its interval
+            return
+        cron = self.env.ref('clv_api.ir_cron_process_document_jobs', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    @api.model
+    def _cron_process_document_jobs(self):
+        """
+        Processes queued jobs. Each job is committed separately, so failed job does not roll back others.
+        """
+        # local import: controllers depend on models being loaded
+        from ..controllers.documents import DocumentImpl
+        documents_impl = DocumentImpl()
+
+        stale_jobs = self._get_stale_running_jobs()
+        if stale_jobs:
+            self._logger.warning('Document jobs %s are queued again', ', '.join(stale_jobs.mapped('document_uid')))
+            stale_jobs.write({'state': 'queued', 'date_started': False})
+            self.env.cr.commit()
+
+        jobs = self.sudo().search([('state', '=', 'queued')])
+        for job in jobs:
+            job.write({'state': 'running', 'date_started': fields.Datetime.now()})
+            self.env.cr.commit()
+            # the running job is locked until it is finished (see _get_stale_running_jobs)
+            self.env.cr.execute('SELECT "id" FROM "clv_api_document_job" WHERE "id" = %s FOR UPDATE', [job.id])
+
+            job_context = dict(self.env.context)
+            if job.company_id:
+                job_context['allowed_company_ids'] = [job.company_id.id]
+            job_env = self.env(user=job.user_id.id, context=job_context)
+            try:
+                with self.env.cr.savepoint():
+                    documents_impl.set_document(job_env, json.loads(job.payload), json.loads(job.device_info))
+                job.write({'state': 'done', 'date_finished': fields.Datetime.now()})
+            except Exception as e:
+                self._logger.exception('Processing of the document %s failed', job.document_uid)
+                job.write({'state': 'failed', 'error_message': str(e), 'date_finished': fields.Datetime.now()})
+            self.env.cr.commit()
+
+    @api.model
+    def _get_stale_running_jobs(self, domain_filter=None):
+        """
+        Returns running jobs started before the timeout which are not locked by the processing transaction
+        (the returned jobs are locked by the current transaction)
+        """
+        timeout_start = fields.Datetime.subtract(fields.Datetime.now(), minutes=self._running_timeout_minutes)
+        jobs = self.sudo().search([('state', '=', 'running'), ('date_started', '<', timeout_start)] +
+                                  (domain_filter or []))
+        if not jobs:
+            return jobs
+
+        self.env.cr.execute('SELECT "id" FROM "clv_api_document_job" WHERE "id" IN %s FOR UPDATE SKIP LOCKED',
+                            [tuple(jobs.ids)])
+        return self.sudo().browse([row[0] for row in self.env.cr.fetchall()])
+
+    @api.model
+    def _gc_document_jobs(self):
+        # called by the daily cron job (@api.autovacuum is not available in Odoo 13)
+        retention_start = fields.Datetime.subtract(fields.Datetime.now(), days=self._retention_days)
+        self.sudo().search([
+            ('state', 'in', ['done', 'failed']),
+            ('date_finished', '<', retention_start)
+        ]).unlink()
@@ -0,0 +1,61 @@
+from odoo import models, fields, api
+
+from ..controllers.barcode_utils import BarcodeUtils
+
+
+class ProductSearchCode(models.Model):
+    """
+    Lookup index of normalized barcodes and markings (internal references) of the products.
+    Allows resolving scanned codes by a single indexed probe.
+    """
+    _name = 'clv_api.product_search_code'
+    _description = 'Product search code'
+
+    code = fields.Char(string="Code", required=True, index=True)
+    code_type = fields.Selection([('barcode', 'Barcode'), ('marking', 'Marking')], string="Code Type", required=True)
+    product_id = fields.Many2one('product.product', string="Product", required=True, ondelete='cascade', index=True)
+
+    def init(self):
+        # Fills the index for the products existing before the module installation or update
+        if not self.sudo().search([], limit=1):
+            self.update_product_codes(self.env['product.product'].with_context(active_test=False).search([]))
+
+    @api.model
+    def update_product_codes(self, products):
+        """
+        Replaces search codes of the passed products with their actual barcodes and markings.
+        """
+        if not products:
+            return
+
+        self.sudo().search([('product_id', 'in', products.ids)]).unlink()
+
+        values = []
+        for product in products:
+            barcode = BarcodeUtils.normalize_barcode(product.barcode)
+            if barcode:
+                values.append({'code': barcode, 'code_type': 'barcode', 'product_id': product.id})
+            if product.default_code:
+                values.append({'code': product.default_code, 'code_type': 'marking', 'product_id': product.id})
+
+        if values:
+            self.sudo().create(values)
+
+    @api.model
+    def find_product_ids(self, barcodes, markings) -> list:
+        """
+        Returns ids of the products having any of the passed barcodes or markings.
+        Barcodes are normalized before the lookup, so EAN-13, UPC-A and GTIN-14 forms of the same code are equal.
+        """
+        normalized_barcodes = list({BarcodeUtils.normalize_barcode(barcode) for barcode in barcodes if barcode})
+        markings = list({marking for marking in markings if marking})
+        if not normalized_barcodes and not markings:
+            return []
+
+        self.env.cr.execute("""
+            SELECT DISTINCT product_id
+            FROM clv_api_product_search_code
+            WHERE (code_type = 'barcode' AND code = ANY(%s))
+            OR (code_type = 'marking' AND code = ANY(%s))
+        """, (normalized_barcodes, markings))
+        return [row[0] for row in self.env.cr.fetchall()]
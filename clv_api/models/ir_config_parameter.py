@@ -0,0 +1,20 @@
+from odoo import models, api, tools
+
+
+class IrConfigParameter(models.Model):
+    """
+    Extends ir.config_parameter class to provide cached snapshot of the module settings
+    """
+    _inherit = 'ir.config_parameter'
+
+    @api.model
+    @tools.ormcache()
+    def clv_get_settings_snapshot(self) -> dict:
+        """
+        Returns values of all 'clv_api.*' parameters loaded by single query.
+        The snapshot is cached by the worker; odoo clears it (in all workers) when any parameter is modified,
+        e.g. by ResConfigSettings.set_values.
+        @return: dictionary of parameter values by their keys (must not be modified)
+        """
+        params = self.sudo().search_read([('key', '=like', 'clv_api.%')], ['key', 'value'])
+        return {param['key']: param['value'] for param in params}
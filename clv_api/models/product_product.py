@@ -0,0 +1,20 @@
+from odoo import models, api
+
+
+class ProductProduct(models.Model):
+    """
+    Extends product.product class to keep the product search codes index up to date
+    """
+    _inherit = 'product.product'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        products = super(ProductProduct, self).create(vals_list)
+        self.env['clv_api.product_search_code'].update_product_codes(products)
+        return products
+
+    def write(self, vals):
+        res = super(ProductProduct, self).write(vals)
+        if 'barcode' in vals or 'default_code' in vals:
+            self.env['clv_api.product_search_code'].update_product_codes(self)
+        return res
@@ -0,0 +1,41 @@
+from odoo import models, fields, api
+from odoo.release import version_info
+
+from ..controllers.common_utils import CommonUtils
+
+
+class ResPartner(models.Model):
+    """
+    Extends res.partner class to keep the search string of the customers/vendors table
+    and to register deleted and archived partners for the tables synchronization
+    """
+    _inherit = 'res.partner'
+
+    clv_search = fields.Char(string="Customers/Vendors Table Search String", compute='_compute_clv_search', store=True,
+                             index='trigram' if version_info[0] >= 16 else False)
+
+    def init(self):
+        super(ResPartner, self).init()
+        if version_info[0] < 16:
+            # btree index does not help 'ilike' search
+            CommonUtils.create_trigram_index(self.env.cr, self._table, 'clv_search')
+
+    @api.depends('ref', 'name', 'vat')
+    def _compute_clv_search(self):
+        for partner in self:
+            partner.clv_search = CommonUtils.generate_search_string([partner.ref or None,
+                                                                     partner.name or None,
+                                                                     partner.vat or None])
+
+    def write(self, vals):
+        if 'active' in vals:
+            deleted_record = self.env['clv_api.deleted_record']
+            if vals['active']:
+                deleted_record.unregister(self.filtered(lambda partner: not partner.active))
+            else:
+                deleted_record.register(self.filtered('active'))
+        return super(ResPartner, self).write(vals)
+
+    def unlink(self):
+        self.env['clv_api.deleted_record'].register(self)
+        return super(ResPartner, self).unlink()
@@ -0,0 +1,31 @@
+from odoo import models
+
+
+class StockLocation(models.Model):
+    """
+    Extends stock.location class to register deleted locations (and quants of the archived locations)
+    for the tables synchronization
+    """
+    _inherit = 'stock.location'
+
+    def write(self, vals):
+        if 'active' in vals:
+            self._clv_register_archived_quants(vals['active'])
+        return super(StockLocation, self).write(vals)
+
+    def unlink(self):
+        self.env['clv_api.deleted_record'].register(self)
+        return super(StockLocation, self).unlink()
+
+    def _clv_register_archived_quants(self, active: bool):
+        # quants of the archived locations are not returned by the stock table, so they are reported as deleted rows;
+        # restored quants are returned as changed rows because the write date of their location is changed
+        locations = self.filtered(lambda location: location.active != bool(active))
+        if not locations:
+            return
+        quants = self.env['stock.quant'].sudo().search([('location_id', 'in', locations.ids)])
+        deleted_record = self.env['clv_api.deleted_record']
+        if active:
+            deleted_record.unregister(quants)
+        else:
+            deleted_record.register(quants, quants.clv_get_deleted_stock_rows())
@@ -0,0 +1,30 @@
+from odoo import models, fields, api
+from odoo.release import version_info
+
+from ..controllers.common_utils import CommonUtils
+
+
+class StockLot(models.Model):
+    """
+    Extends stock.lot class (stock.production.lot for older versions) to register deleted lots
+    for the tables synchronization and to keep the search string of the series table
+    """
+    _inherit = 'stock.lot' if version_info[0] >= 16 else 'stock.production.lot'
+
+    clv_search = fields.Char(string="Series Table Search String", compute='_compute_clv_search', store=True,
+                             index='trigram' if version_info[0] >= 16 else False)
+
+    def init(self):
+        super(StockLot, self).init()
+        if version_info[0] < 16:
+            # btree index does not help 'ilike' search
+            CommonUtils.create_trigram_index(self.env.cr, self._table, 'clv_search')
+
+    @api.depends('name', 'create_date')
+    def _compute_clv_search(self):
+        for lot in self:
+            lot.clv_search = CommonUtils.generate_search_string([lot.name or None, lot.create_date or None])
+
+    def unlink(self):
+        self.env['clv_api.deleted_record'].register(self)
+        return super(StockLot, self).unlink()
@@ -0,0 +1,26 @@
+from odoo import models, api
+
+from ..controllers.document_cache import DocumentCache
+
+
+class StockMoveLine(models.Model):
+    """
+    Extends stock.move.line class to evict cached documents of the modified pickings
+    """
+    _inherit = 'stock.move.line'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        move_lines = super(StockMoveLine, self).create(vals_list)
+        DocumentCache.invalidate(self.env.cr.dbname, move_lines.mapped('picking_id').ids)
+        return move_lines
+
+    def write(self, vals):
+        picking_ids = self.mapped('picking_id').ids
+        res = super(StockMoveLine, self).write(vals)
+        DocumentCache.invalidate(self.env.cr.dbname, picking_ids + self.mapped('picking_id').ids)
+        return res
+
+    def unlink(self):
+        DocumentCache.invalidate(self.env.cr.dbname, self.mapped('picking_id').ids)
+        return super(StockMoveLine, self).unlink()
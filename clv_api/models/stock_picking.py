@@ -1,16 +1,24 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api
 
+from ..controllers.document_cache import DocumentCache
+
 def get_default_scan_locations(self):
-    return bool(self.env['ir.config_parameter'].sudo().get_param('clv_api.clv_default_scan_locations'))
+    return bool(self.env['ir.config_parameter'].clv_get_settings_snapshot().get('clv_api.clv_default_scan_locations'))
 
 class StockPicking(models.Model):
     """
-    Extends stiock.picking class to add settings
+    Extends stock.picking class to add settings and to evict cached documents of the modified pickings
     """
     _inherit = 'stock.picking'
 
     scan_locations = fields.Boolean(string="Scan locations", default=get_default_scan_locations)
 
+    def write(self, vals):
+        res = super(StockPicking, self).write(vals)
+        DocumentCache.invalidate(self.env.cr.dbname, self.ids)
+        return res
 
-
+    def unlink(self):
+        DocumentCache.invalidate(self.env.cr.dbname, self.ids)
+        return super(StockPicking, self).unlink()
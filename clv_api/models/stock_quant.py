@@ -0,0 +1,92 @@
+from odoo import models, api
+from odoo.release import version_info
+
+from ..controllers.common_utils import CommonUtils
+from ..controllers.model_converter import ModelConverter
+
+
+class StockQuant(models.Model):
+    """
+    Extends stock.quant class to register deleted quants for the tables synchronization
+    """
+    _inherit = 'stock.quant'
+
+    _clv_model_converter = ModelConverter()
+    _clv_cutils = CommonUtils()
+
+    def unlink(self):
+        self.env['clv_api.deleted_record'].register(self, self.clv_get_deleted_stock_rows())
+        return super(StockQuant, self).unlink()
+
+    @api.model
+    def _merge_quants(self):
+        # Odoo merges the duplicate quants by raw SQL: duplicates are deleted and the quantity of the remaining quant
+        # is updated without write date, so the tombstones and the write dates are set here.
+        # Quants are grouped without 'in_date' (grouped by some versions) to find all the possible duplicates.
+        self._clv_flush_quant_keys()
+        self.env.cr.execute('''
+            SELECT array_agg("id")
+            FROM "stock_quant"
+            GROUP BY "product_id", "company_id", "location_id", "lot_id", "package_id", "owner_id"
+            HAVING count("id") > 1''')
+        duplicate_ids = [quant_id for (quant_ids,) in self.env.cr.fetchall() for quant_id in quant_ids]
+        if not duplicate_ids:
+            return super(StockQuant, self)._merge_quants()
+
+        duplicates = self.sudo().browse(duplicate_ids)
+        deleted_rows = dict(zip(duplicate_ids, duplicates.clv_get_deleted_stock_rows()))
+
+        res = super(StockQuant, self)._merge_quants()
+
+        self.env.cr.execute('SELECT "id" FROM "stock_quant" WHERE "id" = ANY(%s)', [duplicate_ids])
+        remaining_ids = {quant_id for (quant_id,) in self.env.cr.fetchall()}
+        deleted_ids = [quant_id for quant_id in duplicate_ids if quant_id not in remaining_ids]
+        if deleted_ids:
+            self.env['clv_api.deleted_record'].register(self.sudo().browse(deleted_ids),
+                                                        [deleted_rows[quant_id] for quant_id in deleted_ids])
+            self.env.cr.execute('''
+                UPDATE "stock_quant" SET "write_date" = now() AT TIME ZONE 'UTC'
+                WHERE "id" = ANY(%s)''', [list(remaining_ids)])
+            remaining_quants = self.sudo().browse(list(remaining_ids))
+            if version_info[0] >= 16:
+                remaining_quants.invalidate_recordset(['write_date'])
+            else:
+                remaining_quants.invalidate_cache(['write_date'], remaining_quants.ids)
+        return res
+
+    def clv_get_deleted_stock_rows(self) -> list:
+        """
+        Returns deleted stock table rows (only the fields identifying the rows) of the quants, one per quant.
+        Key values are read by single query instead of the full conversion of the quants.
+        """
+        if not self:
+            return []
+
+        self._clv_flush_quant_keys()
+        lot_table = self.env[self._clv_cutils.get_stock_lot_env_name()]._table
+        self.env.cr.execute(f'''
+            SELECT q."id", q."product_id", q."location_id", q."lot_id", lot."name" AS "lot_name",
+                   pt."tracking", pt."uom_id", wh."id" AS "warehouse_id"
+            FROM "stock_quant" q
+            JOIN "product_product" pp ON pp."id" = q."product_id"
+            JOIN "product_template" pt ON pt."id" = pp."product_tmpl_id"
+            JOIN "stock_location" loc ON loc."id" = q."location_id"
+            LEFT JOIN "{lot_table}" lot ON lot."id" = q."lot_id"
+            LEFT JOIN LATERAL (
+                SELECT w."id"
+                FROM "stock_warehouse" w
+                JOIN "stock_location" view_loc ON view_loc."id" = w."view_location_id"
+                WHERE loc."parent_path" LIKE view_loc."parent_path" || '%%'
+                ORDER BY length(view_loc."parent_path") DESC
+                LIMIT 1) wh ON TRUE
+            WHERE q."id" = ANY(%s)''', [self.ids])
+        quant_keys = {values['id']: values for values in self.env.cr.dictfetchall()}
+
+        return [self._clv_model_converter.convert_stock_quant_keys_to_deleted_stock_row(quant_keys[quant.id])
+                for quant in self]
+
+    def _clv_flush_quant_keys(self):
+        if version_info[0] >= 16:
+            self.env['stock.quant'].flush_model(['product_id', 'location_id', 'lot_id'])
+        else:
+            self.env['stock.quant'].flush(['product_id', 'location_id', 'lot_id'])
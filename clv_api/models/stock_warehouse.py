@@ -0,0 +1,59 @@
+from odoo import models, fields, api
+from odoo.release import version_info
+
+from ..controllers.common_utils import CommonUtils
+
+
+class StockWarehouse(models.Model):
+    """
+    Extends stock.warehouse class to keep the search string of the warehouses table
+    and to register deleted and archived warehouses for the tables synchronization
+    """
+    _inherit = 'stock.warehouse'
+
+    clv_search = fields.Char(string="Warehouses Table Search String", compute='_compute_clv_search', store=True,
+                             index='trigram' if version_info[0] >= 16 else False)
+
+    def init(self):
+        super(StockWarehouse, self).init()
+        if version_info[0] < 16:
+            # btree index does not help 'ilike' search
+            CommonUtils.create_trigram_index(self.env.cr, self._table, 'clv_search')
+
+    @api.depends('name', 'code')
+    def _compute_clv_search(self):
+        for warehouse in self:
+            warehouse.clv_search = CommonUtils.generate_search_string([warehouse.name or None, warehouse.code or None])
+
+    def write(self, vals):
+        if 'active' in vals:
+            if vals['active']:
+                self._clv_unregister_archived(self.filtered(lambda warehouse: not warehouse.active))
+            else:
+                self._clv_register_archived(self.filtered('active'))
+        return super(StockWarehouse, self).write(vals)
+
+    def unlink(self):
+        self._clv_register_archived(self)
+        return super(StockWarehouse, self).unlink()
+
+    def _clv_register_archived(self, warehouses):
+        # locations of the archived warehouses disappear from the locations table as well
+        if not warehouses:
+            return
+        deleted_record = self.env['clv_api.deleted_record']
+        deleted_record.register(warehouses, [{'id': CommonUtils.convert_warehouse_id_from_odoo_to_clv(warehouse.id)}
+                                             for warehouse in warehouses])
+        deleted_record.register(self._clv_get_warehouse_locations(warehouses))
+
+    def _clv_unregister_archived(self, warehouses):
+        if not warehouses:
+            return
+        deleted_record = self.env['clv_api.deleted_record']
+        deleted_record.unregister(warehouses)
+        deleted_record.unregister(self._clv_get_warehouse_locations(warehouses))
+
+    def _clv_get_warehouse_locations(self, warehouses):
+        return self.env['stock.location'].with_context(active_test=False).search([
+            ('warehouse_id', 'in', warehouses.ids)
+        ])
@@ -0,0 +1,210 @@
+import math
+import threading
+import time
+
+from odoo.api import Environment
+from odoo.release import version_info
+
+from ..controllers.documents import DocumentImpl
+from ..controllers.inventory import InventoryImpl
+from ..controllers.tables import TablesImpl
+
+
+class ClvApiBenchmark:
+    """
+    Replays scripted mobile device sessions against the Inventory API implementation in-process
+    and reports throughput, latency percentiles and SQL query counts of each scenario:
+        'bootstrap_sync' - all pages of the inventory items and of the tables downloaded by the new device;
+        'scan_lookups' - search of the inventory items by scanned barcodes;
+        'get_document' - opening of the receipts;
+        'set_document' - submission of the receipts with all lines received (each receipt is validated once).
+    Used with the dataset of BenchmarkDatasetGenerator from the odoo shell:
+        dataset = BenchmarkDatasetGenerator(env, seed=1).generate(products=5000, pickings=10, lines_per_picking=500)
+        print(ClvApiBenchmark(env, dataset).run().format_report())
+        env.cr.rollback()
+    Calls go to the *Impl classes used by ClvApi endpoints (without http layer),
+    the ORM cache is cleared before each call like it is cleared between the requests.
+    """
+
+    # tables downloaded by the bootstrap synchronization
+    _sync_tables = ['warehouseslines', 'locations', 'series', 'stock', 'customersvendors']
+
+    _inventory_impl = InventoryImpl()
+    _documents_impl = DocumentImpl()
+    _tables_impl = TablesImpl()
+
+    def __init__(self, env: Environment, dataset: dict, page_size: int = 500, scans: int = 200,
+                 device_info: dict = None):
+        """
+        Ctor
+        @param env: Environment
+        @param dataset: dataset generated by BenchmarkDatasetGenerator
+        @param page_size: page size of the synchronization requests
+        @param scans: number of the barcode lookups
+        @param device_info: Inventory API DeviceInfo passed to the calls
+        """
+        self._env = env
+        self._dataset = dataset
+        self._page_size = page_size
+        self._scans = scans
+        self._device_info = device_info or {}
+        self._samples = {}
+
+    def run(self, scenarios=None):
+        """
+        Runs the scenarios
+        @param scenarios: names of the scenarios to run (all if not passed)
+        @return: self
+        """
+        current_thread = threading.current_thread()
+        # odoo counts queries of the thread only if the counters exist (they are created by http requests)
+        if not hasattr(current_thread, 'query_count'):
+            current_thread.query_count = 0
+            current_thread.query_time = 0.0
+
+        all_scenarios = {
+            'bootstrap_sync': self._run_bootstrap_sync,
+            'scan_lookups': self._run_scan_lookups,
+            'get_document': self._run_get_document,
+            'set_document': self._run_set_document
+        }
+        for scenario in scenarios or all_scenarios.keys():
+            all_scenarios[scenario]()
+        return self
+
+    def get_report(self) -> dict:
+        """
+        Returns statistics of the scenarios
+        @return: dictionary by scenario name with 'calls', 'seconds', 'calls_per_second',
+            'p50_ms', 'p95_ms', 'p99_ms', 'avg_queries', 'max_queries' and 'rows'
+        """
+        report = {}
+        for scenario, samples in self._samples.items():
+            durations = sorted(sample[0] for sample in samples)
+            queries = [sample[1] for sample in samples]
+            seconds = sum(durations)
+            report[scenario] = {
+                'calls': len(samples),
+                'seconds': seconds,
+                'calls_per_second': len(samples) / seconds if seconds else 0.0,
+                'p50_ms': self._percentile(durations, 50) * 1000,
+                'p95_ms': self._percentile(durations, 95) * 1000,
+                'p99_ms': self._percentile(durations, 99) * 1000,
+                'avg_queries': sum(queries) / len(queries) if queries else 0.0,
+                'max_queries': max(queries, default=0),
+                'rows': sum(sample[2] for sample in samples)
+            }
+        return report
+
+    def format_report(self) -> str:
+        """
+        Returns statistics of the scenarios as text table
+        """
+        lines = ['{:<16}{:>8}{:>10}{:>10}{:>10}{:>10}{:>10}{:>10}{:>10}'.format(
+            'scenario', 'calls', 'calls/s', 'p50 ms', 'p95 ms', 'p99 ms', 'avg sql', 'max sql', 'rows')]
+        for scenario, stats in self.get_report().items():
+            lines.append('{:<16}{:>8}{:>10.1f}{:>10.1f}{:>10.1f}{:>10.1f}{:>10.1f}{:>10}{:>10}'.format(
+                scenario, stats['calls'], stats['calls_per_second'], stats['p50_ms'], stats['p95_ms'],
+                stats['p99_ms'], stats['avg_queries'], stats['max_queries'], stats['rows']))
+        return '\n'.join(lines)
+
+    def _run_bootstrap_sync(self):
+        page_token = ''
+        while page_token is not None:
+            result = self._measure('bootstrap_sync', lambda: self._inventory_impl.get_items(
+                self._env, None, None, self._page_size, False, page_token))
+            page_token = result.get('continuationToken')
+
+        for table_name in self._sync_tables:
+            page_token = ''
+            while page_token is not None:
+                result = self._measure('bootstrap_sync', lambda: self._tables_impl.get_rows(
+                    self._env, {'from': table_name}, self._device_info, None, self._page_size, False,
+                    page_token=page_token))
+                page_token = result.get('continuationToken')
+
+    def _run_scan_lookups(self):
+        barcodes = self._dataset['barcodes']
+        for scan_index in range(min(self._scans, len(barcodes))):
+            barcode = barcodes[scan_index * len(barcodes) // self._scans]
+            self._measure('scan_lookups', lambda: self._inventory_impl.get_items_by_search_code(
+                self._env, {'byBarcode': True}, {'raw': barcode}))
+
+    def _run_get_document(self):
+        for picking_id in self._dataset['picking_ids']:
+            self._measure('get_document', lambda: self._documents_impl.get_document(
+                self._env, 'byCode', str(picking_id), 'Receiving'))
+
+    def _run_set_document(self):
+        for picking_id in self._dataset['picking_ids']:
+            document = self._documents_impl.get_document(self._env, 'byCode', str(picking_id), 'Receiving')['document']
+            if not document:
+                continue
+            document['scanLocations'] = False
+            document['actualLines'] = self._make_actual_lines(document)
+            self._measure('set_document', lambda: self._documents_impl.set_document(
+                self._env, document, self._device_info), rows=len(document['actualLines']))
+
+    def _make_actual_lines(self, document) -> list:
+        # all expected quantities are received, tracked products get new lots and serial numbers
+        products = self._env['product.product'].browse(
+            [int(line['inventoryItemId']) for line in document.get('expectedLines', [])])
+        tracking = {product.id: product.product_tmpl_id.tracking for product in products}
+
+        actual_lines = []
+        for line in document.get('expectedLines', []):
+            product_id = int(line['inventoryItemId'])
+            quantity = float(line['expectedQuantity'])
+            actual_line = {
+                'uid': f'{line["uid"]}-{len(actual_lines)}',
+                'bindedDocumentLineUid': line['uid'],
+                'inventoryItemId': line['inventoryItemId'],
+                'actualQuantity': quantity,
+                'serialNumber': None,
+                'seriesName': None
+            }
+            if tracking.get(product_id) == 'serial':
+                for serial_index in range(int(quantity)):
+                    actual_lines.append(dict(actual_line, uid=f'{actual_line["uid"]}-{serial_index}', actualQuantity=1.0,
+                                             serialNumber=f'SN-{document["id"]}-{line["uid"]}-{serial_index}'))
+                continue
+            if tracking.get(product_id) == 'lot':
+                actual_line['seriesName'] = f'LOT-{document["id"]}-{line["uid"]}'
+            actual_lines.append(actual_line)
+        return actual_lines
+
+    def _measure(self, scenario: str, call, rows: int = None):
+        self._invalidate_cache()
+        current_thread = threading.current_thread()
+        start_query_count = current_thread.query_count
+        start_time = time.perf_counter()
+        result = call()
+        duration = time.perf_counter() - start_time
+        if rows is None:
+            rows = self._count_rows(result)
+        self._samples.setdefault(scenario, []).append((duration, current_thread.query_count - start_query_count, rows))
+        return result
+
+    def _invalidate_cache(self):
+        if version_info[0] >= 16:
+            self._env.invalidate_all()
+        else:
+            self._env['base'].invalidate_cache()
+
+    @staticmethod
+    def _count_rows(result) -> int:
+        if not isinstance(result, dict):
+            return 0
+        if isinstance(result.get('result'), list):
+            return len(result['result'])
+        if isinstance(result.get('document'), dict):
+            return len(result['document'].get('expectedLines') or [])
+        return 0
+
+    @staticmethod
+    def _percentile(sorted_values: list, percent: int) -> float:
+        # nearest-rank percentile
+        if not sorted_values:
+            return 0.0
+        rank = max(math.ceil(percent / 100 * len(sorted_values)) - 1, 0)
+        return sorted_values[min(rank, len(sorted_values) - 1)]
@@ -0,0 +1,196 @@
+import math
+import random
+
+from odoo.api import Environment
+from odoo.release import version_info
+
+from ..controllers.common_utils import CommonUtils
+
+
+class BenchmarkDatasetGenerator:
+    """
+    Generates reproducible synthetic warehouse data through the ORM for the clv_api benchmark (see ClvApiBenchmark).
+    Creates the separate warehouse with the tree of locations, products (with variants, lots and serial numbers),
+    stock quants and confirmed receipts. The same seed produces the same data.
+    The data is created in the current transaction, roll it back to remove the data after the benchmark.
+    """
+    _cutils = CommonUtils()
+
+    # the number of leaf locations under the single zone location
+    _locations_per_zone = 20
+
+    def __init__(self, env: Environment, seed: int = 0, prefix: str = 'BENCH'):
+        """
+        Ctor
+        @param env: Environment
+        @param seed: seed of the random generator
+        @param prefix: prefix of the names and barcodes of the generated records
+        """
+        self._env = env
+        self._random = random.Random(seed)
+        self._seed = seed
+        self._prefix = prefix
+
+    def generate(self, products: int = 1000, variants_per_product: int = 1, lots_per_product: int = 3,
+                 serials_per_product: int = 10, locations: int = 200, quants: int = 5000, pickings: int = 20,
+                 lines_per_picking: int = 100) -> dict:
+        """
+        Generates the dataset
+        @param products: number of the product templates (a third of them is tracked by lots, a third - by serials)
+        @param variants_per_product: number of the variants of each template
+        @param lots_per_product: number of the lots of each lot tracked variant
+        @param serials_per_product: number of the serial numbers of each serial tracked variant
+        @param locations: number of the leaf locations of the warehouse
+        @param quants: number of the stock quants
+        @param pickings: number of the confirmed receipts
+        @param lines_per_picking: number of the moves of each receipt
+        @return: dictionary with ids of the generated records
+            ('warehouse_id', 'partner_id', 'product_ids', 'location_ids', 'picking_ids', 'barcodes')
+        """
+        warehouse = self._create_warehouse()
+        leaf_locations = self._create_locations(warehouse, locations)
+        variants = self._create_products(products, variants_per_product)
+        lots_by_product = self._create_lots(variants, lots_per_product, serials_per_product, warehouse.company_id)
+        self._create_quants(variants, leaf_locations, lots_by_product, quants)
+        partner = self._env['res.partner'].create({'name': f'{self._prefix} Vendor {self._seed}'})
+        receipts = self._create_receipts(warehouse, partner, variants, pickings, lines_per_picking)
+
+        return {
+            'warehouse_id': warehouse.id,
+            'partner_id': partner.id,
+            'product_ids': variants.ids,
+            'location_ids': leaf_locations.ids,
+            'picking_ids': receipts.ids,
+            'barcodes': [barcode for barcode in variants.mapped('barcode') if barcode]
+        }
+
+    def _create_warehouse(self):
+        # warehouse code is limited by 5 characters
+        code = f'B{self._seed % 10000}'
+        return self._env['stock.warehouse'].create({
+            'name': f'{self._prefix} Warehouse {self._seed}',
+            'code': code,
+            'reception_steps': 'one_step',
+            'delivery_steps': 'ship_only'
+        })
+
+    def _create_locations(self, warehouse, count: int):
+        zones_count = max(math.ceil(count / self._locations_per_zone), 1)
+        zones = self._env['stock.location'].create([{
+            'name': f'Z{zone_index:03d}',
+            'usage': 'view',
+            'location_id': warehouse.lot_stock_id.id
+        } for zone_index in range(zones_count)])
+
+        return self._env['stock.location'].create([{
+            'name': f'{location_index:04d}',
+            'usage': 'internal',
+            'location_id': zones[location_index // self._locations_per_zone].id,
+            'barcode': f'{self._prefix}-{self._seed}-L{location_index:05d}'
+        } for location_index in range(count)])
+
+    def _create_products(self, count: int, variants_per_product: int):
+        attribute_line_values = []
+        if variants_per_product > 1:
+            attribute = self._env['product.attribute'].create({
+                'name': f'{self._prefix} Size {self._seed}',
+                'create_variant': 'always',
+                'value_ids': [(0, 0, {'name': f'S{value_index}'}) for value_index in range(variants_per_product)]
+            })
+            attribute_line_values = [(0, 0, {
+                'attribute_id': attribute.id,
+                'value_ids': [(6, 0, attribute.value_ids.ids)]
+            })]
+
+        trackings = ['none', 'lot', 'serial']
+        templates = self._env['product.template'].create([{
+            'name': f'{self._prefix} Product {self._seed}-{template_index:06d}',
+            self._get_detailed_type_name(): 'product',
+            'tracking': trackings[template_index % len(trackings)],
+            'default_code': f'{self._prefix}{self._seed}-{template_index:06d}',
+            'list_price': round(self._random.uniform(1, 1000), 2),
+            'attribute_line_ids': attribute_line_values
+        } for template_index in range(count)])
+
+        variants = templates.mapped('product_variant_ids')
+        for variant in variants:
+            variant.barcode = f'{self._prefix}{self._seed}{variant.id:010d}'
+        return variants
+
+    def _create_lots(self, variants, lots_per_product: int, serials_per_product: int, company) -> dict:
+        lots_values = []
+        for variant in variants:
+            tracking = variant.product_tmpl_id.tracking
+            if tracking == 'none':
+                continue
+            lots_count = lots_per_product if tracking == 'lot' else serials_per_product
+            lots_values.extend({
+                'name': f'{self._prefix}-{variant.id}-{lot_index:05d}',
+                'product_id': variant.id,
+                'company_id': company.id
+            } for lot_index in range(lots_count))
+
+        lots_by_product = {}
+        for lot in self._env[self._cutils.get_stock_lot_env_name()].create(lots_values):
+            lots_by_product.setdefault(lot.product_id.id, []).append(lot)
+        return lots_by_product
+
+    def _create_quants(self, variants, locations, lots_by_product: dict, count: int):
+        stock_quant = self._env['stock.quant'].sudo()
+        free_serials = {product_id: list(lots) for product_id, lots in lots_by_product.items()}
+        for _ in range(count):
+            variant = self._random.choice(variants)
+            location = self._random.choice(locations)
+            tracking = variant.product_tmpl_id.tracking
+
+            lot = None
+            quantity = float(self._random.randint(1, 100))
+            if tracking == 'lot':
+                lot = self._random.choice(lots_by_product[variant.id])
+            elif tracking == 'serial':
+                if not free_serials.get(variant.id):
+                    continue
+                lot = free_serials[variant.id].pop()
+                quantity = 1.0
+
+            stock_quant._update_available_quantity(variant, location, quantity, lot_id=lot)
+
+    def _create_receipts(self, warehouse, partner, variants, count: int, lines_per_picking: int):
+        picking_type = warehouse.in_type_id
+        receipts = self._env['stock.picking']
+        for _ in range(count):
+            moves_values = []
+            for variant in self._random.sample(list(variants), min(lines_per_picking, len(variants))):
+                quantity = 1.0 if variant.product_tmpl_id.tracking == 'serial' else float(self._random.randint(1, 50))
+                moves_values.append((0, 0, {
+                    'name': variant.display_name,
+                    'product_id': variant.id,
+                    'product_uom': variant.uom_id.id,
+                    'product_uom_qty': quantity,
+                    'location_id': picking_type.default_location_src_id.id or partner.property_stock_supplier.id,
+                    'location_dest_id': picking_type.default_location_dest_id.id
+                }))
+            receipts |= self._env['stock.picking'].create({
+                'picking_type_id': picking_type.id,
+                'partner_id': partner.id,
+                'location_id': picking_type.default_location_src_id.id or partner.property_stock_supplier.id,
+                'location_dest_id': picking_type.default_location_dest_id.id,
+                'origin': f'{self._prefix}-{self._seed}',
+                self._get_moves_field_name(): moves_values
+            })
+        receipts.action_confirm()
+        return receipts
+
+    # noinspection PyMethodMayBeStatic
+    def _get_detailed_type_name(self):
+        if version_info[0] <= 14:
+            return 'type'
+        else:
+            return 'detailed_type'
+
+    # noinspection PyMethodMayBeStatic
+    def _get_moves_field_name(self):
+        if version_info[0] <= 14:
+            return 'move_lines'
+        else:
+            return 'move_ids'